@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Batch Quote Runner
+---------------------------------------
+Streams a JSONL file of quote requests through the agent with bounded
+concurrency and writes one JSONL result per request:
+
+    python batch_runner.py requests.jsonl --output results.jsonl --concurrency 8 --timeout 120
+
+Each input line is a JSON object with an id (``request_id`` or ``id``) and
+the request text (``prompt``, ``request``, ``text``, ``body`` or ``query``),
+or override the field names with --id-field / --prompt-field. A bare JSON
+string is used as the prompt with the line number as its id.
+
+``--agent adk`` (default) drives ``run_agent_async`` from simple_agent.py;
+``--agent direct`` runs ``smart_quote_agent`` from
+smart_quoting_agent_working.py, each request on its own thread, so a call
+abandoned on timeout keeps running without taking a slot from the next.
+
+Every result line holds the request id, status (ok / error / timeout),
+response, start time, elapsed milliseconds and LLM token usage. Results
+are appended and flushed as each request finishes, so the output file is
+also the checkpoint: re-running the same command skips ids that already
+finished with status ok and retries the rest.
+"""
+
+import argparse, asyncio, contextvars, json, logging, os, sys, threading, time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from token_usage import track
+
+ID_FIELDS = ("request_id", "id")
+PROMPT_FIELDS = ("prompt", "request", "text", "body", "query")
+
+
+def read_requests(path, id_field=None, prompt_field=None):
+    """Yield ``(request_id, prompt)`` for each non-empty line; prompt is None if missing."""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️  Skipping line {line_no}: invalid JSON ({e})", file=sys.stderr)
+                continue
+            if isinstance(record, str):
+                yield f"line-{line_no}", record
+                continue
+            fields = (id_field,) if id_field else ID_FIELDS
+            request_id = next((record[k] for k in fields if record.get(k) not in (None, "")), f"line-{line_no}")
+            fields = (prompt_field,) if prompt_field else PROMPT_FIELDS
+            prompt = next((record[k] for k in fields if isinstance(record.get(k), str) and record[k].strip()), None)
+            yield str(request_id), prompt
+
+
+def completed_ids(path) -> set:
+    """Ids with an ``ok`` result in an existing output file (a torn last line is ignored)."""
+    done = set()
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return done
+    with f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if result.get("status") == "ok":
+                done.add(str(result.get("request_id")))
+    return done
+
+
+def open_output(path):
+    """Open ``path`` for appending, terminating a line torn by an earlier crash."""
+    f = open(path, "a+b")
+    if f.tell() > 0:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+    return f
+
+
+def in_thread(fn, *args) -> Future:
+    """Run ``fn(*args)`` on a new daemon thread.
+
+    A request that times out cannot stop its thread; with a fixed pool the
+    abandoned call would keep a worker until it returned, so every timeout
+    would lower the effective concurrency.
+    """
+    future = Future()
+
+    def run():
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    threading.Thread(target=run, name="quote-batch", daemon=True).start()
+    return future
+
+
+def load_agent(name: str):
+    """Return an ``async agent(prompt) -> str`` for ``adk`` or ``direct``."""
+    if name == "adk":
+        from simple_agent import run_agent_async
+        return run_agent_async
+
+    from smart_quoting_agent_working import smart_quote_agent
+
+    async def direct(prompt):
+        # Copy the context so the worker thread reports token usage to this request
+        ctx = contextvars.copy_context()
+        return await asyncio.wrap_future(in_thread(ctx.run, smart_quote_agent, prompt))
+    return direct
+
+
+async def run_one(agent, request_id: str, prompt, timeout: float) -> dict:
+    result = {"request_id": request_id, "status": "ok", "response": None, "error": None,
+              "started_at": datetime.now(timezone.utc).isoformat(timespec="milliseconds")}
+    start = time.perf_counter()
+    with track() as usage:
+        try:
+            if prompt is None:
+                raise ValueError("request has no prompt text")
+            result["response"] = await asyncio.wait_for(agent(prompt), timeout)
+            if result["response"] is None:
+                result["status"], result["error"] = "error", "agent returned no response"
+        except asyncio.TimeoutError:
+            result["status"], result["error"] = "timeout", f"no response within {timeout:g}s"
+        except Exception as e:
+            result["status"], result["error"] = "error", f"{type(e).__name__}: {e}"
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    result["usage"] = dict(usage)
+    return result
+
+
+async def run_batch(agent, requests, output_path, concurrency: int = 8, timeout: float = 120,
+                    skip: set = frozenset(), progress_every: int = 25) -> dict:
+    """Run ``requests`` through ``agent`` and append results to ``output_path``.
+
+    Args:
+        agent: Coroutine function taking a prompt and returning the response text
+        requests: Iterable of (request_id, prompt) pairs, consumed lazily
+        output_path: Results JSONL file (appended to)
+        concurrency: Maximum requests in flight
+        timeout: Seconds allowed per request
+        skip: Request ids to leave out (already completed)
+
+    Returns:
+        Counts per status plus "skipped" and token totals
+    """
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {"ok": 0, "error": 0, "timeout": 0, "skipped": 0, "prompt_tokens": 0, "completion_tokens": 0,
+             "total_tokens": 0}
+    started = time.perf_counter()
+    out = open_output(output_path)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            result = await run_one(agent, *item, timeout)
+            out.write(json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n")
+            out.flush()
+            stats[result["status"]] += 1
+            for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                stats[field] += result["usage"][field]
+            done = stats["ok"] + stats["error"] + stats["timeout"]
+            if done % progress_every == 0:
+                rate = done / (time.perf_counter() - started)
+                print(f"📊 {done} done ({stats['ok']} ok, {stats['error']} error, {stats['timeout']} timeout) "
+                      f"{rate:.2f} req/s", file=sys.stderr)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        seen = set(skip)
+        for request_id, prompt in requests:
+            if request_id in seen:
+                stats["skipped"] += 1
+                continue
+            seen.add(request_id)
+            await queue.put((request_id, prompt))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        os.fsync(out.fileno())
+        out.close()
+    stats["elapsed_s"] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of quote requests")
+    parser.add_argument("--output", "-o", default="results.jsonl", help="results JSONL (also the checkpoint)")
+    parser.add_argument("--agent", choices=("adk", "direct"), default="adk")
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="requests in flight")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds per request")
+    parser.add_argument("--id-field", help="input field holding the request id")
+    parser.add_argument("--prompt-field", help="input field holding the request text")
+    parser.add_argument("--no-resume", action="store_true", help="re-run ids already completed in --output")
+    parser.add_argument("--quiet", action="store_true", help="silence the agent's own output (progress still shown)")
+    args = parser.parse_args()
+
+    skip = set() if args.no_resume else completed_ids(args.output)
+    if skip:
+        print(f"⏭️  Resuming: {len(skip)} requests already completed in {args.output}", file=sys.stderr)
+    agent = load_agent(args.agent)
+    if args.quiet:
+        sys.stdout = open(os.devnull, "w")
+
+    requests = read_requests(args.input, args.id_field, args.prompt_field)
+    try:
+        stats = asyncio.run(run_batch(agent, requests, args.output, args.concurrency, args.timeout, skip))
+    except KeyboardInterrupt:
+        print(f"\n👋 Interrupted; completed results are in {args.output}, re-run to resume", file=sys.stderr)
+        sys.exit(130)
+    print(f"✅ Batch finished in {stats['elapsed_s']}s: {stats['ok']} ok, {stats['error']} error, "
+          f"{stats['timeout']} timeout, {stats['skipped']} skipped; {stats['total_tokens']} tokens "
+          f"({stats['prompt_tokens']} prompt / {stats['completion_tokens']} completion)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(message)s")
+    main()
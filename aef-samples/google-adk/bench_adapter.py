@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: LLM Gateway adapter overhead
+---------------------------------------
+Per-call cost of the request/response adaptation in gateway_adapter.py,
+i.e. everything LLMGatewayModel does besides waiting for the gateway and
+running tools. Uses in-memory stand-ins for ADK requests and stream chunks,
+so neither google-adk nor a gateway is needed.
+
+    python bench_adapter.py --tools 6 --messages 10 --chunks 100
+"""
+
+import argparse, asyncio, time
+from types import SimpleNamespace as NS
+import gateway_adapter as ga
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def make_request(n_messages: int, n_tools: int):
+    roles = ["user", "model"]
+    contents = [NS(role=roles[i % 2], parts=[NS(text=f"message {i} " * 8)]) for i in range(n_messages)]
+    params = {"type": "object", "properties": {"product_name": {"type": "string"}}, "required": ["product_name"]}
+    tools = [NS(function_declarations=[NS(name=f"tool_{i}", description=f"Tool number {i}", parameters=params)])
+             for i in range(n_tools)]
+    return NS(contents=contents, tools=tools)
+
+
+def text_chunks(n: int) -> list:
+    chunks = [NS(choices=[NS(delta=NS(content="token ", tool_calls=None), finish_reason=None)], usage=None)
+              for _ in range(n)]
+    chunks.append(NS(choices=[NS(delta=NS(content=None, tool_calls=None), finish_reason="stop")], usage=None))
+    chunks.append(NS(choices=[], usage=NS(prompt_tokens=100, completion_tokens=n, total_tokens=100 + n)))
+    return chunks
+
+
+def tool_chunks(n_calls: int) -> list:
+    chunks = []
+    for i in range(n_calls):
+        fragments = ['{"product', '_name": "Office ', 'Chair"}']
+        chunks.append(NS(choices=[NS(delta=NS(content=None, tool_calls=[
+            NS(index=i, id=f"call_{i}", function=NS(name="price_lookup", arguments=fragments[0]))]),
+            finish_reason=None)], usage=None))
+        for fragment in fragments[1:]:
+            chunks.append(NS(choices=[NS(delta=NS(content=None, tool_calls=[
+                NS(index=i, id=None, function=NS(name=None, arguments=fragment))]), finish_reason=None)],
+                usage=None))
+    return chunks
+
+
+def inline_classes():
+    """The previous pattern: adapter classes defined inside every call."""
+    class ADKUsageMetadata:
+        def __init__(self, openai_usage):
+            self.prompt_token_count = openai_usage.prompt_tokens
+
+    class ADKFinishReason:
+        def __init__(self, openai_finish_reason):
+            self.value = openai_finish_reason or "stop"
+
+    class ADKPart:
+        def __init__(self, text):
+            self.text = text
+
+    class ADKContent:
+        def __init__(self, text):
+            self.parts = [ADKPart(text)] if text else []
+
+    class ADKResponse:
+        def __init__(self, text):
+            self.content = ADKContent(text)
+
+    return ADKResponse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", type=int, default=6, help="tools in the request")
+    parser.add_argument("--messages", type=int, default=10, help="messages in the request")
+    parser.add_argument("--chunks", type=int, default=100, help="text chunks per streamed response")
+    parser.add_argument("--tool-calls", type=int, default=3, help="tool calls per streamed response")
+    parser.add_argument("--repeat", type=int, default=5000)
+    args = parser.parse_args()
+    repeat = args.repeat
+
+    request = make_request(args.messages, args.tools)
+    texts, calls = text_chunks(args.chunks), tool_chunks(args.tool_calls)
+    loop = asyncio.new_event_loop()         # StreamedTurn creates an asyncio.Semaphore
+    asyncio.set_event_loop(loop)
+
+    def cold_tools():
+        ga._TOOL_SCHEMAS.clear()
+        ga.openai_tools(request.tools)
+
+    def stream(chunks, partials: bool):
+        turn = ga.StreamedTurn()
+        for chunk in chunks:
+            text = turn.add(chunk)
+            if partials and text:
+                ga.ADKResponse(text, partial=True)
+        return turn
+
+    final = stream(texts, False)
+    results = [
+        ("request: openai_messages", timed(lambda: ga.openai_messages(request.contents), repeat)),
+        ("request: tool schemas (cold)", timed(cold_tools, repeat)),
+        ("request: tool schemas (cached)", timed(lambda: ga.openai_tools(request.tools), repeat)),
+        (f"stream: {args.chunks} text chunks + partials", timed(lambda: stream(texts, True), max(repeat // 10, 50))),
+        (f"stream: {args.tool_calls} tool calls", timed(lambda: stream(calls, False), repeat)),
+        ("response: final ADKResponse + model_dump",
+         timed(lambda: ga.ADKResponse(final.content, final.finish_reason, final.usage).model_dump(), repeat)),
+        ("baseline: classes defined per call (before)", timed(inline_classes, repeat)),
+    ]
+    per_chunk = results[3][1] / max(args.chunks, 1)
+    loop.close()
+
+    print(f"📏 Adapter overhead ({args.messages} messages, {args.tools} tools)")
+    for name, seconds in results:
+        print(f"   {name:<46}{seconds * 1e6:>10.2f} µs")
+    print(f"   {'per streamed chunk':<46}{per_chunk * 1e6:>10.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark: quote codecs
+---------------------------------------
+Encode time, decode time and encoded size per codec (quote_codec.py) for
+synthetic quotes of increasing size. Codecs whose optional package is not
+installed (msgpack) are skipped; compact JSON uses orjson when available.
+
+    python bench_codecs.py --items 1 10 100 1000
+"""
+
+import argparse, time
+from quote_codec import CODECS, decode, encode, get_codec, orjson
+from quote_ids import created_at, new_quote_id
+
+
+def make_quote(n_items: int) -> dict:
+    items = [{"name": f"Product {i}", "sku": f"SKU-{i:05d}", "qty": 10 + i % 90, "unit_price": 125.5 + i,
+              "discount_pct": 5.0, "total": round((10 + i % 90) * (125.5 + i) * 0.95, 2)}
+             for i in range(n_items)]
+    qid = new_quote_id()
+    return {"quote_id": qid, "customer": "ABC Corp", "items": items,
+            "subtotal": sum(i["qty"] * i["unit_price"] for i in items),
+            "total": sum(i["total"] for i in items), "terms": "Net 30", "created_at": created_at(qid)}
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 10, 100, 1000], help="items per quote")
+    parser.add_argument("--ops", type=int, default=20000, help="item-encodes per measurement (sets repeats)")
+    args = parser.parse_args()
+
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError as e:
+            print(f"⏭️  {name}: {e}")
+    print(f"📦 compact JSON encoder: {'orjson' if orjson else 'json (stdlib)'}")
+
+    for n_items in args.items:
+        quote = make_quote(n_items)
+        repeat = max(20, args.ops // max(n_items, 1))
+        print(f"\n🧾 {n_items} items per quote ({repeat} runs)")
+        print(f"   {'codec':<14}{'encode µs':>12}{'decode µs':>12}{'bytes':>10}")
+        for codec in codecs:
+            data = encode(quote, codec)
+            assert decode(data) == {**quote, "schema_version": decode(data)["schema_version"]}
+            enc = timed(lambda: encode(quote, codec), repeat)
+            dec = timed(lambda: decode(data), repeat)
+            print(f"   {codec.name:<14}{enc * 1e6:>12.1f}{dec * 1e6:>12.1f}{len(data):>10,}")
+
+
+if __name__ == "__main__":
+    main()
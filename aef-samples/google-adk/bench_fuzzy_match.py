@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fuzzy product matching
+---------------------------------------
+Compares the FuzzyIndex used by price_lookup against the two scan-based
+matchers it replaced, on a synthetic catalog.
+
+    python bench_fuzzy_match.py --rows 1000000
+"""
+
+import argparse, random, time
+import pandas as pd
+from fuzzy_index import FuzzyIndex
+
+BRANDS = [f"Brand{i}" for i in range(200)]
+STYLES = ["Ergonomic", "Executive", "Compact", "Modular", "Heavy Duty", "Classic",
+          "Modern", "Foldable", "Adjustable", "Premium", "Budget", "Deluxe"]
+MATERIALS = ["Mesh", "Leather", "Oak", "Walnut", "Steel", "Glass", "Bamboo", "Fabric"]
+PRODUCTS = ["Office Chair", "Conference Table", "Developer Desk", "Visitor Stool",
+            "Standing Desk", "Bookshelf", "Filing Cabinet", "Lounge Sofa",
+            "Monitor Arm", "Whiteboard", "Coffee Table", "Bar Stool", "Locker",
+            "Reception Counter", "Storage Bench", "Task Lamp"]
+
+QUERIES = ["Office Chairs", "ergonomic mesh chair", "conference tables",
+           "walnut standing desks", "brand17 deluxe locker", "filing cabnet",
+           "bar stools", "glass whiteboard", "laptop"]
+
+
+def make_catalog(rows: int, seed: int = 7) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    names = [f"{rnd.choice(BRANDS)} {rnd.choice(STYLES)} {rnd.choice(MATERIALS)} "
+             f"{rnd.choice(PRODUCTS)} Mk{rnd.randint(1, 40)}" for _ in range(rows)]
+    return pd.DataFrame({
+        "sku": [f"SKU-{i:07d}" for i in range(rows)],
+        "name": names,
+        "unit_price": [rnd.randint(50, 20000) for _ in range(rows)],
+        "tier": [rnd.choice(["basic", "standard", "premium"]) for _ in range(rows)],
+    })
+
+
+# --- Implementations being replaced (copied from the agents) ---
+def legacy_simple_agent(df: pd.DataFrame, product_name: str):
+    search_terms = [
+        product_name.lower(),
+        product_name.lower().replace('chairs', 'chair'),
+        product_name.lower().replace('tables', 'table'),
+        product_name.lower().replace('desks', 'desk')
+    ]
+    for term in search_terms:
+        hits = df[df["name"].str.lower().str.contains(term)]
+        if not hits.empty:
+            return hits.iloc[0].to_dict()
+    return None
+
+
+def legacy_working_agent(df: pd.DataFrame, product_name: str):
+    search_name = product_name.lower().rstrip('s')
+    for _, row in df.iterrows():
+        row_name = row['name'].lower().rstrip('s')
+        if search_name in row_name or row_name in search_name:
+            return row.to_dict()
+    return None
+
+
+def timed(fn, queries, repeat: int) -> float:
+    """Mean seconds per query."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            fn(q)
+    return (time.perf_counter() - start) / (repeat * len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=100_000,
+                        help="catalog size for the scan-based matchers (iterrows is very slow)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"📦 Building synthetic catalog with {args.rows:,} rows")
+    df = make_catalog(args.rows)
+
+    start = time.perf_counter()
+    index = FuzzyIndex(df["name"].tolist())
+    print(f"🔧 FuzzyIndex build: {time.perf_counter() - start:.2f}s "
+          f"({len(index.vocab):,} tokens, {len(index.grams):,} trigrams)")
+
+    for q in QUERIES:
+        hits = index.search(q, 3)
+        best = f"{df['name'][hits[0][0]]} ({hits[0][1]})" if hits else "-"
+        print(f"   • {q!r:28} -> {best}")
+
+    per_query = timed(lambda q: index.search(q, 5), QUERIES, args.repeat)
+    print(f"\n⚡ FuzzyIndex top-5 @ {args.rows:,} rows: {per_query * 1e3:.3f} ms/query")
+
+    legacy_df = df.head(args.legacy_rows)
+    per_query = timed(lambda q: legacy_simple_agent(legacy_df, q), QUERIES, 1)
+    print(f"🐢 simple_agent str.contains @ {len(legacy_df):,} rows: {per_query * 1e3:.1f} ms/query")
+    per_query = timed(lambda q: legacy_working_agent(legacy_df, q), QUERIES, 1)
+    print(f"🐢 working agent iterrows @ {len(legacy_df):,} rows: {per_query * 1e3:.1f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
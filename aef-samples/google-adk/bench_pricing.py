@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bulk repricing
+---------------------------------------
+Throughput of the vectorized pricing engine versus calling the scalar
+discount logic once per line, on synthetic quote lines.
+
+    python bench_pricing.py --lines 10000000
+"""
+
+import argparse, time
+import numpy as np
+from pricing_engine import get_discount_rules
+
+
+def scalar_reprice(rules, unit_prices, qtys, customer_types, tiers, schedule):
+    totals = []
+    for unit_price, qty, ctype, tier in zip(unit_prices, qtys, customer_types, tiers):
+        _, _, total_discount = rules.discount_for(qty, ctype, schedule, tier)
+        totals.append(unit_price * (1 - total_discount) * qty)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=10_000_000)
+    parser.add_argument("--rules", default=None, help="discount rules JSON (defaults if omitted)")
+    parser.add_argument("--scalar-lines", type=int, default=500_000,
+                        help="lines priced with the per-line loop (it is much slower)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    unit_prices = rng.integers(50, 20000, args.lines).astype(np.float64)
+    qtys = rng.integers(1, 250, args.lines)
+    customer_types = np.where(rng.random(args.lines) < 0.3, "preferred", "regular")
+    tiers = rng.choice(["basic", "standard", "premium"], args.lines)
+    rules = get_discount_rules(args.rules)
+    print(f"📦 {args.lines:,} synthetic quote lines")
+
+    for schedule in rules.schedules():
+        start = time.perf_counter()
+        result = rules.price_lines(unit_prices, qtys, customer_types, schedule, tiers)
+        vector_s = time.perf_counter() - start
+
+        n = min(args.scalar_lines, args.lines)
+        lists = unit_prices[:n].tolist(), qtys[:n].tolist(), customer_types[:n].tolist(), tiers[:n].tolist()
+        start = time.perf_counter()
+        scalar = scalar_reprice(rules, *lists, schedule)
+        scalar_s = time.perf_counter() - start
+        assert np.allclose(scalar, result["total"][:n])
+
+        print(f"\n💰 schedule={schedule}")
+        print(f"   ⚡ vectorized: {vector_s:.3f}s for {args.lines:,} lines ({args.lines / vector_s / 1e6:.1f}M lines/s)")
+        print(f"   🐢 per-line:   {scalar_s:.3f}s for {n:,} lines ({n / scalar_s / 1e6:.2f}M lines/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Product Catalog
+---------------------------------------
+Process-wide, in-memory product catalog shared by the quoting agents.
+Loads products.csv once (through its memory-mapped column store), indexes
+it by SKU and normalized name, and only reloads when the file's mtime or
+size changes. Reloads run in a background thread; lookups keep using the
+previous load until the new one is complete.
+
+The semantic index is built off the request path: by a background thread
+started on the first lexical miss, or ahead of time with
+
+    python catalog.py embed data/products.csv
+"""
+
+import os, sys, threading
+from pathlib import Path
+from columnar_store import load_table
+from fuzzy_index import FuzzyIndex, normalize_text
+from semantic_search import SemanticIndex, get_embedder, get_embedding_cache
+
+MIN_MATCH_SCORE = 0.3   # fuzzy score below which a lookup counts as a miss
+MAX_SUGGESTIONS = 5
+
+
+def normalize_name(name) -> str:
+    """Normalize a product name so "Office Chairs" and "office chair" agree."""
+    return normalize_text(name)
+
+
+class CatalogSnapshot:
+    """One immutable load of the catalog file.
+
+    Lookups only ever hold a reference to a complete snapshot, so a reload
+    running in another thread can never expose a half-built index.
+    """
+
+    def __init__(self, table, stat_key: tuple, embeddings_dir=None):
+        self.stat_key = stat_key
+        self.embeddings_dir = embeddings_dir
+        self._semantic = {}
+        self._semantic_jobs = {}
+        self._semantic_lock = threading.Lock()
+        self.fields = list(table.columns)
+        # Only the key columns are decoded into python lists; everything
+        # else stays as memory-mapped store columns read per row.
+        self._columns = {c: table[c] for c in self.fields}
+        self._columns["sku"] = table["sku"].tolist()
+        self._columns["name"] = table["name"].tolist()
+        self.by_sku = {}
+        self.by_name = {}
+        for i, (sku, name) in enumerate(zip(self._columns["sku"], self._columns["name"])):
+            self.by_sku.setdefault(str(sku).upper(), i)
+            self.by_name.setdefault(normalize_name(name), i)
+        self.index = FuzzyIndex(self._columns["name"])
+
+    def __len__(self):
+        return len(self._columns["sku"])
+
+    def row(self, i: int) -> dict:
+        """Return row ``i`` as a plain, JSON-serializable dict."""
+        row = {}
+        for c in self.fields:
+            v = self._columns[c][i]
+            row[c] = v.item() if hasattr(v, "item") else v
+        return row
+
+    def names(self) -> list:
+        return self._columns["name"]
+
+    def get(self, key: str):
+        """Exact lookup by SKU or normalized product name; None if absent."""
+        i = self.by_sku.get(str(key).strip().upper())
+        if i is None:
+            i = self.by_name.get(normalize_name(key))
+        return None if i is None else self.row(i)
+
+    def search(self, query: str, top_k: int = 5) -> list:
+        """Ranked fuzzy matches as ``(row_dict, score)`` pairs."""
+        return [(self.row(i), score) for i, score in self.index.search(query, top_k)]
+
+    def build_semantic_index(self, embedder) -> SemanticIndex:
+        """Build (or return) the embedding index for this snapshot.
+
+        Vectors come from the on-disk cache, so after a reload only rows
+        whose names changed are sent to the embedder.
+        """
+        index = self._semantic.get(embedder.model)
+        if index is None:
+            cache = get_embedding_cache(self.embeddings_dir, embedder.model)
+            index = self._semantic[embedder.model] = SemanticIndex(self.names(), embedder, cache)
+        return index
+
+    def _build_in_background(self, embedder):
+        try:
+            index = self.build_semantic_index(embedder)
+            print(f"🧭 Semantic index ready ({len(self):,} products, {index.embedded:,} newly embedded)")
+        except Exception as e:
+            print(f"⚠️  Semantic index build failed: {e}")
+            with self._semantic_lock:
+                self._semantic_jobs.pop(embedder.model, None)   # a later miss retries
+
+    def semantic_index(self, embedder):
+        """Embedding index for this snapshot, or None until it is built.
+
+        The first call starts the build in a background thread, so a lookup
+        never waits for the catalog to be embedded.
+        """
+        index = self._semantic.get(embedder.model)
+        if index is not None:
+            return index
+        with self._semantic_lock:
+            if embedder.model not in self._semantic_jobs:
+                job = threading.Thread(target=self._build_in_background, args=(embedder,), daemon=True,
+                                       name="semantic-index")
+                self._semantic_jobs[embedder.model] = job
+                job.start()
+        return None
+
+    def best_match(self, query: str, embedder=None):
+        """Resolve ``query`` to one row.
+
+        Returns ``(row, suggestions)``: ``row`` is the exact match or the
+        best fuzzy hit that matches every query token (None on a miss) and
+        ``suggestions`` lists close product names.
+        With an ``embedder``, lexical misses fall back to semantic search
+        once the semantic index has been built.
+        """
+        exact = self.get(query)
+        if exact:
+            return exact, []
+        hits = self.index.search(query, MAX_SUGGESTIONS)
+        names = self.names()
+        for i, score in hits:
+            # A fuzzy hit must also match every query token (allowing typos); names that
+            # only share a word ("Office Printer" vs "Office Chair") are suggestions.
+            if score >= MIN_MATCH_SCORE and self.index.covers(query, names[i]):
+                return self.row(i), []
+        if embedder is not None and self.embeddings_dir is not None:
+            try:
+                index = self.semantic_index(embedder)
+                semantic = index.search(query, MAX_SUGGESTIONS) if index is not None else []
+            except Exception as e:
+                print(f"⚠️  Semantic search unavailable: {e}")
+                semantic = []
+            if semantic and semantic[0][1] >= embedder.min_score:
+                return self.row(semantic[0][0]), []
+            hits = hits or semantic
+        if hits:
+            return None, [names[i] for i, _ in hits]
+        return None, names[:MAX_SUGGESTIONS]
+
+    def best_matches(self, queries, embedder=None) -> list:
+        """``best_match`` for many queries against this one snapshot.
+
+        Queries that normalize to the same text are resolved once. The
+        remaining names go through the index one by one: each lookup only
+        touches the posting lists of its own tokens (about 0.5 ms at 200k
+        rows, see bench_fuzzy_match.py), so a batched search would save
+        little for quote-sized batches.
+        """
+        keys = [normalize_name(q) for q in queries]
+        resolved = {}
+        for key, query in zip(keys, queries):
+            if key not in resolved:
+                resolved[key] = self.best_match(query, embedder)
+        return [resolved[key] for key in keys]
+
+
+class ProductCatalog:
+    """Hot-reloading wrapper around a products CSV."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    def _stat_key(self) -> tuple:
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, stat_key: tuple) -> CatalogSnapshot:
+        embeddings_dir = self.path.with_name(self.path.stem + ".embeddings")
+        return CatalogSnapshot(load_table(self.path), stat_key, embeddings_dir)
+
+    def _reload_in_background(self, key: tuple):
+        try:
+            self._snapshot = self._load(key)  # atomic reference swap
+        except Exception as e:
+            print(f"⚠️  Catalog reload of {self.path} failed, serving the previous load: {e}")
+        finally:
+            with self._lock:
+                self._reloading = False     # the next call retries if still stale
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Return the current snapshot.
+
+        When the file has changed, one background thread loads the new
+        snapshot while lookups keep getting the previous one; only the very
+        first load, with nothing to serve yet, blocks the caller.
+        """
+        key = self._stat_key()
+        snap = self._snapshot
+        if snap is not None and snap.stat_key == key:
+            return snap
+        with self._lock:
+            snap = self._snapshot
+            if snap is None:
+                snap = self._snapshot = self._load(key)
+            elif snap.stat_key != key and not self._reloading:
+                # Stat is taken before reading, so a write that lands during
+                # the load just triggers another reload on a later call.
+                self._reloading = True
+                threading.Thread(target=self._reload_in_background, args=(key,), daemon=True,
+                                 name="catalog-reload").start()
+        return snap
+
+    def get(self, key: str):
+        return self.snapshot().get(key)
+
+
+_CATALOGS = {}
+_CATALOGS_LOCK = threading.Lock()
+
+
+def get_catalog(path) -> ProductCatalog:
+    """Return the process-wide catalog for ``path``."""
+    key = str(Path(path).resolve())
+    catalog = _CATALOGS.get(key)
+    if catalog is None:
+        with _CATALOGS_LOCK:
+            catalog = _CATALOGS.setdefault(key, ProductCatalog(path))
+    return catalog
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "embed":
+        print(__doc__)
+        sys.exit(1)
+    embedder = get_embedder()
+    if embedder is None:
+        sys.exit("SEMANTIC_EMBEDDER is off")
+    for arg in sys.argv[2:]:
+        index = ProductCatalog(arg).snapshot().build_semantic_index(embedder)
+        print(f"✅ {arg}: {index.embedded:,} products embedded with {embedder.model}")
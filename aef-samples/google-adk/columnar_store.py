@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Columnar Store
+---------------------------------------
+Compiles the editable CSV files (products.csv, historical_quotes.csv) into a
+memory-mapped NumPy layout next to them, e.g. data/products.colstore/:
+
+    meta.json            source CSV stat, row count and column kinds
+    <col>.npy            numeric / boolean columns
+    <col>.data.npy       string columns: concatenated UTF-8 bytes ...
+    <col>.offsets.npy    ... and int64 row offsets (rows + 1)
+
+Readers open the arrays with mmap_mode="r", so numeric columns are shared
+zero-copy page cache across workers. The CSV stays the source of truth: a
+store whose recorded mtime/size no longer matches its CSV is recompiled.
+
+    python columnar_store.py data/products.csv data/historical_quotes.csv
+"""
+
+import json, os, shutil, sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+STORE_SUFFIX = ".colstore"
+META_FILE = "meta.json"
+
+
+def store_dir_for(csv_path) -> Path:
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.stem + STORE_SUFFIX)
+
+
+def _source_stat(csv_path) -> dict:
+    st = os.stat(csv_path)
+    return {"source_mtime_ns": st.st_mtime_ns, "source_size": st.st_size}
+
+
+class StringColumn:
+    """Read-only string column backed by a byte buffer and row offsets."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.data[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def tolist(self) -> list:
+        buf = self.data.tobytes().decode("utf-8")
+        # Offsets are byte positions; decode once and slice by characters
+        # only when the buffer is pure ASCII (the common case).
+        if len(buf) == len(self.data):
+            bounds = self.offsets.tolist()
+            return [buf[a:b] for a, b in zip(bounds, bounds[1:])]
+        return [self[i] for i in range(len(self))]
+
+
+class ColumnStore:
+    """A compiled table: ``store["col"]`` returns a memory-mapped column."""
+
+    def __init__(self, path, meta: dict):
+        self.path = Path(path)
+        self.meta = meta
+        self.columns = [c["name"] for c in meta["columns"]]
+        self._kinds = {c["name"]: c["kind"] for c in meta["columns"]}
+        self._cache = {}
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def __getitem__(self, name: str):
+        col = self._cache.get(name)
+        if col is None:
+            if self._kinds[name] == "str":
+                col = StringColumn(np.load(self.path / f"{name}.data.npy", mmap_mode="r"),
+                                   np.load(self.path / f"{name}.offsets.npy", mmap_mode="r"))
+            else:
+                col = np.load(self.path / f"{name}.npy", mmap_mode="r")
+            self._cache[name] = col
+        return col
+
+    def to_frame(self) -> pd.DataFrame:
+        """Materialize as a DataFrame (copies string columns)."""
+        return pd.DataFrame({c: (self[c].tolist() if self._kinds[c] == "str" else self[c])
+                             for c in self.columns})
+
+
+def compile_csv(csv_path, store_dir=None) -> Path:
+    """Compile ``csv_path`` into a column store and return its directory."""
+    csv_path = Path(csv_path)
+    store_dir = Path(store_dir) if store_dir else store_dir_for(csv_path)
+    stat = _source_stat(csv_path)
+    df = pd.read_csv(csv_path)
+
+    tmp = store_dir.with_name(f"{store_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        if series.dtype.kind in "biuf":
+            np.save(tmp / f"{name}.npy", series.to_numpy())
+            columns.append({"name": name, "kind": "num", "dtype": str(series.dtype)})
+        else:
+            encoded = [("" if pd.isna(v) else str(v)).encode("utf-8") for v in series]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+            np.save(tmp / f"{name}.data.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+            np.save(tmp / f"{name}.offsets.npy", offsets)
+            columns.append({"name": name, "kind": "str"})
+    meta = {"source": csv_path.name, "rows": len(df), "columns": columns, **stat}
+    (tmp / META_FILE).write_text(json.dumps(meta, indent=2))
+
+    # Swap the finished directory in; readers that already mapped the old
+    # files keep valid mappings after they are unlinked.
+    old = store_dir.with_name(f"{store_dir.name}.old-{os.getpid()}")
+    try:
+        if store_dir.exists():
+            os.rename(store_dir, old)
+        os.rename(tmp, store_dir)
+    except OSError:
+        # Another process swapped in its own compile first; keep that one.
+        shutil.rmtree(tmp, ignore_errors=True)
+    shutil.rmtree(old, ignore_errors=True)
+    return store_dir
+
+
+def open_store(store_dir):
+    """Open a compiled store, or return None if it is missing or unreadable."""
+    store_dir = Path(store_dir)
+    try:
+        meta = json.loads((store_dir / META_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+    return ColumnStore(store_dir, meta)
+
+
+def is_fresh(csv_path, store) -> bool:
+    return store is not None and all(store.meta.get(k) == v for k, v in _source_stat(csv_path).items())
+
+
+def compile_if_stale(csv_path) -> Path:
+    """Recompile the store for ``csv_path`` only when the CSV has changed."""
+    store_dir = store_dir_for(csv_path)
+    if not is_fresh(csv_path, open_store(store_dir)):
+        compile_csv(csv_path, store_dir)
+    return store_dir
+
+
+def load_table(csv_path) -> ColumnStore:
+    """Open the up-to-date column store for ``csv_path``, compiling if needed."""
+    store = open_store(store_dir_for(csv_path))
+    if not is_fresh(csv_path, store):
+        store = open_store(compile_csv(csv_path))
+    return store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    for arg in sys.argv[1:]:
+        out = compile_csv(arg)
+        print(f"✅ {arg} -> {out} ({open_store(out).meta['rows']:,} rows)")
@@ -0,0 +1,112 @@
+"""
+LLM-free Fast Path
+---------------------------------------
+Deterministic parser for well-formed quote requests such as
+
+    "Create a quote for 120 Office Chairs for ABC Corp, preferred customer"
+    "Generate quote for TechStart Inc (regular customer): 50 Office Chairs and 10 Conference Tables"
+
+When every part of the request (quantities, products, customer, customer
+type) is recognized with confidence, the agent can run its tools directly
+and skip the LLM Gateway. Anything ambiguous returns None so the caller
+falls back to the LLM. Disable with FAST_PATH=off.
+"""
+
+import os, re
+from fuzzy_index import normalize_tokens
+
+MIN_PRODUCT_SCORE = 0.85   # fuzzy score needed to trust a product without the LLM
+MAX_CUSTOMER_WORDS = 5
+
+_VERB = r"(?:please\s+)?(?:(?:create|generate|make|prepare|need|want|i\s+need|i\s+want)\s+)?(?:a\s+)?(?:quote|quotation)?"
+_ITEMS_FIRST = re.compile(
+    rf"^{_VERB}\s*(?:for\s+)?(?P<items>\d.*?)\s+for\s+(?P<customer>[^,.;:()]+?)\s*(?P<rest>(?:[,.;(].*)?)$",
+    re.IGNORECASE | re.DOTALL)
+_CUSTOMER_FIRST = re.compile(
+    rf"^{_VERB}\s*for\s+(?P<customer>[^,.;:()]+?)\s*(?P<rest>\([^)]*\))?\s*:\s*(?P<items>\d.*?)[.!]?$",
+    re.IGNORECASE | re.DOTALL)
+_ITEM = re.compile(r"^(?P<qty>\d[\d,]*)\s*(?:x\s+)?(?P<product>[a-z].*)$", re.IGNORECASE)
+_ITEM_SPLIT = re.compile(r"\s*(?:,|;|&|\band\b|\bplus\b)\s*", re.IGNORECASE)
+_CUSTOMER_TYPES = {"preferred", "regular"}
+# Words allowed around the customer type without making the request ambiguous.
+_FILLER = {"they", "are", "is", "it", "a", "an", "the", "customer", "client", "account", "please",
+           "create", "generate", "complete", "full", "quote", "with", "discount", "and", "thank",
+           "thanks", "you", "apply", "applicable", "include", "including", "for"}
+# A customer name is a short run of capitalized words ("ABC Corp", "Bank of
+# America"); anything else after "for" is probably not a name at all.
+_NAME_CONNECTORS = {"of", "and", "the", "&"}
+_NOT_IN_NAME = _CUSTOMER_TYPES | {"with", "without", "for", "but", "by", "at", "on", "to", "from", "in", "my",
+                                  "our", "your", "their", "his", "her", "next", "this", "please", "customer",
+                                  "client", "discount", "off", "delivery"}
+
+
+def enabled() -> bool:
+    return os.environ.get("FAST_PATH", "on").lower() != "off"
+
+
+def _customer_name(text: str):
+    """``text`` if it looks like a company name, else None."""
+    words = text.split()
+    if not words or len(words) > MAX_CUSTOMER_WORDS or re.search(r"[\d%]", text):
+        return None
+    for word in words:
+        if word.lower().strip("'.-") in _NOT_IN_NAME:
+            return None
+        if not word[0].isupper() and word.lower() not in _NAME_CONNECTORS:
+            return None
+    return text
+
+
+def _customer_type(rest: str):
+    """Customer type from the trailing text, or False if it says anything else."""
+    words = normalize_tokens(rest)
+    types = {w for w in words if w in _CUSTOMER_TYPES}
+    if len(types) > 1 or any(w not in _FILLER and w not in _CUSTOMER_TYPES for w in words):
+        return False
+    return types.pop() if types else "regular"
+
+
+def parse_quote_request(text: str, catalog) -> dict:
+    """Parse ``text`` against a catalog snapshot.
+
+    Returns ``{"customer", "customer_type", "items": [{"qty", "product"}]}``
+    with ``product`` being the catalog row, or None if the request is not
+    unambiguously understood.
+    """
+    text = " ".join(text.strip().split())
+    match = _CUSTOMER_FIRST.match(text) or _ITEMS_FIRST.match(text)
+    if not match:
+        return None
+
+    customer = _customer_name(match.group("customer").strip())
+    if not customer:
+        return None
+    customer_type = _customer_type(match.group("rest") or "")
+    if not customer_type:
+        return None
+
+    items = []
+    for part in _ITEM_SPLIT.split(match.group("items")):
+        item = _ITEM.match(part.strip())
+        if not item:
+            return None
+        qty = int(item.group("qty").replace(",", ""))
+        product = catalog.get(item.group("product"))
+        if product is None:
+            hits = catalog.search(item.group("product"), top_k=2)
+            if not hits or hits[0][1] < MIN_PRODUCT_SCORE or (len(hits) > 1 and hits[1][1] == hits[0][1]):
+                return None
+            product = hits[0][0]
+        if qty <= 0:
+            return None
+        items.append({"qty": qty, "product": product})
+    return {"customer": customer, "customer_type": customer_type, "items": items}
+
+
+def format_summary(quote: dict, customer_type: str) -> str:
+    """Human-readable confirmation, in place of the LLM's final message."""
+    lines = [f"✅ Quote {quote['quote_id']} created for {quote['customer']} ({customer_type} customer):"]
+    for item in quote["items"]:
+        lines.append(f"- {item['qty']} x {item['name']} @ ${item['unit_price']:,} = ${item['total']:,.2f}")
+    lines.append(f"Total: ${quote['total']:,.2f}")
+    return "\n".join(lines)
@@ -0,0 +1,129 @@
+"""
+File Utilities
+---------------------------------------
+Crash-safe and multi-process-safe file writes shared by the quote store
+and the history index.
+
+- atomic_write: write a temp file in the same directory, fsync, then
+  os.replace() it into place, so readers see the old file or the complete
+  new one and never a torn write. Temp names start with "." and end in
+  ".tmp", so they never match the n8n monitor's 'Q-*.json' pattern.
+- atomic_write_many: the same for a batch, with one directory fsync.
+- locked_append: append under an exclusive flock() on a sidecar lock file,
+  deciding whether to write the CSV header while holding the lock.
+"""
+
+import csv, io, os, threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: fall back to in-process locking only
+    fcntl = None
+
+_THREAD_LOCKS = {}
+_THREAD_LOCKS_GUARD = threading.Lock()
+
+
+def _fsync_dir(path: Path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+
+
+def atomic_write_many(files: list, fsync: bool = True):
+    """Atomically write ``[(path, data), ...]`` (data is str or bytes).
+
+    Every temp file is written before any is fsynced, so the kernel can
+    coalesce the flushes, and each parent directory is fsynced once.
+    """
+    staged = []
+    try:
+        for path, data in files:
+            path = Path(path)
+            tmp = _tmp_path(path)
+            with open(tmp, "wb") as f:
+                f.write(data.encode("utf-8") if isinstance(data, str) else data)
+            staged.append((tmp, path))
+        if fsync:
+            for tmp, _ in staged:
+                fd = os.open(tmp, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        for tmp, path in staged:
+            os.replace(tmp, path)
+    except BaseException:
+        for tmp, _ in staged:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        raise
+    if fsync:
+        for parent in {path.parent for _, path in staged}:
+            _fsync_dir(parent)
+
+
+def atomic_write(path, data, fsync: bool = True):
+    """Atomically replace ``path`` with ``data`` (str or bytes)."""
+    atomic_write_many([(path, data)], fsync=fsync)
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on ``<path>.lock`` across threads and processes."""
+    lock_path = Path(f"{path}.lock")
+    with _THREAD_LOCKS_GUARD:
+        thread_lock = _THREAD_LOCKS.setdefault(str(lock_path.resolve()), threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(lock_path, "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def locked_append(path, text: str, header: str = None, fsync: bool = False):
+    """Append ``text`` to ``path`` under ``file_lock``.
+
+    ``header`` is written first only if the file is empty at that moment,
+    which is decided while holding the lock so concurrent writers can never
+    emit it twice. Returns the file size after the append.
+    """
+    with file_lock(path):
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if header and os.fstat(fd).st_size == 0:
+                text = header + text
+            os.write(fd, text.encode("utf-8"))
+            if fsync:
+                os.fsync(fd)
+            return os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+
+def csv_line(fields: list, row: dict = None, lineterminator: str = "\r\n") -> str:
+    """One CSV line for ``row`` (or the header when ``row`` is None)."""
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore", lineterminator=lineterminator)
+    w.writerow(row) if row is not None else w.writeheader()
+    return buf.getvalue()
@@ -0,0 +1,178 @@
+"""
+Fuzzy Product Matching
+---------------------------------------
+Token + character-trigram inverted index used by price_lookup.
+Query tokens are resolved against the catalog vocabulary (exactly, or by
+trigram similarity for typos), and only rows in the matching posting lists
+are scored, so lookups no longer scan the whole catalog.
+"""
+
+import math, re
+import numpy as np
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_KEEP_S = ("ss", "us", "is")
+
+
+def singularize(token: str) -> str:
+    """Cheap English singularization: chairs->chair, benches->bench, ..."""
+    if len(token) <= 3 or token.isdigit():
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith(("sses", "ches", "shes", "xes", "zes")):
+        return token[:-2]
+    if token.endswith("s") and not token.endswith(_KEEP_S):
+        return token[:-1]
+    return token
+
+
+def normalize_tokens(text) -> list:
+    """Lowercase, strip punctuation and singularize every token."""
+    return [singularize(t) for t in _NON_ALNUM.sub(" ", str(text).lower()).split()]
+
+
+def normalize_text(text) -> str:
+    return " ".join(normalize_tokens(text))
+
+
+def trigrams(token: str) -> set:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _contains(postings: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Boolean mask of ``rows`` that appear in sorted ``postings``."""
+    idx = np.searchsorted(postings, rows)
+    idx[idx == len(postings)] = 0
+    return postings[idx] == rows
+
+
+class FuzzyIndex:
+    """Inverted index over a list of product names.
+
+    ``search`` returns ``(row, score)`` pairs, best first, with scores in
+    ``[0, 1]``; 1.0 means every query token matched a one-to-one name.
+
+    Rows are renumbered internally by token count, so posting lists are
+    ordered shortest-name first. Among rows matching every query token the
+    shortest names score best, which lets ``search`` stop scanning as soon
+    as it has ``top_k`` full matches instead of walking whole postings.
+    """
+
+    MAX_EXPANSIONS = 3      # vocabulary tokens tried per misspelled token
+    MIN_TOKEN_SIM = 0.4     # trigram Jaccard needed to accept a typo match
+    CHUNK = 4096            # lead-posting rows intersected per step
+    MAX_PARTIAL = 2048      # rows per token scored when no row matches all
+
+    def __init__(self, names):
+        row_tokens = [set(normalize_tokens(name)) for name in names]
+        row_len = np.fromiter((len(t) for t in row_tokens), dtype=np.int32, count=len(row_tokens))
+        self.rows = np.argsort(row_len, kind="stable").astype(np.int32)  # internal id -> row
+        self.row_len = row_len[self.rows]
+
+        vocab = {}
+        postings = []
+        for doc, row in enumerate(self.rows.tolist()):
+            for tok in row_tokens[row]:
+                tid = vocab.get(tok)
+                if tid is None:
+                    tid = vocab[tok] = len(postings)
+                    postings.append([])
+                postings[tid].append(doc)
+
+        self.vocab = vocab
+        self.tokens = list(vocab)
+        # Docs are visited in order, so every posting list is already sorted.
+        self.postings = [np.asarray(p, dtype=np.int32) for p in postings]
+        n = max(len(names), 1)
+        self.idf = np.array([math.log(1 + n / len(p)) for p in postings])
+        self.max_idf = math.log(1 + n)
+
+        grams = {}
+        for tid, tok in enumerate(self.tokens):
+            for g in trigrams(tok):
+                grams.setdefault(g, []).append(tid)
+        self.grams = {g: np.asarray(t, dtype=np.int32) for g, t in grams.items()}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def expand(self, token: str) -> list:
+        """Vocabulary tokens matching ``token`` as ``(token_id, similarity)``."""
+        tid = self.vocab.get(token)
+        if tid is not None:
+            return [(tid, 1.0)]
+        q = trigrams(token)
+        hits = [self.grams[g] for g in q if g in self.grams]
+        if not hits:
+            return []
+        tids, common = np.unique(np.concatenate(hits), return_counts=True)
+        sizes = np.array([len(self.tokens[t]) for t in tids])
+        sim = common / (len(q) + sizes - common)
+        keep = np.argsort(-sim)[:self.MAX_EXPANSIONS]
+        return [(int(tids[i]), float(sim[i])) for i in keep if sim[i] >= self.MIN_TOKEN_SIM]
+
+    def covers(self, query: str, name) -> bool:
+        """Whether every token of ``query`` matches a token of ``name``,
+        exactly or as a typo of it."""
+        tokens = set(normalize_tokens(name))
+        return all(tok in tokens or any(self.tokens[t] in tokens for t, _ in self.expand(tok))
+                   for tok in dict.fromkeys(normalize_tokens(query)))
+
+    def _full_matches(self, group_docs: list, top_k: int) -> np.ndarray:
+        """First ``top_k``-ish docs containing every group, shortest first."""
+        lead, rest = group_docs[0], group_docs[1:]
+        found, total = [], 0
+        for start in range(0, len(lead), self.CHUNK):
+            chunk = lead[start:start + self.CHUNK]
+            for docs in rest:
+                chunk = chunk[_contains(docs, chunk)]
+                if not len(chunk):
+                    break
+            if len(chunk):
+                found.append(chunk)
+                total += len(chunk)
+                if total >= top_k:
+                    break
+        return np.concatenate(found) if found else lead[:0]
+
+    def search(self, query: str, top_k: int = 5) -> list:
+        groups = []
+        query_weight = 0.0
+        for tok in dict.fromkeys(normalize_tokens(query)):
+            exp = self.expand(tok)
+            query_weight += max((self.idf[t] for t, _ in exp), default=self.max_idf)
+            if exp:
+                groups.append([(self.postings[t], self.idf[t] * sim) for t, sim in exp])
+        if not groups or top_k <= 0:
+            return []
+
+        groups.sort(key=lambda g: sum(len(p) for p, _ in g))
+        group_docs = [g[0][0] if len(g) == 1 else np.unique(np.concatenate([p for p, _ in g]))
+                      for g in groups]
+        candidates = self._full_matches(group_docs, top_k)
+        if len(candidates) < top_k and len(groups) > 1:
+            # Not enough rows match every token: rank partial matches from
+            # the head (shortest names) of each token's postings.
+            extra = [candidates] + [docs[:self.MAX_PARTIAL] for docs in group_docs]
+            candidates = np.unique(np.concatenate(extra))
+
+        matched_weight = np.zeros(len(candidates))
+        matched_tokens = np.zeros(len(candidates))
+        for group in groups:
+            best = np.zeros(len(candidates))
+            for docs, weight in group:
+                best = np.maximum(best, _contains(docs, candidates) * weight)
+            matched_weight += best
+            matched_tokens += best > 0
+        coverage = matched_weight / query_weight
+        precision = np.minimum(1.0, matched_tokens / self.row_len[candidates])
+        scores = 0.8 * coverage + 0.2 * precision
+
+        if len(scores) > top_k:
+            top = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.lexsort((candidates[top], -scores[top]))]
+        return [(int(self.rows[candidates[i]]), round(float(scores[i]), 4)) for i in top]
@@ -0,0 +1,206 @@
+"""
+Gateway Adapter
+---------------------------------------
+Request and response adaptation between Google ADK and the OpenAI-style
+LLM Gateway, used by LLMGatewayModel in simple_agent.py:
+
+- ``openai_messages`` / ``openai_tools`` convert an ADK request. Tool
+  schemas are built once per tool set (keyed by tool names and
+  descriptions) and reused for every later request.
+- ``StreamedTurn`` assembles one streamed completion: text, tool calls,
+  finish reason and usage. ``snapshot``/``restore`` convert it to and from
+  the form kept in llm_cache.
+- ``ADKResponse`` and friends are the response objects handed back to
+  ADK; they are module-level ``__slots__`` types.
+
+Diagnostics go to the ``gateway`` logger; set GATEWAY_LOG_LEVEL=DEBUG to
+see every request, round and tool result (default WARNING). Measure the
+per-call overhead with ``python bench_adapter.py``.
+"""
+
+import asyncio, json, logging, os, threading
+
+log = logging.getLogger("gateway")
+log.setLevel(os.environ.get("GATEWAY_LOG_LEVEL", "WARNING").upper())
+
+ROLES = {"user": "user", "model": "assistant", "system": "system"}
+_TOOL_SCHEMAS = {}
+_TOOL_SCHEMAS_LOCK = threading.Lock()
+_TOOL_SCHEMAS_MAX = 64
+
+
+def openai_messages(contents) -> list:
+    """ADK contents as OpenAI chat messages."""
+    return [{"role": ROLES[c.role], "content": c.parts[0].text} for c in contents if c.role in ROLES]
+
+
+def _schema_json(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    return str(value)
+
+
+def openai_tools(adk_tools):
+    """OpenAI tool schemas for ``adk_tools`` (None when there are none), cached per tool set."""
+    if not adk_tools:
+        return None
+    decls = [tool.function_declarations[0] for tool in adk_tools]
+    params = [d.parameters if hasattr(d, "parameters") else {} for d in decls]
+    # Parameters are part of the key: a signature change with an unchanged docstring must rebuild.
+    key = tuple((d.name, d.description, json.dumps(p, sort_keys=True, default=_schema_json))
+                for d, p in zip(decls, params))
+    schemas = _TOOL_SCHEMAS.get(key)
+    if schemas is None:
+        schemas = [{"type": "function",
+                    "function": {"name": d.name, "description": d.description, "parameters": p}}
+                   for d, p in zip(decls, params)]
+        with _TOOL_SCHEMAS_LOCK:
+            if len(_TOOL_SCHEMAS) >= _TOOL_SCHEMAS_MAX:
+                _TOOL_SCHEMAS.clear()
+            _TOOL_SCHEMAS[key] = schemas
+        log.debug("🔧 Tool schemas built for: %s", ", ".join(name for name, _, _ in key))
+    return schemas
+
+
+class StreamedTurn:
+    """Text, tool calls, finish reason and usage assembled from one streamed completion."""
+    __slots__ = ("text", "tool_calls", "finish_reason", "usage", "usage_chunk", "last_chunk", "tool_slots")
+
+    def __init__(self, tool_concurrency: int = 4):
+        self.text = []
+        self.tool_calls = {}     # stream index -> {"id", "name", "arguments", "task"}
+        self.finish_reason = None
+        self.usage = None
+        self.usage_chunk = self.last_chunk = None
+        self.tool_slots = asyncio.Semaphore(tool_concurrency)
+
+    @property
+    def content(self) -> str:
+        return "".join(self.text)
+
+    def tool_call(self, index, call_id=None) -> dict:
+        """The call a tool-call delta belongs to (deltas without an index
+        start a new call when they carry an id, else continue the last one)."""
+        if index is None:
+            index = len(self.tool_calls) if call_id or not self.tool_calls else len(self.tool_calls) - 1
+        return self.tool_calls.setdefault(index, {"id": "", "name": "", "arguments": "", "task": None})
+
+    def add(self, chunk) -> str:
+        """Fold one stream chunk into the turn; returns its new text ("" if none)."""
+        self.last_chunk = chunk
+        if getattr(chunk, "usage", None):
+            self.usage_chunk = chunk
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return ""
+        choice = chunk.choices[0]
+        if choice.finish_reason:
+            self.finish_reason = choice.finish_reason
+        delta = choice.delta
+        for tc in delta.tool_calls or ():
+            call = self.tool_call(tc.index, tc.id)
+            if tc.id:
+                call["id"] = tc.id
+            function = tc.function
+            if function and function.name:
+                call["name"] = function.name
+            if function and function.arguments:
+                call["arguments"] += function.arguments
+        if delta.content:
+            self.text.append(delta.content)
+            return delta.content
+        return ""
+
+    def calls(self) -> list:
+        return [self.tool_calls[i] for i in sorted(self.tool_calls)]
+
+    def snapshot(self) -> dict:
+        """JSON-serializable form of the finished turn (what llm_cache stores)."""
+        return {"text": self.content, "finish_reason": self.finish_reason,
+                "tool_calls": [{"id": c["id"], "name": c["name"], "arguments": c["arguments"]} for c in self.calls()]}
+
+    def restore(self, snapshot: dict):
+        """Refill the turn from a ``snapshot`` (a cache hit uses no tokens, so no usage)."""
+        self.text = [snapshot["text"]] if snapshot["text"] else []
+        self.finish_reason = snapshot["finish_reason"]
+        self.tool_calls = {i: {**call, "task": None} for i, call in enumerate(snapshot["tool_calls"])}
+
+
+class ADKUsageMetadata:
+    __slots__ = ("prompt_token_count", "candidates_token_count", "total_token_count")
+
+    def __init__(self, openai_usage):
+        self.prompt_token_count = openai_usage.prompt_tokens
+        self.candidates_token_count = openai_usage.completion_tokens
+        self.total_token_count = openai_usage.total_tokens
+
+
+class ADKFinishReason:
+    __slots__ = ("value",)
+
+    def __init__(self, openai_finish_reason):
+        self.value = openai_finish_reason or "stop"
+
+
+class ADKPart:
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+
+class ADKContent:
+    __slots__ = ("parts",)
+
+    def __init__(self, text):
+        self.parts = [ADKPart(text)] if text else []
+
+
+class ADKResponse:
+    """Response wrapper to match Google ADK expected format.
+
+    Partial responses carry only the newly streamed text; the final one
+    carries the whole text, finish reason and usage.
+    """
+    __slots__ = ("usage_metadata", "finish_reason", "content", "partial")
+
+    def __init__(self, text, finish_reason=None, usage=None, partial=False):
+        self.usage_metadata = ADKUsageMetadata(usage) if usage else None
+        self.finish_reason = None if partial else ADKFinishReason(finish_reason)
+        self.content = ADKContent(text)
+        self.partial = partial
+
+    def model_dump(self, exclude_none=True):
+        """Pydantic-style model_dump method expected by Google ADK"""
+        usage = self.usage_metadata
+        result = {
+            'usage_metadata': {
+                'prompt_token_count': usage.prompt_token_count,
+                'candidates_token_count': usage.candidates_token_count,
+                'total_token_count': usage.total_token_count
+            } if usage else None,
+            'finish_reason': self.finish_reason.value if self.finish_reason else None,
+            'content': {
+                'parts': [{'text': part.text} for part in self.content.parts]
+            },
+            'partial': self.partial
+        }
+        if exclude_none:
+            result = {k: v for k, v in result.items() if v is not None}
+        return result
+
+    def __str__(self):
+        return self.content.parts[0].text if self.content.parts else ""
+
+
+class ErrorResponse:
+    """Plain-text response yielded when the gateway call fails."""
+    __slots__ = ("content", "usage_metadata", "tool_calls")
+
+    def __init__(self, text):
+        self.content = text
+        self.usage_metadata = None
+        self.tool_calls = None
+
+    def __str__(self):
+        return self.content
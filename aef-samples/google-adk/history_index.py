@@ -0,0 +1,215 @@
+"""
+Historical Quote Index
+---------------------------------------
+In-memory index over historical_quotes.csv for historical_match.
+
+Rows are indexed by normalized product and by customer, and matches are
+ranked by recency, acceptance and quantity similarity instead of file order.
+The index is built once from the column store of the source CSV, which
+is never written to. Quotes generated by the agents go to a journal next
+to it (``historical_quotes.journal.csv``) through ``append``, and the index
+is kept current by parsing only the journal bytes added since the last
+read, so new quotes are searchable without a rebuild. Appends hold a
+cross-process lock so concurrent writers never interleave rows.
+"""
+
+import csv, io, os, threading
+from array import array
+from pathlib import Path
+import numpy as np
+from columnar_store import load_table
+from file_utils import csv_line, locked_append
+from fuzzy_index import FuzzyIndex, normalize_text
+
+FIELDS = ["quote_id", "customer", "product", "qty", "unit_price", "total", "accepted", "notes"]
+NUMERIC_FIELDS = {"qty", "unit_price", "total"}
+ACCEPTANCE = {"yes": 1.0, "no": 0.0}   # anything else (e.g. "Pending") scores 0.5
+MIN_PRODUCT_SCORE = 0.5
+MAX_SCAN = 50000                        # most recent rows ranked per query
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _coerce(value):
+    """Parse a numeric CSV cell the way the column store would."""
+    if value == "":
+        return value
+    number = _number(value)
+    return int(number) if number.is_integer() else number
+
+
+class HistoryIndex:
+    """Index over a history CSV plus the journal of quotes appended since."""
+
+    def __init__(self, path, journal=None):
+        self.path = Path(path)
+        self.journal = Path(journal) if journal else self.path.with_name(f"{self.path.stem}.journal.csv")
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.fields = list(FIELDS)
+        self._columns = {f: [] for f in self.fields}
+        self._qty = array("d")
+        self._accepted = array("d")
+        self.by_product = {}
+        self.by_customer = {}
+        self._products = []
+        self._product_index = None
+        self._source = None     # (inode, size, mtime) of the source CSV that was loaded
+        self._offset = 0        # journal bytes already indexed
+        self._inode = None      # journal inode
+
+    def __len__(self):
+        return len(self._qty)
+
+    # --- loading ---
+    def _add_rows(self, rows: dict):
+        """Append column-wise ``rows`` to the in-memory index."""
+        start = len(self._qty)
+        for f in self.fields:
+            self._columns[f].extend(rows.get(f) or [""] * len(rows["product"]))
+        self._qty.extend(_number(q) for q in rows["qty"])
+        self._accepted.extend(ACCEPTANCE.get(str(a).strip().lower(), 0.5) for a in rows["accepted"])
+        for i, (product, customer) in enumerate(zip(rows["product"], rows["customer"]), start):
+            key = normalize_text(product)
+            if key not in self.by_product:
+                self.by_product[key] = array("q")
+                self._products.append(key)
+                self._product_index = None
+            self.by_product[key].append(i)
+            self.by_customer.setdefault(normalize_text(customer), array("q")).append(i)
+
+    def _build(self, source: tuple):
+        """Full load from the column store (compiled from the CSV if stale)."""
+        self._reset()
+        table = load_table(self.path)
+        self.fields = list(table.columns)
+        self._columns = {f: [] for f in self.fields}
+        rows = {}
+        for f in self.fields:
+            col = table[f]
+            rows[f] = col.tolist() if hasattr(col, "tolist") else list(col)
+        self._add_rows(rows)
+        self._source = source
+
+    def _read_tail(self, size: int):
+        """Parse journal rows after ``self._offset`` (complete lines only)."""
+        with open(self.journal, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return
+        text = data[:end].decode("utf-8")
+        if not self._offset:
+            text = text.split("\n", 1)[1]     # header
+        reader = csv.DictReader(io.StringIO(text), fieldnames=FIELDS)
+        rows = {f: [] for f in self.fields}
+        for rec in reader:
+            for f in self.fields:
+                value = rec.get(f) or ""
+                rows[f].append(_coerce(value) if f in NUMERIC_FIELDS else value)
+        self._add_rows(rows)
+        self._offset += end
+
+    def refresh(self):
+        """Catch up: rebuild when the source CSV or the journal was rewritten,
+        otherwise tail-read new journal rows."""
+        st = os.stat(self.path)
+        try:
+            jst = os.stat(self.journal)
+        except FileNotFoundError:
+            jst = None
+        with self._lock:
+            journal_rewritten = jst is not None and (self._inode not in (None, jst.st_ino)
+                                                     or jst.st_size < self._offset)
+            source = (st.st_ino, st.st_size, st.st_mtime_ns)
+            if self._source != source or journal_rewritten or (jst is None and self._offset):
+                self._build(source)
+            if jst is not None:
+                self._inode = jst.st_ino
+                if jst.st_size > self._offset:
+                    self._read_tail(jst.st_size)
+
+    def append(self, records: list):
+        """Append quote records to the journal and to the index."""
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=FIELDS, extrasaction="ignore", lineterminator="\n")
+        for rec in records:
+            writer.writerow(rec)
+        with self._lock:
+            self.refresh()
+            locked_append(self.journal, buf.getvalue(), header=csv_line(FIELDS, lineterminator="\n"))
+            self.refresh()
+
+    def quote_ids(self) -> set:
+        """IDs of the quotes in the index (source CSV and journal)."""
+        with self._lock:
+            self.refresh()
+            return set(self._columns.get("quote_id", ()))
+
+    # --- querying ---
+    def row(self, i: int) -> dict:
+        row = {f: self._columns[f][i] for f in self.fields}
+        return {k: v.item() if hasattr(v, "item") else v for k, v in row.items()}
+
+    def _product_rows(self, product_name: str):
+        key = normalize_text(product_name)
+        if key in self.by_product:
+            return [self.by_product[key]]
+        if self._product_index is None:
+            self._product_index = FuzzyIndex(self._products)
+        return [self.by_product[self._products[i]]
+                for i, score in self._product_index.search(product_name, 5) if score >= MIN_PRODUCT_SCORE]
+
+    def search(self, product_name: str = "", top_k: int = 2, customer: str = "", qty: float = 0) -> list:
+        """Ranked history rows for a product and/or customer.
+
+        Each result is the original row plus a ``score`` in ``[0, 1]``.
+        """
+        self.refresh()
+        with self._lock:
+            groups = self._product_rows(product_name) if product_name else []
+            if product_name and not groups:
+                return []
+            rows = np.unique(np.concatenate([np.frombuffer(g, dtype=np.int64) for g in groups])) if groups else None
+            if customer:
+                by_customer = self.by_customer.get(normalize_text(customer))
+                if by_customer is None:
+                    return []
+                cust_rows = np.frombuffer(by_customer, dtype=np.int64)
+                rows = cust_rows if rows is None else np.intersect1d(rows, cust_rows, assume_unique=True)
+            if rows is None or not len(rows):
+                return []
+            rows = rows[-MAX_SCAN:]
+
+            recency = np.arange(1, len(rows) + 1) / len(rows)
+            accepted = np.frombuffer(self._accepted, dtype=np.float64)[rows]
+            if qty:
+                past_qty = np.frombuffer(self._qty, dtype=np.float64)[rows]
+                similarity = 1 / (1 + np.abs(np.log(np.maximum(past_qty, 1) / max(qty, 1))))
+                scores = 0.3 * recency + 0.3 * accepted + 0.4 * similarity
+            else:
+                scores = 0.5 * recency + 0.5 * accepted
+            top = np.argsort(-scores, kind="stable")[:top_k]
+            return [{**self.row(int(rows[i])), "score": round(float(scores[i]), 4)} for i in top]
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_history_index(path) -> HistoryIndex:
+    """Return the process-wide history index for ``path``."""
+    key = str(Path(path).resolve())
+    index = _INDEXES.get(key)
+    if index is None:
+        with _INDEXES_LOCK:
+            index = _INDEXES.setdefault(key, HistoryIndex(path))
+    return index
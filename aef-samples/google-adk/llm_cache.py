@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+LLM Response Cache
+---------------------------------------
+Exact-match cache for LLM Gateway completions, so repeated prompts (sample
+requests, retries, batch re-runs) skip the gateway.
+
+- Key: sha256 of the canonical JSON of model, messages, tools and the other
+  request parameters (``stream``/``stream_options`` excluded), so the same
+  request hits whether it was streamed or not.
+- Tiers: an in-memory LRU (LLM_CACHE_SIZE entries, default 256; 0 disables
+  the cache) and, when LLM_CACHE_DB is set, a SQLite table that survives
+  restarts. Disk hits are promoted to memory.
+- Expiry: every entry lives LLM_CACHE_TTL seconds (default 3600).
+- Metrics: ``stats()`` returns hits per tier, misses, stores, evictions,
+  expirations and uncacheable responses.
+
+Responses are only stored when they finished normally and do not call a
+side-effecting tool (SIDE_EFFECT_TOOLS, e.g. quote_generator), so a cache
+hit never replays the creation of a quote. Later rounds include the tool
+results in their messages and therefore get their own keys.
+
+    python llm_cache.py stats data/llm_cache.db
+    python llm_cache.py clear data/llm_cache.db
+"""
+
+import argparse, hashlib, json, os, sqlite3, threading, time
+from collections import OrderedDict
+from pathlib import Path
+
+SIDE_EFFECT_TOOLS = frozenset({"quote_generator"})
+CACHEABLE_FINISH = frozenset({"stop", "tool_calls", "function_call"})
+_UNKEYED = frozenset({"stream", "stream_options"})
+_PRUNE_EVERY = 100
+
+
+def _jsonable(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    return str(value)
+
+
+def cache_key(**request) -> str:
+    """Canonical hash of a chat completion request."""
+    payload = {k: v for k, v in request.items() if k not in _UNKEYED and v is not None}
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_jsonable)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def cacheable(finish_reason, tool_names) -> bool:
+    """Whether a response may be replayed: finished normally and no side-effecting tool calls."""
+    return (finish_reason or "stop") in CACHEABLE_FINISH and not SIDE_EFFECT_TOOLS.intersection(tool_names)
+
+
+class LLMCache:
+    """In-memory LRU with TTL, plus an optional SQLite tier."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key        TEXT PRIMARY KEY,
+        value      TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache(expires_at);
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = Path(db_path) if db_path else None
+        self._entries = OrderedDict()          # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._metrics = dict.fromkeys(("memory_hits", "disk_hits", "misses", "stores", "evictions", "expired",
+                                       "uncacheable"), 0)
+        if self.db_path:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn().executescript(self.SCHEMA)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def _remember(self, key: str, expires_at: float, value):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+
+    def get(self, key: str):
+        """Cached value for ``key``, or None (expired entries count as misses)."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._metrics["memory_hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+        expired = entry is not None
+        if self.db_path:
+            row = self._conn().execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row and row[1] > now:
+                value = json.loads(row[0])
+                self._remember(key, row[1], value)
+                self._count("disk_hits")
+                return value
+            if row:
+                self._conn().execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                expired = True
+        with self._lock:
+            self._metrics["misses"] += 1
+            self._metrics["expired"] += expired
+        return None
+
+    def put(self, key: str, value):
+        """Store a JSON-serializable ``value`` for ``ttl`` seconds."""
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl
+        self._remember(key, expires_at, value)
+        with self._lock:
+            self._metrics["stores"] += 1
+            prune = self._metrics["stores"] % _PRUNE_EVERY == 0
+        if self.db_path:
+            conn = self._conn()
+            conn.execute("INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(value), expires_at))
+            if prune:
+                conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+
+    def store(self, key: str, value, finish_reason, tool_names) -> bool:
+        """``put`` the response if it is ``cacheable``; returns whether it was stored."""
+        if not cacheable(finish_reason, tool_names):
+            self._count("uncacheable")
+            return False
+        self.put(key, value)
+        return True
+
+    def completion(self, create, **request) -> tuple:
+        """``(response, hit)`` for a non-streaming ``create(**request)`` call, cached when safe."""
+        key = cache_key(**request) if self.enabled else None
+        value = self.get(key) if key else None
+        if value is not None:
+            from openai.types.chat import ChatCompletion
+            return ChatCompletion.model_validate(value), True
+        response = create(**request)
+        if key:
+            choice = response.choices[0] if response.choices else None
+            names = [tc.function.name for tc in (choice.message.tool_calls or [])] if choice else []
+            self.store(key, response.model_dump(mode="json"), choice.finish_reason if choice else "error", names)
+        return response, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._metrics, memory_entries=len(self._entries))
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else None
+        if self.db_path:
+            stats["disk_entries"] = self._conn().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            self._conn().execute("DELETE FROM llm_cache")
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_llm_cache(db_path=None) -> LLMCache:
+    """Process-wide cache configured by LLM_CACHE_SIZE, LLM_CACHE_TTL and
+    LLM_CACHE_DB (``db_path`` overrides LLM_CACHE_DB)."""
+    db_path = db_path or os.environ.get("LLM_CACHE_DB") or None
+    key = str(Path(db_path).resolve()) if db_path else ""
+    cache = _CACHES.get(key)
+    if cache is None:
+        with _CACHES_LOCK:
+            cache = _CACHES.get(key)
+            if cache is None:
+                cache = _CACHES[key] = LLMCache(int(os.environ.get("LLM_CACHE_SIZE", 256)),
+                                                float(os.environ.get("LLM_CACHE_TTL", 3600)), db_path)
+    return cache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM response cache utilities")
+    parser.add_argument("command", choices=("stats", "clear"))
+    parser.add_argument("db_path", help="the LLM_CACHE_DB file")
+    args = parser.parse_args()
+
+    cache = LLMCache(db_path=args.db_path)
+    if args.command == "clear":
+        cache.clear()
+        print(f"🧹 Cleared {args.db_path}")
+    else:
+        now = time.time()
+        total, live = cache._conn().execute(
+            "SELECT COUNT(*), SUM(expires_at > ?) FROM llm_cache", (now,)).fetchone()
+        print(f"📦 {args.db_path}: {total} entries ({live or 0} live, {total - (live or 0)} expired)")
@@ -0,0 +1,204 @@
+"""
+Pricing Engine
+---------------------------------------
+Data-driven discount rules shared by discount_calculator and a
+NumPy-vectorized repricer with the same semantics, for pricing whole
+catalogs or years of historical_quotes.csv in one pass.
+
+Rules live in a JSON file (data/discount_rules.json) with one schedule per
+agent variant:
+
+    {"schedules": {"simple": {
+        "qty_tiers": [{"min_qty": 50, "discount": 0.05}, ...],
+        "customer_adders": {"preferred": 0.05},
+        "max_discount": 0.25,
+        "tier_overrides": {"premium": {"max_discount": 0.15}}}}}
+
+Each schedule is compiled into sorted breakpoint arrays, so a lookup is a
+bisect (scalar) or searchsorted (vector) rather than an if/elif cascade.
+``tier_overrides`` replace any of the fields above for products of that
+catalog tier. The file is re-read whenever its mtime or size changes.
+"""
+
+import json, os, threading
+from bisect import bisect_right
+from pathlib import Path
+import numpy as np
+
+DEFAULT_RULES = {
+    "schedules": {
+        # simple_agent.py: 5% at 50+, 10% at 100+, preferred +5%
+        "simple": {
+            "qty_tiers": [{"min_qty": 50, "discount": 0.05}, {"min_qty": 100, "discount": 0.10}],
+            "customer_adders": {"preferred": 0.05},
+            "max_discount": 1.0,
+            "tier_overrides": {},
+        },
+        # smart_quoting_agent_working.py: 5% at 20+, 10% at 50+, 15% at 100+, preferred +5%
+        "working": {
+            "qty_tiers": [{"min_qty": 20, "discount": 0.05}, {"min_qty": 50, "discount": 0.10},
+                          {"min_qty": 100, "discount": 0.15}],
+            "customer_adders": {"preferred": 0.05},
+            "max_discount": 1.0,
+            "tier_overrides": {},
+        },
+    }
+}
+
+
+def write_default_rules(path):
+    """Write DEFAULT_RULES to ``path`` (used by ensure_data)."""
+    Path(path).write_text(json.dumps(DEFAULT_RULES, indent=2))
+
+
+class CompiledSchedule:
+    """One schedule compiled to breakpoint arrays."""
+
+    def __init__(self, name: str, spec: dict, tier_overrides: dict = None):
+        tiers = sorted(spec.get("qty_tiers", []), key=lambda t: t["min_qty"])
+        self.name = name
+        self.breaks = [t["min_qty"] for t in tiers]
+        self.rates = [0.0] + [float(t["discount"]) for t in tiers]
+        self.adders = {k: float(v) for k, v in spec.get("customer_adders", {}).items()}
+        self.max_discount = float(spec.get("max_discount", 1.0))
+        if len(set(self.breaks)) != len(self.breaks):
+            raise ValueError(f"schedule {name!r}: duplicate min_qty in qty_tiers")
+        if not all(0.0 <= r <= 1.0 for r in self.rates + [self.max_discount, *self.adders.values()]):
+            raise ValueError(f"schedule {name!r}: discounts must be between 0 and 1")
+        self._breaks = np.asarray(self.breaks)
+        self._rates = np.asarray(self.rates)
+        self.tiers = {tier.lower(): CompiledSchedule(f"{name}/{tier}", {**spec, **override})
+                      for tier, override in (tier_overrides or {}).items()}
+
+    def for_tier(self, tier) -> "CompiledSchedule":
+        return self.tiers.get(str(tier or "").lower(), self)
+
+    def discount_for(self, qty, customer_type: str = "regular", tier: str = "") -> tuple:
+        """Scalar ``(qty_discount, customer_discount, total_discount)``."""
+        rules = self.for_tier(tier)
+        qty_discount = rules.rates[bisect_right(rules.breaks, qty)]
+        customer_discount = rules.adders.get(customer_type, 0.0)
+        return qty_discount, customer_discount, min(qty_discount + customer_discount, rules.max_discount)
+
+    def price_lines(self, unit_prices, qtys, customer_types="regular", tiers=None) -> dict:
+        """Vectorized discount_calculator.
+
+        Args:
+            unit_prices: array-like of unit prices
+            qtys: array-like of quantities (same length)
+            customer_types: one customer type for all lines, or an array of them
+            tiers: optional array of product tiers for ``tier_overrides`` (any case)
+
+        Returns:
+            Dict of NumPy arrays: qty_discount, customer_discount,
+            total_discount, discounted_unit_price and total
+        """
+        unit_prices = np.asarray(unit_prices, dtype=np.float64)
+        qtys = np.asarray(qtys)
+        qty_discount = np.empty(len(qtys))
+        customer_discount = np.zeros(len(qtys))
+        max_discount = np.empty(len(qtys))
+        if not isinstance(customer_types, str):
+            customer_types = np.asarray(customer_types)
+
+        groups = [(self, np.ones(len(qtys), dtype=bool))]
+        if tiers is not None and self.tiers:
+            tiers = np.char.lower(np.asarray(tiers, dtype=str))
+            masks = {tier: tiers == tier for tier in self.tiers}
+            overridden = np.logical_or.reduce(list(masks.values()))
+            groups = [(self, ~overridden)] + [(self.tiers[tier], mask) for tier, mask in masks.items()]
+        for rules, mask in groups:
+            qty_discount[mask] = rules._rates[np.searchsorted(rules._breaks, qtys[mask], side="right")]
+            max_discount[mask] = rules.max_discount
+            if isinstance(customer_types, str):
+                customer_discount[mask] = rules.adders.get(customer_types, 0.0)
+            else:
+                for ctype, extra in rules.adders.items():
+                    customer_discount[mask & (customer_types == ctype)] = extra
+
+        total_discount = np.minimum(qty_discount + customer_discount, max_discount)
+        discounted_unit_price = unit_prices * (1 - total_discount)
+        return {
+            "qty_discount": qty_discount,
+            "customer_discount": customer_discount,
+            "total_discount": total_discount,
+            "discounted_unit_price": discounted_unit_price,
+            "total": discounted_unit_price * qtys,
+        }
+
+
+def compile_rules(config: dict) -> dict:
+    """Compile a rules config into ``{schedule_name: CompiledSchedule}``."""
+    return {name: CompiledSchedule(name, spec, spec.get("tier_overrides"))
+            for name, spec in config["schedules"].items()}
+
+
+class DiscountRules:
+    """Hot-reloading compiled rules backed by a JSON file.
+
+    A missing file falls back to DEFAULT_RULES; a file that fails to parse
+    or validate keeps the last good rules in place.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._stat_key = None
+        self._compiled = compile_rules(DEFAULT_RULES)
+
+    def _current_key(self):
+        try:
+            st = os.stat(self.path)
+        except (OSError, TypeError):
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def schedules(self) -> dict:
+        key = self._current_key()
+        if key == self._stat_key:
+            return self._compiled
+        with self._lock:
+            if key != self._stat_key:
+                try:
+                    compiled = compile_rules(json.loads(self.path.read_text())) if key else compile_rules(DEFAULT_RULES)
+                    self._compiled = compiled  # atomic reference swap
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    print(f"⚠️  Keeping previous discount rules, failed to load {self.path}: {e}")
+                self._stat_key = key
+        return self._compiled
+
+    def schedule(self, name: str) -> CompiledSchedule:
+        return self.schedules()[name]
+
+    def discount_for(self, qty, customer_type: str = "regular", schedule: str = "simple", tier: str = "") -> tuple:
+        return self.schedule(schedule).discount_for(qty, customer_type, tier)
+
+    def price_lines(self, unit_prices, qtys, customer_types="regular", schedule: str = "simple", tiers=None) -> dict:
+        return self.schedule(schedule).price_lines(unit_prices, qtys, customer_types, tiers)
+
+
+_RULES = {}
+_RULES_LOCK = threading.Lock()
+
+
+def get_discount_rules(path=None) -> DiscountRules:
+    """Return the process-wide rules for ``path`` (defaults when None)."""
+    key = str(Path(path).resolve()) if path else None
+    rules = _RULES.get(key)
+    if rules is None:
+        with _RULES_LOCK:
+            rules = _RULES.setdefault(key, DiscountRules(path))
+    return rules
+
+
+def reprice_table(table, schedule: str = "simple", customer_types="regular", rules: DiscountRules = None,
+                  price_col: str = "unit_price", qty_col: str = "qty", tier_col: str = None) -> dict:
+    """Reprice every row of a column store (or DataFrame) in one pass.
+
+    ``table`` only needs ``price_col`` and ``qty_col`` columns, e.g.
+    ``columnar_store.load_table(HISTORY_CSV)``; numeric store columns are
+    memory-mapped, so nothing is parsed or copied per row.
+    """
+    rules = rules or get_discount_rules()
+    tiers = table[tier_col].tolist() if tier_col else None
+    return rules.price_lines(table[price_col], table[qty_col], customer_types, schedule, tiers)
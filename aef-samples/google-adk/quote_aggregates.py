@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Quote Aggregates
+---------------------------------------
+Materialized quote statistics, kept current as quote_generator commits
+each quote, so dashboards and the quote_stats tool never re-read history.
+
+One row per (dimension, key) in SQLite (WAL):
+
+    dimension  key                  count  total  min/max  qty  accepted/rejected  first/last seen
+    all        *                    every quote
+    customer   normalized customer  quotes for that customer
+    product    normalized product   quote lines for that product
+    day        YYYY-MM-DD (UTC)     quotes created that day
+
+``record`` upserts one row per dimension touched by a quote (O(items) per
+quote, independent of history size) and is idempotent on quote_id.
+``record_outcome`` moves a quote between pending, accepted and rejected.
+Seed from historical_quotes.csv with:
+
+    python quote_aggregates.py rebuild data/quotes.db data/historical_quotes.csv
+"""
+
+import argparse, csv, json, sqlite3, threading
+from pathlib import Path
+from fuzzy_index import normalize_text
+from quote_ids import id_time
+
+DIMENSIONS = ("all", "customer", "product", "day")
+OUTCOMES = {"yes": "accepted", "accepted": "accepted", "no": "rejected", "rejected": "rejected"}
+
+
+def _created_at(quote: dict) -> str:
+    when = id_time(quote.get("quote_id"))
+    return quote.get("created_at") or (when.isoformat(timespec="milliseconds") if when else "")
+
+
+class QuoteAggregates:
+    """Incrementally maintained quote statistics."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS quote_aggregates (
+        dimension TEXT NOT NULL,
+        key       TEXT NOT NULL,
+        label     TEXT NOT NULL,
+        count     INTEGER NOT NULL DEFAULT 0,
+        total     REAL NOT NULL DEFAULT 0,
+        min_total REAL,
+        max_total REAL,
+        qty       REAL NOT NULL DEFAULT 0,
+        accepted  INTEGER NOT NULL DEFAULT 0,
+        rejected  INTEGER NOT NULL DEFAULT 0,
+        first_at  TEXT,
+        last_at   TEXT,
+        PRIMARY KEY (dimension, key)
+    );
+    CREATE INDEX IF NOT EXISTS idx_aggregates_total ON quote_aggregates(dimension, total);
+    CREATE TABLE IF NOT EXISTS quote_aggregate_members (
+        quote_id TEXT PRIMARY KEY,
+        keys     TEXT NOT NULL,
+        outcome  TEXT NOT NULL DEFAULT 'pending'
+    );
+    """
+
+    UPSERT = """
+    INSERT INTO quote_aggregates
+        (dimension, key, label, count, total, min_total, max_total, qty, accepted, rejected, first_at, last_at)
+    VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(dimension, key) DO UPDATE SET
+        label     = excluded.label,
+        count     = count + 1,
+        total     = total + excluded.total,
+        min_total = MIN(COALESCE(min_total, excluded.min_total), excluded.min_total),
+        max_total = MAX(COALESCE(max_total, excluded.max_total), excluded.max_total),
+        qty       = qty + excluded.qty,
+        accepted  = accepted + excluded.accepted,
+        rejected  = rejected + excluded.rejected,
+        first_at  = MIN(COALESCE(first_at, excluded.first_at), excluded.first_at),
+        last_at   = MAX(COALESCE(last_at, excluded.last_at), excluded.last_at)
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _entries(quote: dict) -> list:
+        """``(dimension, key, label, total, qty)`` for every row a quote touches."""
+        total = float(quote.get("total") or 0)
+        items = quote.get("items") or []
+        qty = sum(float(i.get("qty") or 0) for i in items)
+        created_at = _created_at(quote)
+        customer = quote.get("customer") or ""
+        entries = [("all", "*", "All quotes", total, qty),
+                   ("customer", normalize_text(customer), customer, total, qty)]
+        if created_at:
+            entries.append(("day", created_at[:10], created_at[:10], total, qty))
+        for item in items:
+            name = item.get("name") or ""
+            entries.append(("product", normalize_text(name), name, float(item.get("total") or 0),
+                            float(item.get("qty") or 0)))
+        return entries
+
+    def record(self, quote: dict, outcome: str = "pending") -> bool:
+        """Add ``quote`` to the aggregates; False if it was already recorded."""
+        return self.record_many([quote], [outcome]) == 1
+
+    def record_many(self, quotes: list, outcomes: list = None, reset: bool = False) -> int:
+        """Add several quotes in one transaction; returns how many were new.
+
+        ``reset`` clears the existing aggregates first, in the same transaction.
+        """
+        outcomes = outcomes or ["pending"] * len(quotes)
+        conn = self._conn()
+        added = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if reset:
+                conn.execute("DELETE FROM quote_aggregates")
+                conn.execute("DELETE FROM quote_aggregate_members")
+            for quote, outcome in zip(quotes, outcomes):
+                outcome = OUTCOMES.get(str(outcome).strip().lower(), "pending")
+                entries = self._entries(quote)
+                keys = json.dumps([[e[0], e[1]] for e in entries])
+                cur = conn.execute("INSERT OR IGNORE INTO quote_aggregate_members (quote_id, keys, outcome) "
+                                   "VALUES (?, ?, ?)", (quote["quote_id"], keys, outcome))
+                if not cur.rowcount:
+                    continue
+                when = _created_at(quote) or None
+                conn.executemany(self.UPSERT, [
+                    (dim, key, label, total, total, total, qty,
+                     int(outcome == "accepted"), int(outcome == "rejected"), when, when)
+                    for dim, key, label, total, qty in entries])
+                added += 1
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def record_outcome(self, quote_id: str, accepted: bool) -> bool:
+        """Mark a recorded quote accepted or rejected; False if unknown."""
+        outcome = "accepted" if accepted else "rejected"
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT keys, outcome FROM quote_aggregate_members WHERE quote_id = ?",
+                               (quote_id,)).fetchone()
+            if row is None or row["outcome"] == outcome:
+                conn.execute("COMMIT")
+                return row is not None
+            delta = {"accepted": 0, "rejected": 0}
+            delta[outcome] += 1
+            if row["outcome"] in delta:
+                delta[row["outcome"]] -= 1
+            conn.executemany(
+                "UPDATE quote_aggregates SET accepted = accepted + ?, rejected = rejected + ? "
+                "WHERE dimension = ? AND key = ?",
+                [(delta["accepted"], delta["rejected"], dim, key) for dim, key in json.loads(row["keys"])])
+            conn.execute("UPDATE quote_aggregate_members SET outcome = ? WHERE quote_id = ?", (outcome, quote_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    # --- queries (each reads O(limit) rows) ---
+    @staticmethod
+    def _stats(row) -> dict:
+        decided = row["accepted"] + row["rejected"]
+        return {
+            "dimension": row["dimension"], "key": row["label"], "count": row["count"],
+            "total": round(row["total"], 2), "average": round(row["total"] / row["count"], 2) if row["count"] else 0.0,
+            "min_total": row["min_total"], "max_total": row["max_total"], "qty": row["qty"],
+            "accepted": row["accepted"], "rejected": row["rejected"],
+            "acceptance_rate": round(row["accepted"] / decided, 4) if decided else None,
+            "first_at": row["first_at"], "last_at": row["last_at"],
+        }
+
+    def get(self, dimension: str, key: str):
+        if dimension != "day":
+            key = "*" if dimension == "all" else normalize_text(key)
+        row = self._conn().execute("SELECT * FROM quote_aggregates WHERE dimension = ? AND key = ?",
+                                   (dimension, key)).fetchone()
+        return self._stats(row) if row else None
+
+    def summary(self) -> dict:
+        return self.get("all", "*") or {"dimension": "all", "key": "All quotes", "count": 0, "total": 0.0,
+                                         "average": 0.0, "acceptance_rate": None}
+
+    def top(self, dimension: str, limit: int = 5) -> list:
+        """Largest ``dimension`` rows by total value."""
+        rows = self._conn().execute(
+            "SELECT * FROM quote_aggregates WHERE dimension = ? ORDER BY total DESC LIMIT ?", (dimension, limit))
+        return [self._stats(r) for r in rows]
+
+    def days(self, limit: int = 30) -> list:
+        """Most recent ``limit`` days, newest first."""
+        rows = self._conn().execute(
+            "SELECT * FROM quote_aggregates WHERE dimension = 'day' ORDER BY key DESC LIMIT ?", (limit,))
+        return [self._stats(r) for r in rows]
+
+    def query(self, dimension: str = "all", key: str = "", limit: int = 5) -> dict:
+        """Tool-friendly lookup: one entry when ``key`` is given, else the top entries."""
+        dimension = (dimension or "all").strip().lower()
+        if dimension not in DIMENSIONS:
+            return {"error": f"Unknown dimension '{dimension}'. Use one of: {', '.join(DIMENSIONS)}"}
+        if dimension == "all":
+            return {"stats": self.summary()}
+        if key:
+            stats = self.get(dimension, key)
+            return {"stats": stats} if stats else {"error": f"No quotes found for {dimension} '{key}'"}
+        top = self.days(limit) if dimension == "day" else self.top(dimension, limit)
+        return {"top": top}
+
+    def rebuild_from_history(self, history_csv) -> int:
+        """Reset and seed from a history CSV (one row per quote line)."""
+        quotes, outcomes = {}, {}
+        with open(history_csv, newline="") as f:
+            for rec in csv.DictReader(f):
+                quote = quotes.setdefault(rec["quote_id"], {"quote_id": rec["quote_id"], "customer": rec["customer"],
+                                                            "items": [], "total": 0.0})
+                total = float(rec.get("total") or 0)
+                quote["items"].append({"name": rec["product"], "qty": float(rec.get("qty") or 0), "total": total})
+                quote["total"] += total
+                outcomes[rec["quote_id"]] = rec.get("accepted", "")
+        return self.record_many(list(quotes.values()), [outcomes[q] for q in quotes], reset=True)
+
+
+_AGGREGATES = {}
+_AGGREGATES_LOCK = threading.Lock()
+
+
+def get_quote_aggregates(db_path) -> QuoteAggregates:
+    """Return the process-wide aggregates for ``db_path``."""
+    key = str(Path(db_path).resolve())
+    aggregates = _AGGREGATES.get(key)
+    if aggregates is None:
+        with _AGGREGATES_LOCK:
+            aggregates = _AGGREGATES.setdefault(key, QuoteAggregates(db_path))
+    return aggregates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quote aggregate utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="reset the aggregates from a history CSV")
+    rebuild.add_argument("db_path")
+    rebuild.add_argument("history_csv")
+    show = sub.add_parser("show", help="print the top rows of a dimension")
+    show.add_argument("db_path")
+    show.add_argument("dimension", choices=DIMENSIONS)
+    show.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    aggregates = QuoteAggregates(args.db_path)
+    if args.command == "rebuild":
+        n = aggregates.rebuild_from_history(args.history_csv)
+        print(f"✅ Rebuilt aggregates from {n} quotes in {args.history_csv}")
+    else:
+        rows = [aggregates.summary()] if args.dimension == "all" else aggregates.top(args.dimension, args.limit)
+        for row in rows:
+            print(json.dumps(row))
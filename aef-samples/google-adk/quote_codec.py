@@ -0,0 +1,141 @@
+"""
+Quote Codecs
+---------------------------------------
+Serialization for persisted quotes (shard files and the SQLite body
+column), selected with QUOTE_CODEC:
+
+- json-compact (default): JSON without whitespace, via orjson when it is
+  installed and the standard library otherwise
+- json: indented JSON, for reading quote files by hand
+- msgpack: binary MessagePack (requires the msgpack package), stored
+  as <quote_id>.msgpack
+
+Every record is stamped with ``schema_version``. ``decode`` detects the
+format from the bytes themselves and upgrades older records, so readers
+handle files written with any codec or schema version.
+"""
+
+import json, os
+from abc import ABC, abstractmethod
+from datetime import timezone
+from quote_ids import id_time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+SCHEMA_VERSION = 2
+# 1: original quotes (no schema_version, no created_at)
+# 2: time-sortable quote_id and created_at
+
+
+class Codec(ABC):
+    name = ""
+    extension = ".json"
+    binary = False
+
+    @abstractmethod
+    def encode(self, quote: dict) -> bytes:
+        ...
+
+    @abstractmethod
+    def decode(self, data: bytes) -> dict:
+        ...
+
+
+class PrettyJsonCodec(Codec):
+    name = "json"
+
+    def encode(self, quote: dict) -> bytes:
+        return json.dumps(quote, indent=2).encode("utf-8")
+
+    def decode(self, data: bytes) -> dict:
+        return json.loads(data)
+
+
+class CompactJsonCodec(Codec):
+    name = "json-compact"
+
+    def encode(self, quote: dict) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(quote)
+        return json.dumps(quote, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, data: bytes) -> dict:
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    extension = ".msgpack"
+    binary = True
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("QUOTE_CODEC=msgpack requires the msgpack package (pip install msgpack)")
+
+    def encode(self, quote: dict) -> bytes:
+        return msgpack.packb(quote, use_bin_type=True)
+
+    def decode(self, data: bytes) -> dict:
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS = {c.name: c for c in (CompactJsonCodec, PrettyJsonCodec, MsgpackCodec)}
+EXTENSIONS = (".json", ".msgpack")
+_JSON_READER = CompactJsonCodec()
+
+
+def get_codec(name=None) -> Codec:
+    """Codec by name, a Codec instance, or QUOTE_CODEC (default json-compact)."""
+    if isinstance(name, Codec):
+        return name
+    name = (name or os.environ.get("QUOTE_CODEC", "json-compact")).lower()
+    if name not in CODECS:
+        raise ValueError(f"unknown quote codec {name!r}; choose from {', '.join(CODECS)}")
+    return CODECS[name]()
+
+
+def upgrade(record: dict) -> dict:
+    """Bring a decoded record up to SCHEMA_VERSION."""
+    version = record.get("schema_version", 1)
+    if version < 2:
+        when = id_time(record.get("quote_id"))
+        if when is not None and not record.get("created_at"):
+            record["created_at"] = when.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+    record["schema_version"] = max(version, SCHEMA_VERSION)
+    return record
+
+
+def encode(quote: dict, codec=None) -> bytes:
+    """Serialize ``quote`` (stamped with the current schema_version)."""
+    return get_codec(codec).encode({**quote, "schema_version": SCHEMA_VERSION})
+
+
+def decode(data) -> dict:
+    """Deserialize a quote written by any codec and upgrade it.
+
+    Raises ValueError when ``data`` is not a quote record.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    try:
+        if data.lstrip()[:1] == b"{":
+            record = _JSON_READER.decode(data)
+        elif msgpack is not None:
+            record = msgpack.unpackb(data, raw=False)
+        else:
+            raise ValueError("binary quote record but msgpack is not installed")
+    except ValueError:
+        raise
+    except Exception as e:   # msgpack/orjson raise their own error types
+        raise ValueError(f"undecodable quote record: {e}") from e
+    if not isinstance(record, dict):
+        raise ValueError("quote record is not an object")
+    return upgrade(record)
@@ -0,0 +1,169 @@
+"""
+Quote Dedupe
+---------------------------------------
+Makes quote_generator idempotent. Client retries and LLM re-tries call it
+again with the same customer, items and terms; within the dedupe window
+those calls get the original quote back instead of a new file, log row
+and n8n email.
+
+The key is a caller-supplied idempotency key or, by default, a
+fingerprint of the normalized request (``quote_fingerprint``). Keys are
+claimed in a ``quote_fingerprints`` table in quotes.db (primary key on
+the key, indexed by time for pruning) under ``BEGIN IMMEDIATE``, so
+concurrent duplicates across threads and processes resolve to one quote.
+
+A claim is ``pending`` until the caller has saved the quote and marks it
+``done``. A duplicate that finds a pending claim waits up to CLAIM_WAIT
+seconds for it to be completed or released (then it claims the key
+itself); if it is still pending, the duplicate gets the claimed quote
+with ``"status": "pending"`` rather than a quote that looks saved. A
+claim older than CLAIM_LEASE seconds whose quote is not in the store,
+e.g. after a crash between claim and save, is taken over and the
+duplicate creates the quote itself.
+
+QUOTE_DEDUPE_WINDOW sets the window in seconds (default 600; 0 disables).
+"""
+
+import hashlib, json, os, sqlite3, threading, time
+from pathlib import Path
+from fuzzy_index import normalize_text
+
+DEFAULT_WINDOW = 600
+CLAIM_LEASE = 30          # seconds a claim may wait for its quote to be saved
+CLAIM_WAIT = 5            # seconds a duplicate waits for a pending claim to settle
+
+
+def dedupe_window() -> float:
+    return float(os.environ.get("QUOTE_DEDUPE_WINDOW", DEFAULT_WINDOW))
+
+
+def _number(value, digits: int):
+    try:
+        return round(float(value or 0), digits)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def quote_fingerprint(customer: str, items: list, terms: str = "") -> str:
+    """Stable key for a quote request; item order, case and spacing do not matter."""
+    lines = sorted([normalize_text(str(i.get("name", ""))), _number(i.get("qty"), 4),
+                    _number(i.get("unit_price"), 2), _number(i.get("total"), 2)]
+                   for i in items if isinstance(i, dict))
+    canonical = json.dumps({"customer": normalize_text(customer or ""), "items": lines,
+                            "terms": " ".join((terms or "").lower().split())}, sort_keys=True, default=str)
+    return "fp:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def idempotency_key(key: str, customer: str, items: list, terms: str = "") -> str:
+    """The caller's ``key`` if given, else the request fingerprint."""
+    key = (key or "").strip()
+    return f"key:{key}" if key else quote_fingerprint(customer, items, terms)
+
+
+class QuoteDedupe:
+    """Claims idempotency keys for new quotes."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS quote_fingerprints (
+        fingerprint TEXT PRIMARY KEY,
+        quote_id    TEXT NOT NULL,
+        quote       TEXT NOT NULL,
+        created_at  REAL NOT NULL,
+        status      TEXT NOT NULL DEFAULT 'done'
+    );
+    CREATE INDEX IF NOT EXISTS idx_fingerprints_created ON quote_fingerprints(created_at);
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(quote_fingerprints)")}
+        if "status" not in columns:
+            conn.execute("ALTER TABLE quote_fingerprints ADD COLUMN status TEXT NOT NULL DEFAULT 'done'")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def claim(self, key: str, quote: dict, window: float = None, exists=None, wait: float = CLAIM_WAIT):
+        """Reserve ``key`` for ``quote`` (as ``pending``; see ``complete``).
+
+        Returns the quote that already holds ``key`` if it was claimed within
+        ``window`` seconds (the caller should return it instead of saving),
+        otherwise None. A pending claim is polled for up to ``wait`` seconds;
+        if it is still pending then, the returned quote carries
+        ``"status": "pending"``. ``exists(quote_id)`` tells whether a quote
+        was saved; a claim older than CLAIM_LEASE whose quote is missing (or,
+        without ``exists``, that is still pending) is taken over. Expired
+        claims are pruned in the same transaction.
+        """
+        window = dedupe_window() if window is None else window
+        if window <= 0:
+            return None
+        deadline = time.monotonic() + wait
+        while True:
+            existing, saved = self._claim(key, quote, window, exists)
+            if existing is None or saved:
+                return existing
+            if time.monotonic() >= deadline:
+                return {**existing, "status": "pending"}
+            time.sleep(0.05)
+
+    def _claim(self, key: str, quote: dict, window: float, exists) -> tuple:
+        """One claim attempt: ``(existing quote, whether it is saved)``, or
+        ``(None, False)`` when ``key`` is now claimed for ``quote``."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT quote, created_at, status FROM quote_fingerprints WHERE fingerprint = ?",
+                               (key,)).fetchone()
+            if row and row[1] >= now - window:
+                existing = json.loads(row[0])
+                if row[1] >= now - CLAIM_LEASE:
+                    conn.execute("COMMIT")
+                    return existing, row[2] == "done"
+                if exists(existing["quote_id"]) if exists else row[2] == "done":
+                    conn.execute("COMMIT")
+                    return existing, True
+                print(f"⚠️  Quote {existing['quote_id']} was never saved, taking over its claim")
+            conn.execute("DELETE FROM quote_fingerprints WHERE created_at < ?", (now - window,))
+            conn.execute("INSERT OR REPLACE INTO quote_fingerprints (fingerprint, quote_id, quote, created_at, status) "
+                         "VALUES (?, ?, ?, ?, 'pending')", (key, quote["quote_id"], json.dumps(quote), now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return None, False
+
+    def complete(self, key: str, quote_id: str):
+        """Mark the claim done once its quote has been saved."""
+        self._conn().execute("UPDATE quote_fingerprints SET status = 'done' WHERE fingerprint = ? AND quote_id = ?",
+                             (key, quote_id))
+
+    def release(self, key: str, quote_id: str):
+        """Drop a claim whose quote could not be saved."""
+        self._conn().execute("DELETE FROM quote_fingerprints WHERE fingerprint = ? AND quote_id = ?",
+                             (key, quote_id))
+
+
+_DEDUPE = {}
+_DEDUPE_LOCK = threading.Lock()
+
+
+def get_quote_dedupe(db_path) -> QuoteDedupe:
+    """Return the process-wide dedupe table for ``db_path``."""
+    key = str(Path(db_path).resolve())
+    dedupe = _DEDUPE.get(key)
+    if dedupe is None:
+        with _DEDUPE_LOCK:
+            dedupe = _DEDUPE.setdefault(key, QuoteDedupe(db_path))
+    return dedupe
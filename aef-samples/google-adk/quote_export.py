@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Quote Export
+---------------------------------------
+Bulk extracts of every quote for finance, as two tables:
+
+    quotes-<stamp>.<csv|parquet>        one row per quote
+    quote_items-<stamp>.<csv|parquet>   one row per line item (quote_id, line_no, ...)
+
+Quotes stream from the store (``iter_quotes``: a SQLite cursor or the
+shard manifest) through a generator pipeline in chunks of --chunk-size,
+so memory use does not grow with the number of quotes. Parquet output
+needs pyarrow (pip install pyarrow); each chunk becomes one row group.
+Files are written under temporary names and renamed into place when
+complete.
+
+--incremental exports only quotes created after the watermark left by
+the previous run (``export_watermark.json`` in the output directory).
+Every export, full or incremental, leaves quotes from the last SKEW
+seconds for the next run, so a quote committed slightly out of created_at
+order is never skipped and never exported twice.
+
+    python quote_export.py data/quotes.db exports/ --format parquet
+    python quote_export.py /path/to/quotes exports/ --format csv --incremental
+"""
+
+import argparse, csv, json, os
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from file_utils import atomic_write
+from quote_shards import SKEW
+from quote_store import FileQuoteStore, SqliteQuoteStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+WATERMARK = "export_watermark.json"
+QUOTE_COLUMNS = [("quote_id", "string"), ("created_at", "string"), ("customer", "string"),
+                 ("subtotal", "float64"), ("total", "float64"), ("terms", "string"),
+                 ("item_count", "int64"), ("schema_version", "int64")]
+ITEM_COLUMNS = [("quote_id", "string"), ("line_no", "int64"), ("name", "string"), ("sku", "string"),
+                ("qty", "float64"), ("unit_price", "float64"), ("discount_pct", "float64"), ("total", "float64")]
+
+
+def _float(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def flatten(quote: dict) -> tuple:
+    """``(quote_row, item_rows)`` for one quote."""
+    items = [i for i in quote.get("items") or [] if isinstance(i, dict)]
+    row = {"quote_id": quote.get("quote_id"), "created_at": quote.get("created_at"),
+           "customer": quote.get("customer"), "subtotal": _float(quote.get("subtotal")),
+           "total": _float(quote.get("total")), "terms": quote.get("terms"), "item_count": len(items),
+           "schema_version": quote.get("schema_version")}
+    lines = [{"quote_id": row["quote_id"], "line_no": n, "name": item.get("name"), "sku": item.get("sku"),
+              "qty": _float(item.get("qty")), "unit_price": _float(item.get("unit_price")),
+              "discount_pct": _float(item.get("discount_pct")), "total": _float(item.get("total"))}
+             for n, item in enumerate(items, 1)]
+    return row, lines
+
+
+def chunked(iterable, size: int):
+    """Yield lists of up to ``size`` items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class CsvTableWriter:
+    extension = ".csv"
+
+    def __init__(self, path, columns):
+        self.path = Path(path)
+        self.tmp = self.path.with_name(f".{self.path.name}.tmp")
+        self._file = open(self.tmp, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=[name for name, _ in columns])
+        self._writer.writeheader()
+
+    def write(self, rows: list):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetTableWriter:
+    extension = ".parquet"
+
+    def __init__(self, path, columns):
+        if pa is None:
+            raise ImportError("Parquet export requires the pyarrow package (pip install pyarrow)")
+        self.path = Path(path)
+        self.tmp = self.path.with_name(f".{self.path.name}.tmp")
+        self.schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in columns])
+        self._writer = pq.ParquetWriter(self.tmp, self.schema)
+
+    def write(self, rows: list):
+        if rows:
+            self._writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {"csv": CsvTableWriter, "parquet": ParquetTableWriter}
+
+
+def _discard(tables: list):
+    """Close ``tables`` and remove their temporary files."""
+    for table in tables:
+        try:
+            table.close()
+        except Exception:
+            pass
+        table.tmp.unlink(missing_ok=True)
+
+
+def read_watermark(out_dir):
+    try:
+        return json.loads((Path(out_dir) / WATERMARK).read_text()).get("created_at")
+    except (OSError, ValueError):
+        return None
+
+
+def export_quotes(store, out_dir, fmt: str = "csv", chunk_size: int = 1000, incremental: bool = False) -> dict:
+    """Export quotes from ``store`` into ``out_dir``.
+
+    Args:
+        store: A quote store with ``iter_quotes`` (SqliteQuoteStore or FileQuoteStore)
+        out_dir: Directory for the export files and the watermark
+        fmt: "csv" or "parquet"
+        chunk_size: Quotes held in memory at a time
+        incremental: Only export quotes newer than the last watermark
+
+    Returns:
+        Dictionary with quote and item counts, the files written and the new watermark
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    now = datetime.now(timezone.utc)
+    stamp = now.strftime("%Y%m%dT%H%M%SZ")
+    after = read_watermark(out_dir) if incremental else None
+    until = (now - SKEW).isoformat(timespec="milliseconds")
+
+    writer_cls = WRITERS[fmt]
+    tables, published = [], False
+    result = {"quotes": 0, "items": 0, "files": [], "watermark": after}
+    newest = ""
+    try:
+        for name, columns in (("quotes", QUOTE_COLUMNS), ("quote_items", ITEM_COLUMNS)):
+            tables.append(writer_cls(out_dir / f"{name}-{stamp}{writer_cls.extension}", columns))
+        for chunk in chunked(store.iter_quotes(after, until), chunk_size):
+            rows, items = [], []
+            for quote in chunk:
+                row, lines = flatten(quote)
+                rows.append(row)
+                items.extend(lines)
+                newest = max(newest, row["created_at"] or "")
+            tables[0].write(rows)
+            tables[1].write(items)
+            result["quotes"] += len(rows)
+            result["items"] += len(items)
+        for table in tables:
+            table.close()
+        if result["quotes"]:
+            for table in tables:
+                os.replace(table.tmp, table.path)
+                result["files"].append(str(table.path))
+            published = True
+    finally:
+        if not published:
+            _discard(tables)    # nothing to export, or failed part way: no .tmp files left behind
+    if not result["quotes"]:
+        return result
+
+    # Quotes without created_at cannot move the watermark; keep the previous one
+    result["watermark"] = newest or after
+    atomic_write(out_dir / WATERMARK, json.dumps({"created_at": result["watermark"], "exported_at":
+                                                  now.isoformat(timespec="milliseconds"), "files": result["files"]},
+                                                 indent=2))
+    return result
+
+
+def open_store(source):
+    """SqliteQuoteStore for a .db file, FileQuoteStore for a quotes directory."""
+    source = Path(source)
+    if source.is_dir():
+        return FileQuoteStore(source, source / "quotes_log.csv")
+    return SqliteQuoteStore(source)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="quotes.db or a quotes directory with manifest.csv")
+    parser.add_argument("out_dir")
+    parser.add_argument("--format", choices=WRITERS, default="csv")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="quotes per chunk / row group")
+    parser.add_argument("--incremental", action="store_true", help="only quotes newer than the last watermark")
+    args = parser.parse_args()
+
+    result = export_quotes(open_store(args.source), args.out_dir, args.format, args.chunk_size, args.incremental)
+    if not result["quotes"]:
+        print(f"ℹ️  No new quotes to export (watermark {result['watermark'] or 'none'})")
+    else:
+        print(f"✅ Exported {result['quotes']} quotes / {result['items']} items to {', '.join(result['files'])}")
+        print(f"   Watermark: {result['watermark']}")
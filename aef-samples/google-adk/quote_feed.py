@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Quote Change Feed
+---------------------------------------
+Push-based stream of new quotes for the n8n monitor and other consumers,
+replacing the periodic ``find`` poll.
+
+The shard manifest (quote_shards.py) is the durable journal: every saved
+quote appends one row, and the byte offset just past that row is its
+``event_id``. Offsets belong to one ``generation`` of the manifest (its
+inode); rewriting the manifest (e.g. ``quote_shards.py migrate``) starts a
+new generation, and offsets from an older one replay from the start.
+Each consumer's committed offset and generation are stored in
+``<quotes>/consumers/<name>.offset``; within a generation the offset only
+moves forward once delivery is acknowledged, so a restarted consumer
+resumes exactly where it stopped. Delivery is at-least-once; receivers
+de-duplicate on ``quote_id`` (the n8n workflow does), which makes
+processing exactly-once end to end.
+
+The manifest is watched with one stat() per POLL_INTERVAL, so new quotes
+are delivered well under a second after they are saved.
+
+    # Push each new quote to an n8n Webhook node (offsets committed on 2xx)
+    python quote_feed.py push /path/to/quotes --webhook http://localhost:5678/webhook/quote-created
+
+    # Or serve the feed over HTTP
+    python quote_feed.py serve /path/to/quotes --port 8765
+      GET  /events?consumer=NAME           Server-Sent Events (resumes from Last-Event-ID)
+      GET  /poll?consumer=NAME&wait=25     long-poll, returns {"events": [...], "next_offset": N,
+                                           "generation": G} (pass generation=G back when resuming)
+      POST /ack?consumer=NAME&offset=N&generation=G   commit an offset
+"""
+
+import argparse, json, os, re, threading, time, urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from file_utils import atomic_write, file_lock
+from quote_shards import QuoteDirectory, parse_row
+
+POLL_INTERVAL = 0.1        # seconds between manifest stat() calls
+HEARTBEAT = 15             # seconds between SSE keep-alive comments
+MAX_BACKOFF = 30           # seconds between webhook retries
+_CONSUMER = re.compile(r"^[\w.-]{1,64}$")
+
+
+class QuoteFeed:
+    """Reads quote events from the manifest and tracks consumer offsets."""
+
+    def __init__(self, root):
+        self.quotes = QuoteDirectory(root)
+        self.manifest = self.quotes.manifest
+        self.offsets_dir = self.quotes.root / "consumers"
+
+    def _stat(self) -> tuple:
+        """``(generation, size)`` of the manifest (``(0, 0)`` if missing)."""
+        try:
+            st = os.stat(self.manifest)
+        except OSError:
+            return 0, 0
+        return st.st_ino, st.st_size
+
+    def generation(self) -> int:
+        return self._stat()[0]
+
+    def event(self, row: dict, offset: int, generation: int = 0) -> dict:
+        """Event envelope for one manifest row (includes the full quote)."""
+        return {"event_id": offset, "generation": generation, "type": "quote.created", "quote_id": row["quote_id"],
+                "path": row.get("path", ""), "created_at": row.get("created_at", ""),
+                "quote": self.quotes.load(row) or {k: row.get(k) for k in ("quote_id", "customer", "total")}}
+
+    def read(self, offset: int = 0, limit: int = 100, generation: int = None) -> tuple:
+        """Return ``(events, next_offset, generation)`` for rows after ``offset``.
+
+        ``generation`` is the one ``offset`` came from (None if unknown). If
+        the manifest has been rewritten since, reading restarts from the
+        first row; receivers de-duplicate on quote_id. Always continue from
+        ``next_offset``: it also moves past rows that produce no event.
+        """
+        try:
+            f = open(self.manifest, "rb")
+        except OSError:
+            return [], offset, generation
+        with f:
+            current = os.fstat(f.fileno()).st_ino
+            header_end = len(f.readline())
+            size = f.seek(0, os.SEEK_END)
+            if offset > header_end and (generation not in (None, current) or not self._at_row_start(f, offset, size)):
+                print(f"⚠️  {self.manifest} was rewritten since offset {offset}, replaying from the start")
+                offset = 0
+            offset = max(offset, header_end)
+            f.seek(offset)
+            events = []
+            for line in f:
+                if not line.endswith(b"\n") or len(events) >= limit:
+                    break
+                offset += len(line)
+                row = parse_row(line)
+                if row.get("quote_id"):
+                    events.append(self.event(row, offset, current))
+        return events, offset, current
+
+    @staticmethod
+    def _at_row_start(f, offset: int, size: int) -> bool:
+        """Whether ``offset`` is within the file and just past a newline."""
+        if offset > size:
+            return False
+        f.seek(offset - 1)
+        return f.read(1) == b"\n"
+
+    def wait(self, offset: int, timeout: float, stop: threading.Event = None, generation: int = None) -> bool:
+        """Block until the manifest grows past ``offset`` (or is replaced by a
+        new generation) or ``timeout`` passes."""
+        deadline = time.monotonic() + timeout
+        while True:
+            current, size = self._stat()
+            if size > offset or (generation is not None and current and current != generation):
+                return True
+            if time.monotonic() >= deadline or (stop and stop.is_set()):
+                return False
+            time.sleep(POLL_INTERVAL)
+
+    # --- consumer offsets ---
+    def _offset_path(self, consumer: str) -> Path:
+        if not _CONSUMER.match(consumer or ""):
+            raise ValueError(f"invalid consumer name: {consumer!r}")
+        return self.offsets_dir / f"{consumer}.offset"
+
+    def _stored(self, consumer: str) -> tuple:
+        """``(offset, generation)`` as stored (generation None for old plain-offset files)."""
+        try:
+            text = self._offset_path(consumer).read_text().strip()
+        except OSError:
+            return 0, None
+        try:
+            if text.startswith("{"):
+                stored = json.loads(text)
+                return int(stored["offset"]), stored["generation"]
+            return int(text or 0), None
+        except (ValueError, KeyError, TypeError):
+            return 0, None
+
+    def committed(self, consumer: str) -> tuple:
+        """``(offset, generation)`` to resume ``consumer`` from; offset 0 if its
+        commit belongs to an older generation of the manifest."""
+        offset, generation = self._stored(consumer)
+        current = self.generation()
+        if generation is not None and generation != current:
+            return 0, current
+        return offset, generation
+
+    def commit(self, consumer: str, offset: int, generation: int = None) -> int:
+        """Advance ``consumer`` to ``offset`` of ``generation`` (default: the
+        current one) and return its committed offset.
+
+        Within a generation the offset never moves backwards; the first
+        commit for a new generation replaces the old offset. Commits for an
+        older generation are ignored.
+        """
+        path = self._offset_path(consumer)
+        self.offsets_dir.mkdir(parents=True, exist_ok=True)
+        current = self.generation()
+        generation = current if generation is None else int(generation)
+        with file_lock(path):
+            stored, stored_generation = self._stored(consumer)
+            if generation != current:
+                return stored if stored_generation == current else 0
+            if stored_generation == current:
+                offset = max(int(offset), stored)
+            atomic_write(path, json.dumps({"offset": int(offset), "generation": current}))
+        return int(offset)
+
+
+def push(feed: QuoteFeed, url: str, consumer: str = "n8n", stop: threading.Event = None, timeout: float = 10):
+    """POST every new event to ``url``, committing after each 2xx response."""
+    offset, generation = feed.committed(consumer)
+    failures = 0
+    print(f"📡 Pushing quote events to {url} as '{consumer}' from offset {offset}")
+    while not (stop and stop.is_set()):
+        events, next_offset, generation = feed.read(offset, limit=50, generation=generation)
+        if not events:
+            if next_offset != offset:
+                # Skipped rows without a quote_id (or the header): commit past them
+                offset = feed.commit(consumer, next_offset, generation)
+            feed.wait(offset, timeout=1.0, stop=stop, generation=generation)
+            continue
+        for event in events:
+            request = urllib.request.Request(url, data=json.dumps(event).encode("utf-8"), method="POST",
+                                             headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    response.read()
+            except Exception as e:
+                failures += 1
+                delay = min(MAX_BACKOFF, 0.5 * 2 ** min(failures, 6))
+                print(f"⚠️  Webhook delivery of {event['quote_id']} failed ({e}), retrying in {delay:.1f}s")
+                if stop:
+                    stop.wait(delay)
+                else:
+                    time.sleep(delay)
+                break
+            failures = 0
+            offset = feed.commit(consumer, event["event_id"], generation)
+            print(f"✅ Delivered {event['quote_id']} (offset {offset})")
+        else:
+            if next_offset != offset:
+                offset = feed.commit(consumer, next_offset, generation)
+
+
+def make_handler(feed: QuoteFeed):
+    """Build the HTTP request handler class bound to ``feed``."""
+
+    class QuoteFeedHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _params(self) -> dict:
+            return {k: v[-1] for k, v in parse_qs(urlparse(self.path).query).items()}
+
+        def _start(self, params: dict) -> tuple:
+            """``(offset, generation)`` to read from (SSE ids are ``generation-offset``)."""
+            last_event = self.headers.get("Last-Event-ID")
+            if params.get("from") is None and last_event and "-" in last_event:
+                generation, offset = last_event.split("-", 1)
+                return int(offset), int(generation)
+            start = params.get("from") or last_event
+            generation = int(params["generation"]) if params.get("generation") else None
+            if start is not None:
+                return int(start), generation
+            return feed.committed(params["consumer"]) if params.get("consumer") else (0, None)
+
+        def _json(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            route, params = urlparse(self.path).path, self._params()
+            try:
+                if route == "/health":
+                    return self._json(200, {"status": "ok", "quotes": feed.quotes.count()})
+                if route == "/poll":
+                    offset, generation = self._start(params)
+                    limit = int(params.get("limit", 100))
+                    events, next_offset, generation = feed.read(offset, limit, generation)
+                    if not events and feed.wait(next_offset, min(float(params.get("wait", 25)), 60),
+                                                generation=generation):
+                        events, next_offset, generation = feed.read(next_offset, limit, generation)
+                    return self._json(200, {"events": events, "next_offset": next_offset,
+                                            "generation": generation})
+                if route == "/events":
+                    return self._stream(*self._start(params))
+            except ValueError as e:
+                return self._json(400, {"error": str(e)})
+            self._json(404, {"error": f"unknown route {route}"})
+
+        def do_POST(self):
+            route, params = urlparse(self.path).path, self._params()
+            if route != "/ack":
+                return self._json(404, {"error": f"unknown route {route}"})
+            try:
+                offset = feed.commit(params["consumer"], int(params["offset"]), params.get("generation"))
+            except (KeyError, ValueError) as e:
+                return self._json(400, {"error": f"consumer and offset are required: {e}"})
+            self._json(200, {"consumer": params["consumer"], "offset": offset})
+
+        def _stream(self, offset: int, generation: int = None):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            last_write = time.monotonic()
+            try:
+                while True:
+                    events, offset, generation = feed.read(offset, generation=generation)
+                    for event in events:
+                        self.wfile.write(f"id: {event['generation']}-{event['event_id']}\nevent: {event['type']}\n"
+                                         f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    if events:
+                        self.wfile.flush()
+                        last_write = time.monotonic()
+                    elif time.monotonic() - last_write >= HEARTBEAT:
+                        self.wfile.write(b": keep-alive\n\n")
+                        self.wfile.flush()
+                        last_write = time.monotonic()
+                    else:
+                        feed.wait(offset, timeout=1.0, generation=generation)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    return QuoteFeedHandler
+
+
+def serve(feed: QuoteFeed, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Create the feed's HTTP server (call ``serve_forever`` on it)."""
+    server = ThreadingHTTPServer((host, port), make_handler(feed))
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quote change feed")
+    sub = parser.add_subparsers(dest="command", required=True)
+    push_cmd = sub.add_parser("push", help="POST new quotes to a webhook (e.g. n8n)")
+    push_cmd.add_argument("root", help="quotes directory (with manifest.csv)")
+    push_cmd.add_argument("--webhook", default=os.environ.get("QUOTE_WEBHOOK_URL",
+                                                              "http://localhost:5678/webhook/quote-created"))
+    push_cmd.add_argument("--consumer", default="n8n")
+    serve_cmd = sub.add_parser("serve", help="serve the feed over HTTP (SSE / long-poll)")
+    serve_cmd.add_argument("root", help="quotes directory (with manifest.csv)")
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    feed = QuoteFeed(args.root)
+    try:
+        if args.command == "push":
+            push(feed, args.webhook, args.consumer)
+        else:
+            server = serve(feed, args.host, args.port)
+            print(f"📡 Quote feed on http://{args.host}:{args.port} (/events, /poll, /ack)")
+            server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Quote feed stopped")
@@ -0,0 +1,97 @@
+"""
+Quote IDs
+---------------------------------------
+Time-sortable, collision-resistant quote IDs in the ULID layout:
+
+    Q-01JA2Y5C8M7R4T9XQW3E6BZKDN
+      ^^^^^^^^^^                  48-bit Unix time in ms (10 chars)
+                ^^^^^^^^^^^^^^^^  80 random bits (16 chars)
+
+Both parts use Crockford base32, so IDs sort lexicographically in creation
+order. Within one millisecond a process increments the random part instead
+of drawing a new one, so IDs from a single process are strictly monotonic.
+"Newest N quotes" and "quotes since T" are therefore a sort or range scan
+over IDs (file names, primary keys) with no stat() or JSON parse; use
+``id_floor`` for the lower bound of a time range.
+
+Legacy IDs (``Q-`` + 6 hex chars) are still accepted everywhere; they have
+no embedded time and sort before every new ID (see ``sort_key``).
+"""
+
+import os, re, threading
+from datetime import datetime, timezone
+
+PREFIX = "Q-"
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"   # Crockford base32
+TIME_CHARS, RANDOM_CHARS = 10, 16
+_ULID = re.compile(rf"^{PREFIX}[{ALPHABET}]{{{TIME_CHARS + RANDOM_CHARS}}}$")
+_RANDOM_MAX = (1 << 80) - 1
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def _decode(text: str) -> int:
+    value = 0
+    for ch in text:
+        value = value * 32 + ALPHABET.index(ch)
+    return value
+
+
+def new_quote_id(now_ms: int = None) -> str:
+    """Return a new ``Q-<ULID>`` quote ID."""
+    global _last_ms, _last_random
+    ms = now_ms if now_ms is not None else datetime.now(timezone.utc).timestamp() * 1000
+    ms = int(ms)
+    with _lock:
+        if ms <= _last_ms:
+            # Same (or a backwards-stepped) millisecond: stay monotonic
+            ms = _last_ms
+            _last_random += 1
+            if _last_random > _RANDOM_MAX:
+                ms, _last_random = ms + 1, int.from_bytes(os.urandom(10), "big")
+        else:
+            _last_random = int.from_bytes(os.urandom(10), "big")
+        _last_ms = ms
+        return PREFIX + _encode(ms, TIME_CHARS) + _encode(_last_random, RANDOM_CHARS)
+
+
+def is_sortable(quote_id: str) -> bool:
+    """True for time-prefixed IDs, False for legacy hex IDs."""
+    return bool(_ULID.match(quote_id or ""))
+
+
+def id_time(quote_id: str):
+    """Creation time embedded in ``quote_id`` (UTC), or None for legacy IDs."""
+    if not is_sortable(quote_id):
+        return None
+    ms = _decode(quote_id[len(PREFIX):len(PREFIX) + TIME_CHARS])
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+def created_at(quote_id: str) -> str:
+    """ISO-8601 creation timestamp for a new-style ``quote_id``."""
+    return id_time(quote_id).isoformat(timespec="milliseconds")
+
+
+def id_floor(when) -> str:
+    """Smallest possible ID created at or after ``when`` (datetime or ISO string)."""
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when.replace("Z", "+00:00"))
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return PREFIX + _encode(int(when.timestamp() * 1000), TIME_CHARS) + "0" * RANDOM_CHARS
+
+
+def sort_key(quote_id: str) -> tuple:
+    """Order legacy IDs before time-prefixed ones, then by ID."""
+    return (is_sortable(quote_id), quote_id)
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Sharded Quote Directory
+---------------------------------------
+Quote JSON files are laid out by creation date instead of in one flat
+directory:
+
+    quotes/
+      manifest.csv                       quote_id,path,customer,total,created_at
+      2026/10/17/Q-01JA2Y5C8M7R4T9XQW3E6BZKDN.json
+      legacy/AB/Q-AB12CD.json            pre-ULID IDs (no embedded date)
+
+Files are encoded with the QUOTE_CODEC codec (quote_codec.py; msgpack
+files end in .msgpack). The path is derived from the quote ID alone, so
+``get`` needs no lookup.
+manifest.csv is append-only and in creation order, so listing readers
+(Streamlit, the n8n monitor, ``count``/``recent``/``since``) tail it or
+binary-search it by created_at without opening individual quote files.
+
+Migrate an existing flat directory (safe to re-run) with:
+
+    python quote_shards.py migrate /path/to/quotes
+"""
+
+import argparse, csv, io, os, threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from file_utils import atomic_write, atomic_write_many, csv_line, file_lock, locked_append
+from quote_codec import EXTENSIONS, decode, encode, get_codec
+from quote_ids import id_time
+
+MANIFEST = "manifest.csv"
+MANIFEST_FIELDS = ["quote_id", "path", "customer", "total", "created_at"]
+# Concurrent writers may append slightly out of created_at order; range
+# scans start this far before the requested time and filter exactly.
+SKEW = timedelta(seconds=5)
+_TAIL_BLOCK = 64 * 1024
+
+
+def parse_row(line: bytes) -> dict:
+    """One manifest line (bytes) as a dict."""
+    values = next(csv.reader(io.StringIO(line.decode("utf-8"))), [])
+    return dict(zip(MANIFEST_FIELDS, values))
+
+
+def _created_at(quote: dict) -> str:
+    when = quote.get("created_at") or id_time(quote.get("quote_id"))
+    if isinstance(when, datetime):
+        when = when.isoformat(timespec="milliseconds")
+    return when or datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+class QuoteDirectory:
+    """Date-sharded quote files plus their manifest."""
+
+    def __init__(self, root, codec=None):
+        self.root = Path(root)
+        self.codec = get_codec(codec)
+        self.manifest = self.root / MANIFEST
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._counted = (None, 0, 0)   # (inode, offset, rows) of the manifest
+
+    # --- layout ---
+    def relpath(self, quote_id: str, extension: str = None) -> str:
+        extension = extension or self.codec.extension
+        when = id_time(quote_id)
+        if when is None:
+            return f"legacy/{quote_id[2:4].upper() or '_'}/{quote_id}{extension}"
+        return f"{when:%Y/%m/%d}/{quote_id}{extension}"
+
+    def path_for(self, quote_id: str, extension: str = None) -> Path:
+        return self.root / self.relpath(quote_id, extension)
+
+    def manifest_row(self, quote: dict, extension: str = None) -> dict:
+        return {"quote_id": quote["quote_id"], "path": self.relpath(quote["quote_id"], extension),
+                "customer": quote.get("customer", ""), "total": quote.get("total", ""),
+                "created_at": _created_at(quote)}
+
+    # --- writing ---
+    def write(self, quotes: list, fsync: bool = True):
+        """Atomically write quote files, then append their manifest rows."""
+        files = []
+        for quote in quotes:
+            path = self.path_for(quote["quote_id"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            files.append((path, encode(quote, self.codec)))
+        atomic_write_many(files, fsync=fsync)
+        rows = "".join(csv_line(MANIFEST_FIELDS, self.manifest_row(q), "\n") for q in quotes)
+        locked_append(self.manifest, rows, header=csv_line(MANIFEST_FIELDS, lineterminator="\n"), fsync=fsync)
+
+    # --- reading ---
+    def get(self, quote_id: str):
+        # This codec's extension first, then files written with another
+        # codec, then an unmigrated flat file
+        extensions = [self.codec.extension] + [e for e in EXTENSIONS if e != self.codec.extension]
+        for path in [self.path_for(quote_id, e) for e in extensions] + [self.root / f"{quote_id}.json"]:
+            try:
+                with open(path, "rb") as f:
+                    return decode(f.read())
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def load(self, row: dict):
+        """The decoded quote for a manifest row."""
+        if row.get("path"):
+            try:
+                with open(self.root / row["path"], "rb") as f:
+                    return decode(f.read())
+            except (OSError, ValueError):
+                pass
+        return self.get(row["quote_id"])
+
+    def count(self) -> int:
+        """Manifest rows, counting only bytes appended since the last call."""
+        try:
+            st = os.stat(self.manifest)
+        except OSError:
+            return 0
+        with self._lock:
+            inode, offset, rows = self._counted
+            if inode != st.st_ino or st.st_size < offset:
+                inode, offset, rows = st.st_ino, 0, -1   # -1: header line
+            with open(self.manifest, "rb") as f:
+                f.seek(offset)
+                data = f.read(st.st_size - offset)
+            end = data.rfind(b"\n") + 1
+            rows += data.count(b"\n", 0, end)
+            self._counted = (inode, offset + end, rows)
+            return max(rows, 0)
+
+    def tail(self, n: int = 10) -> list:
+        """Last ``n`` manifest rows, newest first."""
+        try:
+            f = open(self.manifest, "rb")
+        except OSError:
+            return []
+        with f:
+            end = f.seek(0, os.SEEK_END)
+            data, pos = b"", end
+            while pos > 0 and data.count(b"\n") <= n + 1:
+                step = min(_TAIL_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        lines = data.split(b"\n")
+        if pos > 0:
+            lines = lines[1:]          # first line may be partial
+        rows = [parse_row(line) for line in lines[-(n + 2):] if line.strip()]
+        rows = [r for r in rows if r.get("quote_id") and r["quote_id"] != "quote_id"]
+        return rows[::-1][:n]
+
+    def _seek_created_at(self, f, start: int, size: int, target: str) -> int:
+        """Offset of the first row with created_at >= ``target`` (binary search)."""
+        lo, hi = start, size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            f.seek(mid - 1)
+            f.readline()                # move to the first line start >= mid
+            pos = f.tell()
+            line = f.readline()
+            if not line or parse_row(line).get("created_at", "") >= target:
+                hi = mid
+            else:
+                lo = pos + len(line)
+        return lo
+
+    def scan(self, created_at: str = None):
+        """Yield manifest rows created after ``created_at`` (all rows if None),
+        in manifest order, reading one line at a time."""
+        try:
+            f = open(self.manifest, "rb")
+        except OSError:
+            return
+        with f:
+            header = f.readline()
+            if created_at:
+                when = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+                if when.tzinfo is None:
+                    when = when.replace(tzinfo=timezone.utc)
+                when = when.astimezone(timezone.utc)
+                floor = (when - SKEW).isoformat(timespec="milliseconds")
+                created_at = when.isoformat(timespec="milliseconds")
+                size = f.seek(0, os.SEEK_END)
+                f.seek(self._seek_created_at(f, len(header), size, floor))
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                row = parse_row(line)
+                if not created_at or row.get("created_at", "") > created_at:
+                    yield row
+
+    def since(self, created_at: str) -> list:
+        """Manifest rows created after ``created_at``, oldest first."""
+        return list(self.scan(created_at))
+
+    def rows(self) -> list:
+        """Every manifest row, oldest first."""
+        try:
+            with open(self.manifest, newline="") as f:
+                return list(csv.DictReader(f))
+        except OSError:
+            return []
+
+
+def migrate(root) -> int:
+    """Move flat ``<root>/Q-*.json`` files into shards and index them.
+
+    The manifest is rewritten (sorted by created_at) before any file moves;
+    until a file is moved, ``get`` still finds it at its flat path, so the
+    migration can be interrupted and re-run. Returns the number of files moved.
+    """
+    qdir = QuoteDirectory(root)
+    flat = sorted(qdir.root.glob("Q-*.json"))
+    if not flat:
+        return 0
+    with file_lock(qdir.manifest):
+        rows = {r["quote_id"]: r for r in qdir.rows()}
+        for path in flat:
+            if path.stem in rows:
+                continue
+            try:
+                with open(path, "rb") as f:
+                    quote = decode(f.read())
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Skipping unreadable {path.name}: {e}")
+                continue
+            quote.setdefault("quote_id", path.stem)
+            if not quote.get("created_at") and id_time(path.stem) is None:
+                mtime = datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc)
+                quote["created_at"] = mtime.isoformat(timespec="milliseconds")
+            rows[path.stem] = qdir.manifest_row(quote, ".json")
+        ordered = sorted(rows.values(), key=lambda r: (r["created_at"], r["quote_id"]))
+        atomic_write(qdir.manifest, csv_line(MANIFEST_FIELDS, lineterminator="\n")
+                     + "".join(csv_line(MANIFEST_FIELDS, r, "\n") for r in ordered))
+
+        moved = 0
+        for path in flat:
+            if path.stem not in rows or not path.exists():
+                continue
+            dest = qdir.path_for(path.stem, ".json")
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, dest)
+            moved += 1
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded quote directory utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    mig = sub.add_parser("migrate", help="move a flat quotes directory into date shards")
+    mig.add_argument("root")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        n = migrate(args.root)
+        print(f"✅ Migrated {n} quote files in {args.root} ({QuoteDirectory(args.root).count()} in manifest)")
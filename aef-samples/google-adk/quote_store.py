@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Quote Store
+---------------------------------------
+Persistence backends for quote_generator and the readers of its output
+(Streamlit sidebar, n8n monitor).
+
+- SqliteQuoteStore (default): embedded SQLite in WAL mode, indexed on
+  quote_id, customer and created_at. Readers and writers in different
+  processes do not block each other. Each saved quote is also exported as
+  a JSON file for the n8n file monitor.
+- FileQuoteStore: one JSON file per quote plus an appended quotes_log.csv.
+
+Quote files live in date shards with an append-only manifest.csv (see
+quote_shards.py), so listing never scans a flat directory.
+
+JSON files are written atomically (temp file + rename) and log appends
+hold a cross-process file lock, so concurrent agents, Streamlit and the
+n8n monitor never see torn quotes or duplicated CSV headers.
+
+Quote records (files and the SQLite body column) are serialized by the
+QUOTE_CODEC codec and carry a schema_version (see quote_codec.py).
+
+Select with QUOTE_STORE=sqlite|files. With QUOTE_WRITER=background, saves
+are handed to a GroupCommitWriter thread that persists them in batches
+(QUOTE_BATCH_SIZE, QUOTE_FLUSH_MS) with one commit per batch. Each quote is
+first appended to a per-process journal (data/quote_journal/) and fsynced,
+so quotes queued when the process dies (SIGTERM, SIGKILL, crash) are saved
+by the next agent that starts; quotes the store rejects are kept in
+data/quote_journal/dead_letter.jsonl. Re-export JSON files for n8n with:
+
+    python quote_store.py export data/quotes.db /path/to/quotes [--since ISO_TIMESTAMP]
+"""
+
+import argparse, atexit, json, os, queue, sqlite3, threading, time, uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from file_utils import csv_line, fcntl, locked_append
+from quote_codec import decode, encode, get_codec
+from quote_shards import QuoteDirectory
+
+LOG_FIELDS = ["quote_id", "customer", "total"]
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+class FileQuoteStore:
+    """Date-sharded JSON files with a manifest, plus the CSV log."""
+
+    def __init__(self, out_dir, log_csv, codec=None):
+        self.out_dir = Path(out_dir)
+        self.log_csv = Path(log_csv)
+        self.files = QuoteDirectory(out_dir, codec)
+        if next(self.out_dir.glob("Q-*.json"), None):
+            print(f"⚠️  Unsharded quotes in {self.out_dir}; run: python quote_shards.py migrate {self.out_dir}")
+
+    def save(self, quote: dict) -> dict:
+        return self.save_many([quote])[0]
+
+    def save_many(self, quotes: list) -> list:
+        """Save a batch with one directory fsync and one log append + fsync."""
+        self.files.write(quotes)
+        rows = "".join(csv_line(LOG_FIELDS, {k: q.get(k) for k in LOG_FIELDS}) for q in quotes)
+        locked_append(self.log_csv, rows, header=csv_line(LOG_FIELDS), fsync=True)
+        return quotes
+
+    def get(self, quote_id: str):
+        return self.files.get(quote_id)
+
+    def count(self) -> int:
+        return self.files.count()
+
+    def _load(self, rows: list) -> list:
+        return [q for q in (self.files.load(r) for r in rows) if q is not None]
+
+    def recent(self, limit: int = 10) -> list:
+        return self._load(self.files.tail(limit))
+
+    def since(self, created_at: str) -> list:
+        """Quotes created after ``created_at``, oldest first."""
+        return self._load(self.files.since(created_at))
+
+    def iter_quotes(self, after: str = None, until: str = None):
+        """Yield quotes with ``after`` < created_at <= ``until``, one at a time."""
+        for row in self.files.scan(after):
+            if until and row.get("created_at", "") > until:
+                continue
+            quote = self.files.load(row)
+            if quote is not None:
+                yield quote
+
+
+class SqliteQuoteStore:
+    """Quotes in an embedded SQLite database (WAL mode)."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS quotes (
+        quote_id   TEXT PRIMARY KEY,
+        customer   TEXT NOT NULL,
+        total      REAL,
+        created_at TEXT NOT NULL,
+        body       TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_quotes_customer ON quotes(customer, created_at);
+    CREATE INDEX IF NOT EXISTS idx_quotes_created_at ON quotes(created_at);
+    """
+
+    def __init__(self, db_path, export_dir=None, codec=None):
+        self.db_path = Path(db_path)
+        self.codec = get_codec(codec)
+        self.export_dir = Path(export_dir) if export_dir else None
+        self.exports = QuoteDirectory(export_dir, self.codec) if export_dir else None
+        self._local = threading.local()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; WAL lets each process's
+        # readers proceed while another process holds the write lock.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _row(self, quote: dict) -> tuple:
+        created_at = quote.get("created_at") or utc_now()
+        body = encode(quote, self.codec)
+        # JSON bodies stay readable TEXT; binary codecs are stored as BLOBs
+        return (quote["quote_id"], quote["customer"], quote.get("total"), created_at,
+                body if self.codec.binary else body.decode("utf-8"))
+
+    def save(self, quote: dict) -> dict:
+        self._conn().execute(
+            "INSERT INTO quotes (quote_id, customer, total, created_at, body) VALUES (?, ?, ?, ?, ?)",
+            self._row(quote))
+        if self.export_dir:
+            self.exports.write([quote])
+        return quote
+
+    def save_many(self, quotes: list) -> list:
+        """Insert a batch in one transaction (one WAL commit).
+
+        The JSON exports are derived data (``export`` can regenerate them),
+        so they are renamed into place without a per-file fsync.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO quotes (quote_id, customer, total, created_at, body) VALUES (?, ?, ?, ?, ?)",
+                [self._row(q) for q in quotes])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if self.export_dir:
+            self.exports.write(quotes, fsync=False)
+        return quotes
+
+    def get(self, quote_id: str):
+        row = self._conn().execute("SELECT body FROM quotes WHERE quote_id = ?", (quote_id,)).fetchone()
+        return decode(row["body"]) if row else None
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
+
+    def recent(self, limit: int = 10) -> list:
+        rows = self._conn().execute(
+            "SELECT body FROM quotes ORDER BY created_at DESC, quote_id DESC LIMIT ?", (limit,))
+        return [decode(r["body"]) for r in rows]
+
+    def since(self, created_at: str) -> list:
+        rows = self._conn().execute(
+            "SELECT body FROM quotes WHERE created_at > ? ORDER BY created_at, quote_id", (created_at,))
+        return [decode(r["body"]) for r in rows]
+
+    def iter_quotes(self, after: str = None, until: str = None, fetch_size: int = 500):
+        """Yield quotes with ``after`` < created_at <= ``until`` in created_at
+        order, fetching ``fetch_size`` rows at a time."""
+        sql, params = "SELECT body FROM quotes WHERE created_at > ?", [after or ""]
+        if until:
+            sql += " AND created_at <= ?"
+            params.append(until)
+        cursor = self._conn().cursor()
+        cursor.execute(sql + " ORDER BY created_at, quote_id", params)
+        try:
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    return
+                for r in rows:
+                    yield decode(r["body"])
+        finally:
+            cursor.close()
+
+    def by_customer(self, customer: str, limit: int = 10) -> list:
+        rows = self._conn().execute(
+            "SELECT body FROM quotes WHERE customer = ? ORDER BY created_at DESC LIMIT ?", (customer, limit))
+        return [decode(r["body"]) for r in rows]
+
+    def export_json(self, out_dir, since: str = None) -> int:
+        """Write sharded quote files (and manifest rows) for quotes missing
+        from ``out_dir``; returns the number written."""
+        exports = QuoteDirectory(out_dir, self.codec)
+        batch, written = [], 0
+        for quote in self.iter_quotes(since):
+            if exports.get(quote["quote_id"]) is None:
+                batch.append(quote)
+            if len(batch) >= 500:
+                exports.write(batch)
+                written, batch = written + len(batch), []
+        if batch:
+            exports.write(batch)
+            written += len(batch)
+        return written
+
+
+class GroupCommitWriter:
+    """Background writer that persists quotes for ``store`` in batches.
+
+    ``save`` appends the quote to this process's journal in ``journal_dir``,
+    puts it on a bounded in-memory queue and returns once the journal is
+    fsynced; concurrent saves share one fsync (see ``_sync_journal``). When
+    the queue is full ``save`` blocks, which pushes back on the request path
+    instead of growing without bound. The writer thread drains up to ``batch_size``
+    quotes, or whatever arrived within ``flush_interval`` seconds, and hands
+    them to ``store.save_many``. The journal is truncated whenever nothing
+    is left queued. ``flush`` waits for everything queued so far; ``close``
+    (registered with atexit) drains the queue and stops the thread.
+
+    Each journal is flock()ed by its process, so on startup the journals
+    of processes that died are replayed (skipping quotes the store already
+    has) and removed; ``on_replay`` is then called with the replayed quotes
+    so the caller can redo its own post-save steps (history, aggregates),
+    which the dead process may not have reached. Quotes the store rejects
+    go to ``dead_letter.jsonl``.
+
+    Reads go to the underlying store; ``get`` also sees quotes that are
+    still queued.
+    """
+
+    def __init__(self, store, batch_size: int = 64, flush_interval: float = 0.05, max_queue: int = 1024,
+                 journal_dir=None, on_replay=None):
+        self.store = store
+        self.on_replay = on_replay
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.journal_dir = Path(journal_dir) if journal_dir else None
+        self._journal = None
+        self._journal_lock = threading.Lock()
+        if self.journal_dir:
+            self.journal_dir.mkdir(parents=True, exist_ok=True)
+            self.replay_journals()
+            self._journal_path = self.journal_dir / f"{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+            self._journal = open(self._journal_path, "ab")
+            if fcntl is not None:
+                fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._sync_cond = threading.Condition()
+        self._syncing = False
+        self._journaled = self._synced = 0      # journal entries appended / fsynced
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="quote-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save(self, quote: dict) -> dict:
+        with self._state_lock:
+            if self._closed:
+                return self.store.save(quote)
+            with self._journal_lock:
+                if self._journal:
+                    self._journal.write(json.dumps(quote).encode("utf-8") + b"\n")
+                    self._journal.flush()
+                    self._journaled += 1
+                seq = self._journaled
+                with self._pending_lock:
+                    self._pending[quote["quote_id"]] = quote
+            self._queue.put(quote)
+        self._sync_journal(seq)
+        return quote
+
+    def _sync_journal(self, seq: int):
+        """Return once journal entry ``seq`` is fsynced.
+
+        Group commit for the journal: the first caller to find no fsync in
+        progress becomes the leader and fsyncs everything appended so far;
+        callers arriving meanwhile wait and are released together by that
+        (or the next) fsync instead of each paying for their own.
+        """
+        with self._sync_cond:
+            while self._syncing and self._synced < seq:
+                self._sync_cond.wait()
+            if self._synced >= seq:
+                return
+            self._syncing = True
+        synced = self._synced
+        try:
+            with self._journal_lock:
+                target = self._journaled
+                fd = self._journal.fileno() if self._journal else None
+            if fd is not None:
+                os.fsync(fd)
+            synced = target
+        finally:
+            with self._sync_cond:
+                self._syncing = False
+                self._synced = max(self._synced, synced)
+                self._sync_cond.notify_all()
+
+    def replay_journals(self) -> int:
+        """Save the quotes left in journals of dead processes; returns how many."""
+        replayed = 0
+        for path in sorted(self.journal_dir.glob("*.jsonl")):
+            if path.name == "dead_letter.jsonl":
+                continue
+            with open(path, "rb") as f:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue            # owner is still running
+                    if not path.exists() or os.stat(path).st_ino != os.fstat(f.fileno()).st_ino:
+                        continue            # already replayed by another process
+                elif path.stem.startswith(f"{os.getpid()}-"):
+                    continue                # no flock(): only this process's journals are known live
+                quotes = []
+                for line in f:
+                    try:
+                        quotes.append(json.loads(line))
+                    except ValueError:
+                        pass                # torn last line: its save() never returned
+                quotes = [q for q in {q["quote_id"]: q for q in quotes}.values()
+                          if self.store.get(q["quote_id"]) is None]
+                if quotes:
+                    self._write(quotes)
+                    print(f"♻️ Replayed {len(quotes)} quotes from {path.name}")
+                    if self.on_replay:
+                        try:
+                            self.on_replay([q for q in quotes if self.store.get(q["quote_id"]) is not None])
+                        except Exception as e:
+                            print(f"⚠️  Post-save step for replayed quotes failed: {e}")
+                replayed += len(quotes)
+                path.unlink()
+        return replayed
+
+    def _dead_letter(self, quote: dict, error: Exception):
+        print(f"❌ Failed to save quote {quote.get('quote_id')}: {error}")
+        if self.journal_dir:
+            record = {"quote": quote, "error": str(error), "failed_at": utc_now()}
+            locked_append(self.journal_dir / "dead_letter.jsonl", json.dumps(record) + "\n", fsync=True)
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _unsaved(self, quotes: list, error: Exception) -> list:
+        """``quotes`` the store does not have after ``error``.
+
+        save/save_many commit before writing the JSON exports, so an export
+        failure leaves the quotes saved; those must not be saved again (the
+        insert would fail) or dead-lettered. Their exports can be
+        regenerated with ``python quote_store.py export``.
+        """
+        unsaved = [q for q in quotes if self.store.get(q["quote_id"]) is None]
+        if len(unsaved) < len(quotes):
+            print(f"⚠️  {len(quotes) - len(unsaved)} quotes already saved, not saving again ({error})")
+        return unsaved
+
+    def _write(self, quotes: list):
+        try:
+            self.store.save_many(quotes)
+            return
+        except Exception as e:
+            quotes = self._unsaved(quotes, e)
+            if quotes:
+                # Isolate the bad quote(s) instead of failing the whole batch
+                print(f"⚠️  Batch of {len(quotes)} quotes failed ({e}), saving one by one")
+        for quote in quotes:
+            try:
+                self.store.save(quote)
+            except Exception as e:
+                if self._unsaved([quote], e):
+                    self._dead_letter(quote, e)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is None
+            quotes = [q for q in batch if q is not None]
+            if quotes:
+                self._write(quotes)
+                with self._journal_lock:
+                    with self._pending_lock:
+                        for q in quotes:
+                            self._pending.pop(q["quote_id"], None)
+                        drained = not self._pending
+                    if drained and self._journal:
+                        self._journal.truncate(0)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Block until every quote queued so far has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Drain the queue and stop the writer thread."""
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+        with self._sync_cond:
+            while self._syncing:
+                self._sync_cond.wait()
+            with self._journal_lock:
+                journal, self._journal = self._journal, None
+        if journal:
+            journal.close()
+            self._journal_path.unlink(missing_ok=True)
+
+    def get(self, quote_id: str):
+        with self._pending_lock:
+            quote = self._pending.get(quote_id)
+        return quote if quote is not None else self.store.get(quote_id)
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+def get_quote_store(db_path, out_dir, log_csv, backend: str = None, writer: str = None, on_replay=None):
+    """Build the store selected by ``backend`` or QUOTE_STORE (default sqlite).
+
+    ``writer`` (or QUOTE_WRITER) set to ``background`` wraps it in a
+    GroupCommitWriter configured by QUOTE_BATCH_SIZE and QUOTE_FLUSH_MS,
+    journaling to ``quote_journal/`` next to ``db_path``; ``on_replay`` is
+    passed through to it.
+    """
+    backend = (backend or os.environ.get("QUOTE_STORE", "sqlite")).lower()
+    if backend == "files":
+        store = FileQuoteStore(out_dir, log_csv)
+    else:
+        store = SqliteQuoteStore(db_path, export_dir=out_dir)
+    if (writer or os.environ.get("QUOTE_WRITER", "sync")).lower() == "background":
+        store = GroupCommitWriter(store,
+                                  batch_size=int(os.environ.get("QUOTE_BATCH_SIZE", 64)),
+                                  flush_interval=float(os.environ.get("QUOTE_FLUSH_MS", 50)) / 1000,
+                                  journal_dir=Path(db_path).with_name("quote_journal"),
+                                  on_replay=on_replay)
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quote store utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write missing quote JSON files for n8n")
+    export.add_argument("db_path")
+    export.add_argument("out_dir")
+    export.add_argument("--since", default=None, help="only quotes created after this ISO timestamp")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        n = SqliteQuoteStore(args.db_path).export_json(args.out_dir, args.since)
+        print(f"✅ Exported {n} quotes to {args.out_dir}")
@@ -0,0 +1,8 @@
+#!/bin/bash
+
+# Push new quotes to the n8n "Quote Created Webhook" as soon as they are saved
+echo "📡 Starting quote change feed..."
+echo "🔗 Delivering to: ${QUOTE_WEBHOOK_URL:-http://localhost:5678/webhook/quote-created}"
+echo ""
+cd /workspaces/agentx-hackathon-DC-Pros/aef-samples/google-adk
+python quote_feed.py push /workspaces/agentx-hackathon-DC-Pros/n8n/local-files/quotes --consumer n8n
@@ -0,0 +1,26 @@
+"""
+Sample Catalog
+---------------------------------------
+The small product catalog the catalog and fast path tests run against.
+"""
+
+import shutil, tempfile
+from pathlib import Path
+from catalog import ProductCatalog
+
+PRODUCTS = """sku,name,unit_price,tier
+CH-100,Office Chair,1500,standard
+TB-200,Conference Table,12000,premium
+DS-300,Developer Desk,8000,standard
+ST-400,Visitor Stool,900,basic
+"""
+
+
+def snapshot():
+    """A catalog snapshot of PRODUCTS, loaded from a temporary CSV."""
+    root = Path(tempfile.mkdtemp())
+    (root / "products.csv").write_text(PRODUCTS)
+    try:
+        return ProductCatalog(root / "products.csv").snapshot()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
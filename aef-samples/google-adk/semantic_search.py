@@ -0,0 +1,226 @@
+"""
+Semantic Product Search
+---------------------------------------
+Embedding-based fallback for price_lookup, so requests like "ergonomic
+seating" can still find "Office Chair" when no catalog token matches.
+
+- Embedders: GatewayEmbedder calls gemini-embedding-001 through the LLM
+  Gateway; HashingEmbedder is a deterministic offline stand-in.
+- EmbeddingCache: on-disk vectors keyed by a hash of (model, text), so a
+  catalog reload only embeds rows whose text actually changed.
+  ``embed_missing`` stores every batch as it finishes, so an interrupted
+  run resumes where it stopped.
+- IVFIndex: small inverted-file ANN index (k-means lists + nprobe).
+
+Select the embedder with SEMANTIC_EMBEDDER=gateway|local|off.
+"""
+
+import hashlib, math, os, threading, zlib
+from pathlib import Path
+import numpy as np
+from fuzzy_index import normalize_tokens, trigrams
+
+EMBEDDING_MODEL = "gemini-embedding-001"
+
+
+class HashingEmbedder:
+    """Offline stand-in: hashed token + trigram features, L2-normalized."""
+
+    min_score = 0.5
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.model = f"local-hashing-{dim}"
+
+    def embed(self, texts: list) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for tok in normalize_tokens(text):
+                for feat, weight in [(tok, 1.0)] + [(g, 0.5) for g in trigrams(tok)]:
+                    h = zlib.crc32(feat.encode("utf-8"))
+                    out[row, h % self.dim] += weight if h & 0x80000000 else -weight
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+
+class GatewayEmbedder:
+    """Embeddings from the LLM Gateway (OpenAI-compatible embeddings API)."""
+
+    min_score = 0.6
+
+    def __init__(self, model: str = EMBEDDING_MODEL, batch_size: int = 100):
+        import openai
+        self.model = model
+        self.batch_size = batch_size
+        self._client = openai.OpenAI(
+            api_key=os.environ["OPENAI_API_KEY"],
+            base_url=os.environ["OPENAI_API_BASE"]
+        )
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            resp = self._client.embeddings.create(model=self.model, input=texts[start:start + self.batch_size])
+            vectors.extend(d.embedding for d in sorted(resp.data, key=lambda d: d.index))
+        out = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+
+_EMBEDDER = None
+_EMBEDDER_LOCK = threading.Lock()
+
+
+def get_embedder():
+    """Process-wide embedder chosen by SEMANTIC_EMBEDDER (None when off)."""
+    global _EMBEDDER
+    kind = os.environ.get("SEMANTIC_EMBEDDER", "gateway").lower()
+    if kind == "off":
+        return None
+    with _EMBEDDER_LOCK:
+        if _EMBEDDER is None:
+            _EMBEDDER = HashingEmbedder() if kind == "local" else GatewayEmbedder()
+    return _EMBEDDER
+
+
+def content_key(model: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """Append-only on-disk embedding cache for one model.
+
+    Every ``put`` writes one new shard (``shard-NNNNNN.npz``) holding only
+    the new vectors, so incremental updates never rewrite old shards.
+    """
+
+    def __init__(self, cache_dir, model: str):
+        self.path = Path(cache_dir) / model.replace("/", "_")
+        self.model = model
+        self._lock = threading.Lock()
+        self._vectors = {}
+        self._shards = 0
+        if self.path.exists():
+            for shard in sorted(self.path.glob("shard-*.npz")):
+                with np.load(shard) as data:
+                    self._vectors.update(zip(self._keys(data["keys"]), data["vectors"]))
+                self._shards += 1
+
+    def __len__(self):
+        return len(self._vectors)
+
+    @staticmethod
+    def _keys(array: np.ndarray) -> list:
+        """Digests from a shard's ``keys``: (n, 32) uint8 rows, or fixed-width
+        bytes in older shards, where numpy stripped trailing NUL bytes."""
+        if array.dtype == np.uint8:
+            return [row.tobytes() for row in array]
+        return [k.ljust(32, b"\0") for k in array.tolist()]
+
+    def get(self, key: bytes):
+        return self._vectors.get(key)
+
+    def put(self, keys: list, vectors: np.ndarray):
+        if not keys:
+            return
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+            shard = self.path / f"shard-{self._shards:06d}-{os.getpid()}.npz"
+            tmp = shard.with_name(f".{shard.name}.tmp")
+            with open(tmp, "wb") as f:
+                np.savez(f, keys=np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(len(keys), 32),
+                         vectors=vectors.astype(np.float32))
+            os.replace(tmp, shard)
+            self._shards += 1
+            self._vectors.update(zip(keys, vectors))
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_embedding_cache(cache_dir, model: str) -> EmbeddingCache:
+    """Process-wide cache for ``(cache_dir, model)``, shared across reloads."""
+    key = (str(Path(cache_dir).resolve()), model)
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = _CACHES[key] = EmbeddingCache(cache_dir, model)
+    return cache
+
+
+def embed_missing(texts: list, embedder, cache: EmbeddingCache, batch_size: int = 1000) -> int:
+    """Embed the texts without a cached vector; returns how many were embedded."""
+    missing = {}
+    for text in texts:
+        key = content_key(embedder.model, text)
+        if cache.get(key) is None:
+            missing.setdefault(key, text)
+    keys = list(missing)
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        cache.put(batch, embedder.embed([missing[k] for k in batch]))
+    return len(keys)
+
+
+class IVFIndex:
+    """Inverted-file ANN index over L2-normalized vectors (cosine scores).
+
+    Small collections are searched exactly; larger ones are clustered with
+    a few rounds of k-means and only the ``nprobe`` closest lists are scanned.
+    """
+
+    EXACT_BELOW = 4096
+
+    def __init__(self, vectors: np.ndarray, nprobe: int = 8, seed: int = 0):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.nprobe = nprobe
+        self.centroids = None
+        n = len(self.vectors)
+        if n < self.EXACT_BELOW:
+            return
+
+        rng = np.random.default_rng(seed)
+        nlist = int(math.sqrt(n))
+        sample = self.vectors[rng.choice(n, min(n, nlist * 32), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(10):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    mean = members.sum(axis=0)
+                    centroids[c] = mean / (np.linalg.norm(mean) or 1)
+
+        labels = np.concatenate([np.argmax(chunk @ centroids.T, axis=1)
+                                 for chunk in np.array_split(self.vectors, max(1, n // 65536))])
+        self.centroids = centroids
+        self.order = np.argsort(labels, kind="stable")
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))])
+
+    def search(self, query: np.ndarray, top_k: int = 5) -> list:
+        if self.centroids is None:
+            ids = np.arange(len(self.vectors))
+        else:
+            nprobe = min(self.nprobe, len(self.centroids))
+            probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+            ids = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probes])
+        if not len(ids):
+            return []
+        scores = self.vectors[ids] @ query
+        top = np.argsort(-scores)[:top_k]
+        return [(int(ids[i]), round(float(scores[i]), 4)) for i in top]
+
+
+class SemanticIndex:
+    """Embeds ``texts`` (reusing cached vectors) and answers nearest-row queries."""
+
+    def __init__(self, texts: list, embedder, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.embedded = embed_missing(texts, embedder, cache)
+        keys = [content_key(embedder.model, t) for t in texts]
+        self.index = IVFIndex(np.stack([cache.get(k) for k in keys]) if keys else np.zeros((0, 1)))
+
+    def search(self, query: str, top_k: int = 5) -> list:
+        """``(row, cosine)`` pairs, best first."""
+        return self.index.search(self.embedder.embed([query])[0], top_k)
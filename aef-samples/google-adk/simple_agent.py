@@ -6,7 +6,8 @@ Runs using Google ADK framework with LLM Gateway integration.
 Auto-creates mock product + quote data and generates professional quotes.
 """
 
-import asyncio, os, uuid, json, csv
+import asyncio, contextvars, functools, logging, os, uuid, json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import pandas as pd
 import openai
@@ -15,6 +16,20 @@ from google.adk.agents import LlmAgent
 from google.adk.models import BaseLlm
 from google.adk.runners import Runner, types
 from google.adk.sessions import InMemorySessionService
+from catalog import get_catalog
+from semantic_search import get_embedder
+from columnar_store import compile_if_stale
+from history_index import get_history_index
+from pricing_engine import get_discount_rules, write_default_rules
+import fast_path
+from quote_store import get_quote_store
+from quote_ids import new_quote_id, created_at
+from quote_aggregates import get_quote_aggregates
+from quote_dedupe import get_quote_dedupe, idempotency_key as dedupe_key
+from token_usage import record as record_usage
+from llm_cache import SIDE_EFFECT_TOOLS, cache_key, get_llm_cache
+from gateway_adapter import (ADKResponse, ErrorResponse, StreamedTurn, log, openai_messages,
+                             openai_tools)
 
 # === Environment / constants ===
 os.environ["OPENAI_API_BASE"] = "http://localhost:4000"
@@ -24,6 +39,22 @@ APP_NAME   = "smart_quote_app"
 USER_ID    = "user_demo"
 SESSION_ID = "session_demo"
 MODEL_NAME = "gemini-2.5-flash"
+# Tool calls from one LLM response that may run at the same time
+TOOL_CONCURRENCY = int(os.environ.get("TOOL_CONCURRENCY", 4))
+# Rounds of tool calls per request before the LLM must answer in text
+MAX_TOOL_ROUNDS = int(os.environ.get("MAX_TOOL_ROUNDS", 5))
+# Tools do blocking pandas / file / SQLite work; they run here, off the event
+# loop (a process pool would not share the in-process catalogs and stores)
+TOOL_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get("TOOL_WORKERS", 16)), thread_name_prefix="quote-tool")
+# Identical gateway requests are answered from here (see llm_cache.py)
+LLM_CACHE = get_llm_cache()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a synchronous tool on TOOL_POOL without blocking the event loop."""
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(TOOL_POOL, call)
 
 # Custom LLM class that bridges Google ADK with LLM Gateway
 class LLMGatewayModel(BaseLlm):
@@ -46,208 +77,206 @@ class LLMGatewayModel(BaseLlm):
             try:
                 self._tools_map = {
                     "price_lookup": globals()["price_lookup"],
+                    "price_lookup_batch": globals()["price_lookup_batch"],
                     "discount_calculator": globals()["discount_calculator"],
                     "historical_match": globals()["historical_match"],
+                    "quote_stats": globals()["quote_stats"],
                     "quote_generator": globals()["quote_generator"]
                 }
-                print(f"🔧 [DEBUG] Tools map initialized with: {list(self._tools_map.keys())}")
+                log.debug("🔧 Tools map initialized with: %s", list(self._tools_map))
             except KeyError as e:
-                print(f"❌ [DEBUG] Tool function not found: {e}")
+                log.error("❌ Tool function not found: %s", e)
                 self._tools_map = {}
         return self._tools_map
     
+    async def _stream_turn(self, openai_kwargs: dict, turn: StreamedTurn):
+        """Stream one completion into ``turn``, yielding text deltas as they arrive.
+        
+        Each read-only tool call starts as soon as its arguments form a
+        complete JSON object, while the rest of the response is still
+        streaming; side-effecting tools (SIDE_EFFECT_TOOLS) wait for the end
+        of the stream. Identical requests are replayed from LLM_CACHE
+        without calling the gateway.
+        """
+        key = cache_key(**openai_kwargs) if LLM_CACHE.enabled else None
+        cached = LLM_CACHE.get(key) if key else None
+        if cached is not None:
+            log.debug("💾 LLM cache hit")
+            turn.restore(cached)
+            if turn.content:
+                yield turn.content
+            for call in turn.calls():
+                self._start_tool(turn, call, final=True)
+            return
+        
+        stream = await self._client.chat.completions.create(**openai_kwargs)
+        async for chunk in stream:
+            text = turn.add(chunk)
+            if text:
+                yield text
+            for call in turn.tool_calls.values():
+                self._start_tool(turn, call)
+        for call in turn.calls():
+            self._start_tool(turn, call, final=True)
+        record_usage(turn.usage_chunk or turn.last_chunk)
+        if key:
+            LLM_CACHE.store(key, turn.snapshot(), turn.finish_reason, [call["name"] for call in turn.calls()])
+    
+    def _start_tool(self, turn: StreamedTurn, call: dict, final: bool = False):
+        """Start ``call`` once its arguments are complete (always when ``final``)."""
+        if call["task"] is not None or not (call["name"] or final):
+            return
+        if not final and call["name"] in SIDE_EFFECT_TOOLS:
+            return
+        arguments = call["arguments"].strip()
+        if not final and not arguments.endswith("}"):
+            return
+        try:
+            func_args = json.loads(arguments or "{}")
+        except json.JSONDecodeError as e:
+            if not final:
+                return
+            log.error("❌ Failed to parse tool arguments: %s", e)
+            func_args = {}
+        call["task"] = asyncio.create_task(self._run_tool(call["name"], func_args, turn.tool_slots))
+    
+    async def _run_tool(self, func_name: str, func_args: dict, slots: asyncio.Semaphore):
+        """Run one tool on TOOL_POOL so the response keeps streaming.
+        
+        Calls from the same response run concurrently, at most
+        TOOL_CONCURRENCY at a time.
+        """
+        tools_map = self._get_tools_map()
+        log.info("🛠️ Executing %s with args: %s", func_name, func_args)
+        
+        if func_name not in tools_map:
+            log.error("❌ Unknown tool: %s", func_name)
+            return {"error": f"Unknown tool: {func_name}"}
+        try:
+            async with slots:
+                result = await run_blocking(tools_map[func_name], **func_args)
+            log.debug("✅ Tool %s result: %s", func_name, result)
+        except Exception as tool_error:
+            result = {"error": str(tool_error)}
+            log.exception("❌ Tool %s error: %s", func_name, result)
+        return result
+    
+    @staticmethod
+    def _log_late_result(name: str, task: asyncio.Task):
+        if task.cancelled():
+            return
+        error = task.exception()
+        log.warning("⚠️ %s finished after the request ended: %s", name, error or task.result())
+    
+    @staticmethod
+    def _side_effects(calls: list, results: list) -> list:
+        """``(name, result)`` for the side-effecting tools among ``calls`` that succeeded."""
+        return [(call["name"], result) for call, result in zip(calls, results)
+                if call["name"] in SIDE_EFFECT_TOOLS and not isinstance(result, BaseException)
+                and not (isinstance(result, dict) and "error" in result)]
+    
+    async def _settle_tools(self, turn: StreamedTurn) -> list:
+        """After a failed round: cancel unfinished read-only tools and wait for
+        side-effecting ones; returns the side effects that completed."""
+        calls = [call for call in turn.calls() if call["task"] is not None]
+        for call in calls:
+            if call["name"] not in SIDE_EFFECT_TOOLS:
+                call["task"].cancel()
+        results = await asyncio.gather(*(call["task"] for call in calls), return_exceptions=True)
+        return self._side_effects(calls, results)
+    
     async def generate_content_async(self, llm_request, **kwargs) -> AsyncGenerator[Any, None]:
         """Convert ADK request to OpenAI format and stream back response"""
+        turn = None
+        side_effects = []       # side-effecting tools that completed, across rounds
         try:
-            print(f"🔄 [DEBUG] generate_content_async called")
-            
-            # Convert ADK format to OpenAI messages
-            messages = []
-            
-            for content in llm_request.contents:
-                if content.role == "user":
-                    messages.append({"role": "user", "content": content.parts[0].text})
-                elif content.role == "model":
-                    messages.append({"role": "assistant", "content": content.parts[0].text})
-                elif content.role == "system":
-                    messages.append({"role": "system", "content": content.parts[0].text})
-            
-            print(f"📨 [DEBUG] Converted {len(messages)} messages")
-            
-            # Handle tools if present
-            tools = None
-            if hasattr(llm_request, 'tools') and llm_request.tools:
-                tools = []
-                print(f"🔧 Converting {len(llm_request.tools)} tools to OpenAI format")
-                for tool in llm_request.tools:
-                    # Convert ADK tool format to OpenAI format
-                    func_decl = tool.function_declarations[0]
-                    openai_tool = {
-                        "type": "function",
-                        "function": {
-                            "name": func_decl.name,
-                            "description": func_decl.description,
-                            "parameters": func_decl.parameters if hasattr(func_decl, 'parameters') else {}
-                        }
-                    }
-                    tools.append(openai_tool)
-                    print(f"   • {func_decl.name}: {func_decl.description}")
-            else:
-                print("⚠️  No tools found in request")
+            # Convert ADK format to OpenAI messages; tool schemas are cached per tool set
+            messages = openai_messages(llm_request.contents)
+            tools = openai_tools(getattr(llm_request, "tools", None))
+            log.debug("📨 Converted %d messages, %d tools", len(messages), len(tools or ()))
             
-            # Make request to LLM Gateway (non-streaming for compatibility)
-            openai_kwargs = {
-                "model": self._model_name,
-                "messages": messages,
-                "stream": False  # Disable streaming for now to get complete response
-            }
-            if tools:
-                openai_kwargs["tools"] = tools
-                openai_kwargs["tool_choice"] = "auto"
-            
-            print(f"🌐 [DEBUG] Making request to LLM Gateway with {len(tools) if tools else 0} tools")
-            response = await self._client.chat.completions.create(**openai_kwargs)
-            print(f"✅ [DEBUG] Got response from LLM Gateway")
-            
-            # Check if LLM wants to call tools
-            choice = response.choices[0] if response.choices else None
-            if choice and choice.message.tool_calls:
-                print(f"🔧 LLM requested {len(choice.message.tool_calls)} tool calls")
-                tools_map = self._get_tools_map()
+            # Stream from LLM Gateway so text reaches the user as it is generated.
+            # Each round may request tools; their results go into the next round
+            # until the LLM answers in text (at most MAX_TOOL_ROUNDS rounds of tools).
+            for round_no in range(1, MAX_TOOL_ROUNDS + 2):
+                openai_kwargs = {
+                    "model": self._model_name,
+                    "messages": messages,
+                    "stream": True,
+                    "stream_options": {"include_usage": True}
+                }
+                if tools and round_no <= MAX_TOOL_ROUNDS:
+                    openai_kwargs["tools"] = tools
+                    openai_kwargs["tool_choice"] = "auto"
+                elif tools:
+                    log.warning("⚠️ Reached MAX_TOOL_ROUNDS (%d), asking for a final answer without tools",
+                                MAX_TOOL_ROUNDS)
+                
+                log.debug("🌐 Round %d: streaming request to LLM Gateway", round_no)
+                turn = StreamedTurn(TOOL_CONCURRENCY)
+                async for text in self._stream_turn(openai_kwargs, turn):
+                    yield ADKResponse(text, partial=True)
+                
+                # Done unless the LLM wants tools (already running if their arguments were complete)
+                if not turn.tool_calls:
+                    break
+                calls = turn.calls()
+                log.debug("🔧 LLM requested %d tool calls", len(calls))
                 
                 # Add assistant message with tool calls to conversation
                 messages.append({
                     "role": "assistant", 
-                    "content": choice.message.content,
+                    "content": turn.content or None,
                     "tool_calls": [
                         {
-                            "id": tc.id,
+                            "id": call["id"],
                             "type": "function", 
-                            "function": {"name": tc.function.name, "arguments": tc.function.arguments}
-                        } for tc in choice.message.tool_calls
+                            "function": {"name": call["name"], "arguments": call["arguments"]}
+                        } for call in calls
                     ]
                 })
                 
-                # Execute each tool call
-                for tool_call in choice.message.tool_calls:
-                    func_name = tool_call.function.name
-                    try:
-                        func_args = json.loads(tool_call.function.arguments)
-                    except json.JSONDecodeError as e:
-                        print(f"❌ Failed to parse tool arguments: {e}")
-                        func_args = {}
-                    
-                    print(f"🛠️ Executing {func_name} with args: {func_args}")
-                    
-                    if func_name in tools_map:
-                        try:
-                            result = tools_map[func_name](**func_args)
-                            print(f"✅ Tool {func_name} result: {result}")
-                        except Exception as tool_error:
-                            result = {"error": str(tool_error)}
-                            print(f"❌ Tool {func_name} error: {result}")
-                            import traceback
-                            print(f"📍 Tool error traceback: {traceback.format_exc()}")
-                    else:
-                        result = {"error": f"Unknown tool: {func_name}"}
-                        print(f"❌ Unknown tool: {func_name}")
+                # Collect the results in the order the LLM requested them; a failed
+                # tool becomes an error result without cancelling the others, and
+                # cancelling the request does not cancel side-effecting tools
+                results = await asyncio.gather(
+                    *(asyncio.shield(call["task"]) if call["name"] in SIDE_EFFECT_TOOLS else call["task"]
+                      for call in calls), return_exceptions=True)
+                side_effects += self._side_effects(calls, results)
+                for call, result in zip(calls, results):
+                    if isinstance(result, BaseException):
+                        result = {"error": str(result)}
                     
                     # Add tool response to messages
                     messages.append({
                         "role": "tool",
-                        "tool_call_id": tool_call.id,
+                        "tool_call_id": call["id"],
                         "content": json.dumps(result)
                     })
-                
-                # Make another call with tool results
-                print(f"🔄 [DEBUG] Making follow-up request with tool results")
-                response = await self._client.chat.completions.create(
-                    model=self._model_name,
-                    messages=messages,
-                    stream=False
-                )
-                print(f"✅ [DEBUG] Got follow-up response")
-            else:
-                print("ℹ️ [DEBUG] No tool calls requested by LLM")
-
-            # Create ADK-compatible response object
-            class ADKUsageMetadata:
-                def __init__(self, openai_usage):
-                    self.prompt_token_count = openai_usage.prompt_tokens
-                    self.candidates_token_count = openai_usage.completion_tokens
-                    self.total_token_count = openai_usage.total_tokens
-                    
-            class ADKFinishReason:
-                def __init__(self, openai_finish_reason):
-                    self.value = openai_finish_reason or "stop"
-                    
-            class ADKPart:
-                def __init__(self, text):
-                    self.text = text
-                    
-            class ADKContent:
-                def __init__(self, text):
-                    self.parts = [ADKPart(text)] if text else []
-                    
-            class ADKResponse:
-                """Response wrapper to match Google ADK expected format"""
-                def __init__(self, openai_response):
-                    self.usage_metadata = ADKUsageMetadata(openai_response.usage)
-                    
-                    # Handle choices
-                    if openai_response.choices:
-                        choice = openai_response.choices[0]
-                        self.finish_reason = ADKFinishReason(choice.finish_reason)
-                        self.content = ADKContent(choice.message.content)
-                    else:
-                        self.finish_reason = ADKFinishReason("stop")
-                        self.content = ADKContent("")
-                    
-                    # Additional attributes expected by Google ADK
-                    self.partial = False
-                
-                def model_dump(self, exclude_none=True):
-                    """Pydantic-style model_dump method expected by Google ADK"""
-                    result = {
-                        'usage_metadata': {
-                            'prompt_token_count': self.usage_metadata.prompt_token_count,
-                            'candidates_token_count': self.usage_metadata.candidates_token_count,
-                            'total_token_count': self.usage_metadata.total_token_count
-                        },
-                        'finish_reason': self.finish_reason.value,
-                        'content': {
-                            'parts': [{'text': part.text} for part in self.content.parts]
-                        },
-                        'partial': self.partial
-                    }
-                    
-                    if exclude_none:
-                        result = {k: v for k, v in result.items() if v is not None}
-                    
-                    return result
-                
-                def __str__(self):
-                    return self.content.parts[0].text if self.content.parts else ""
             
             # Yield the complete response
-            yield ADKResponse(response)
+            yield ADKResponse(turn.content, turn.finish_reason, turn.usage)
                     
         except Exception as e:
-            print(f"LLM Gateway Error: {e}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
-            
-            # Return a simple error response
-            class ErrorResponse:
-                def __init__(self, text):
-                    self.content = text
-                    self.usage_metadata = None
-                    self.tool_calls = None
-                    
-                def __str__(self):
-                    return self.content
+            log.exception("LLM Gateway Error: %s", e)
             
-            yield ErrorResponse(f"Error: {str(e)}")
+            # Return a simple error response, saying which side effects already happened
+            message = f"Error: {str(e)}"
+            if turn:
+                side_effects += await self._settle_tools(turn)
+            for name, result in side_effects:
+                message += f"\n{name} completed before the error: {json.dumps(result, default=str)}"
+            yield ErrorResponse(message)
+        finally:
+            # Closed or cancelled mid-round: never leave a tool running unobserved
+            for call in turn.calls() if turn else []:
+                task = call["task"]
+                if task is None or task.done():
+                    continue
+                if call["name"] in SIDE_EFFECT_TOOLS:
+                    task.add_done_callback(functools.partial(self._log_late_result, call["name"]))
+                else:
+                    task.cancel()
 
 DATA_DIR   = Path("data")
 # Ensure n8n can find the files - use the exact path n8n monitors
@@ -257,7 +286,30 @@ OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 PRODUCTS_CSV = DATA_DIR / "products.csv"
 HISTORY_CSV  = DATA_DIR / "historical_quotes.csv"
+RULES_JSON   = DATA_DIR / "discount_rules.json"
 LOG_CSV      = DATA_DIR / "quotes_log.csv"
+QUOTES_DB    = DATA_DIR / "quotes.db"
+
+def record_quotes(quotes: list):
+    """Add saved quotes to the history journal and the quote aggregates."""
+    get_history_index(HISTORY_CSV).append([
+        {"quote_id": q["quote_id"], "customer": q["customer"], "product": i.get("name", ""),
+         "qty": i.get("qty", 0), "unit_price": i.get("unit_price", 0), "total": i.get("total", 0),
+         "accepted": "Pending", "notes": q.get("terms", "")}
+        for q in quotes for i in q.get("items", [])])
+    get_quote_aggregates(QUOTES_DB).record_many(quotes)
+
+def _record_replayed(quotes: list):
+    # The process that journaled them may have died before or after recording
+    # them; aggregates skip known quote_ids, history is filtered here.
+    known = get_history_index(HISTORY_CSV).quote_ids()
+    get_quote_aggregates(QUOTES_DB).record_many([q for q in quotes if q["quote_id"] in known])
+    new = [q for q in quotes if q["quote_id"] not in known]
+    if new:
+        record_quotes(new)
+
+# SQLite (WAL) by default, still exporting <quote_id>.json into OUT_DIR for n8n
+QUOTE_STORE = get_quote_store(QUOTES_DB, OUT_DIR, LOG_CSV, on_replay=_record_replayed)
 
 # === Auto-create mock datasets (tiny but realistic) ===
 def ensure_data():
@@ -277,6 +329,18 @@ def ensure_data():
              "qty":10,"unit_price":11000,"total":110000,"accepted":"No","notes":"requested warranty"},
         ]).to_csv(HISTORY_CSV, index=False)
 
+    if not RULES_JSON.exists():
+        write_default_rules(RULES_JSON)
+
+    # CSVs stay the editable source; tools read the compiled column stores
+    compile_if_stale(PRODUCTS_CSV)
+    compile_if_stale(HISTORY_CSV)
+
+    # Seed the quote aggregates from history on first run
+    aggregates = get_quote_aggregates(QUOTES_DB)
+    if not aggregates.summary()["count"]:
+        aggregates.rebuild_from_history(HISTORY_CSV)
+
 ensure_data()
 
 # === Tool functions with proper type annotations ===
@@ -289,60 +353,89 @@ def price_lookup(product_name: str) -> dict:
     Returns:
         Dictionary with product information or error message
     """
-    df = pd.read_csv(PRODUCTS_CSV)
-    # Make search more flexible - try partial matches and different variations
-    search_terms = [
-        product_name.lower(),
-        product_name.lower().replace('chairs', 'chair'),
-        product_name.lower().replace('tables', 'table'),
-        product_name.lower().replace('desks', 'desk')
-    ]
-    
-    for term in search_terms:
-        hits = df[df["name"].str.lower().str.contains(term)]
-        if not hits.empty:
-            row = hits.iloc[0].to_dict()
-            return {"found":True, **row}
-    
-    return {"found":False,"message":f"No product matching '{product_name}'. Available products: {', '.join(df['name'].tolist())}"}
-
-def discount_calculator(unit_price: float, qty: int, customer_type: str = "regular") -> dict:
+    row, suggestions = get_catalog(PRODUCTS_CSV).snapshot().best_match(product_name, get_embedder())
+    if row:
+        return {"found":True, **row}
+    
+    return {"found":False,"message":f"No product matching '{product_name}'. Closest products: {', '.join(suggestions)}"}
+
+def price_lookup_batch(product_names: list[str]) -> dict:
+    """Return product info for several products in one call.
+    
+    Args:
+        product_names: Names of the products to search for
+        
+    Returns:
+        Dictionary with one result per requested name, in request order
+    """
+    matches = get_catalog(PRODUCTS_CSV).snapshot().best_matches(product_names, get_embedder())
+    results = []
+    for name, (row, suggestions) in zip(product_names, matches):
+        if row:
+            results.append({"query":name, "found":True, **row})
+        else:
+            results.append({"query":name, "found":False, "suggestions":suggestions,
+                            "message":f"No product matching '{name}'. Closest products: {', '.join(suggestions)}"})
+    return {"results":results, "missing":[r["query"] for r in results if not r["found"]]}
+
+def discount_calculator(unit_price: float, qty: int, customer_type: str = "regular", product_tier: str = "") -> dict:
     """Calculate tiered discounts.
     
     Args:
         unit_price: Price per unit
         qty: Quantity
         customer_type: Type of customer ("regular" or "preferred")
+        product_tier: Product tier from price_lookup ("basic", "standard" or "premium")
         
     Returns:
         Dictionary with discount percentage and total price
     """
-    disc = 0.1 if qty>=100 else 0.05 if qty>=50 else 0.0
-    if customer_type=="preferred": disc += 0.05
+    _, _, disc = get_discount_rules(RULES_JSON).discount_for(qty, customer_type, "simple", product_tier)
     total = unit_price*qty*(1-disc)
     return {"discount_pct":disc, "total":total}
 
-def historical_match(product_name: str, top_k: int = 2) -> list:
-    """Return top k historical quotes mentioning the product.
+def historical_match(product_name: str, top_k: int = 2, customer: str = "", qty: int = 0) -> list:
+    """Return the top k most relevant historical quotes for the product.
     
     Args:
         product_name: Name of the product to search for
         top_k: Maximum number of historical quotes to return
+        customer: Optional customer name to restrict the history to
+        qty: Optional requested quantity; similar past quantities rank higher
         
     Returns:
-        List of historical quote records
+        List of historical quote records, best match first, ranked by
+        recency, acceptance and quantity similarity
     """
-    df = pd.read_csv(HISTORY_CSV)
-    hits = df[df["product"].str.lower().str.contains(product_name.lower())]
-    return hits.head(top_k).to_dict(orient="records")
+    return get_history_index(HISTORY_CSV).search(product_name, top_k=top_k, customer=customer, qty=qty)
 
-def quote_generator(customer: str, items_json: str, terms: str = "Standard T&C apply.") -> dict:
+def quote_stats(dimension: str = "all", key: str = "", limit: int = 5) -> dict:
+    """Return quote statistics: count, total value, average, min/max and acceptance rate.
+    
+    Args:
+        dimension: "all", "customer", "product" or "day"
+        key: Optional customer name, product name or YYYY-MM-DD date; leave empty for the top entries
+        limit: Number of top entries to return when no key is given
+        
+    Returns:
+        Dictionary with "stats" for a single entry or "top" for the largest entries by total value
+    """
+    return get_quote_aggregates(QUOTES_DB).query(dimension, key, limit)
+
+def quote_generator(customer: str, items_json: str, terms: str = "Standard T&C apply.",
+                    idempotency_key: str = "") -> dict:
     """Compose & save quote JSON.
     
+    Repeating a request (same customer, items and terms, or the same
+    idempotency_key) within QUOTE_DEDUPE_WINDOW returns the original quote
+    with "deduplicated": true instead of creating another one, or
+    "status": "pending" while the original is still being saved.
+    
     Args:
         customer: Customer name
         items_json: JSON string of items list, e.g. '[{"name":"Chair","qty":10,"unit_price":1500,"total":15000}]'
         terms: Terms and conditions
+        idempotency_key: Optional caller key identifying this quote request
         
     Returns:
         Dictionary with quote information including quote ID
@@ -352,25 +445,60 @@ def quote_generator(customer: str, items_json: str, terms: str = "Standard T&C a
     except json.JSONDecodeError:
         return {"error": "Invalid items_json format. Expected JSON array string."}
     
-    qid = f"Q-{uuid.uuid4().hex[:6].upper()}"
+    qid = new_quote_id()
     subtotal = sum(i.get("unit_price", 0) * i.get("qty", 0) for i in items)
     total = sum(i.get("total", 0) for i in items)
     quote = {"quote_id": qid, "customer": customer, "items": items,
-             "subtotal": subtotal, "total": total, "terms": terms}
+             "subtotal": subtotal, "total": total, "terms": terms, "created_at": created_at(qid)}
     
-    with open(OUT_DIR / f"{qid}.json", "w") as f: 
-        json.dump(quote, f, indent=2)
-    
-    with open(LOG_CSV, "a", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=["quote_id", "customer", "total"])
-        if f.tell() == 0: 
-            w.writeheader()
-        w.writerow({"quote_id": qid, "customer": customer, "total": total})
+    key = dedupe_key(idempotency_key, customer, items, terms)
+    dedupe = get_quote_dedupe(QUOTES_DB)
+    existing = dedupe.claim(key, quote, exists=QUOTE_STORE.get)
+    if existing and existing.get("status") == "pending":
+        # The first request has not saved its quote yet and may still fail
+        return {"status": "pending", "deduplicated": True,
+                "message": "An identical quote request is still being processed; try again shortly."}
+    if existing:
+        log.info("♻️ Duplicate quote request, returning %s", existing["quote_id"])
+        return {**existing, "deduplicated": True}
+    try:
+        QUOTE_STORE.save(quote)
+    except Exception:
+        dedupe.release(key, qid)
+        raise
+    dedupe.complete(key, qid)
+    record_quotes([quote])
     
     return quote
 
+# === LLM-free fast path ===
+def fast_quote(prompt: str):
+    """Run price_lookup -> discount_calculator -> quote_generator directly.
+    
+    Returns the confirmation text, or None when the request is not a
+    well-formed quote request and should go to the LLM instead.
+    """
+    if not fast_path.enabled():
+        return None
+    parsed = fast_path.parse_quote_request(prompt, get_catalog(PRODUCTS_CSV).snapshot())
+    if not parsed:
+        return None
+    
+    items = []
+    for item in parsed["items"]:
+        product = price_lookup(item["product"]["name"])
+        if not product.get("found"):
+            return None
+        priced = discount_calculator(product["unit_price"], item["qty"], parsed["customer_type"], product.get("tier", ""))
+        items.append({"name": product["name"], "qty": item["qty"],
+                      "unit_price": product["unit_price"], "total": priced["total"]})
+    quote = quote_generator(parsed["customer"], json.dumps(items))
+    if "error" in quote:
+        return None
+    return fast_path.format_summary(quote, parsed["customer_type"])
+
 # === Google ADK Agent Setup ===
-tools = [price_lookup, discount_calculator, historical_match, quote_generator]
+tools = [price_lookup, price_lookup_batch, discount_calculator, historical_match, quote_stats, quote_generator]
 
 smart_agent = LlmAgent(
     model=LLMGatewayModel(model_name=MODEL_NAME),
@@ -379,20 +507,24 @@ smart_agent = LlmAgent(
     instruction="""
 You are a Smart Quoting Agent. You have these exact tools available:
 - price_lookup(product_name: str) -> dict
-- discount_calculator(unit_price: float, qty: int, customer_type: str = "regular") -> dict  
-- historical_match(product_name: str, top_k: int = 2) -> list
+- price_lookup_batch(product_names: list[str]) -> dict
+- discount_calculator(unit_price: float, qty: int, customer_type: str = "regular", product_tier: str = "") -> dict  
+- historical_match(product_name: str, top_k: int = 2, customer: str = "", qty: int = 0) -> list
+- quote_stats(dimension: str = "all", key: str = "", limit: int = 5) -> dict
 - quote_generator(customer: str, items_json: str, terms: str = "Standard T&C apply.") -> dict
 
 FOR ANY QUOTE REQUEST:
-Step 1: Call price_lookup("product name") to get pricing
-Step 2: Call discount_calculator(price, quantity, "regular" or "preferred") 
+Step 1: Call price_lookup("product name") to get pricing. If the request has several products, call price_lookup_batch(["product 1", "product 2"]) once instead
+Step 2: Call discount_calculator(price, quantity, "regular" or "preferred", tier from price_lookup) 
 Step 3: Call quote_generator(customer_name, '[{"name":"product","qty":N,"unit_price":P,"total":T}]')
 
+For questions about past quoting activity (totals, top customers or products, acceptance rates), call quote_stats instead of historical_match.
+
 DO NOT generate formatted quotes as text. You MUST use the quote_generator tool to save quotes to files.
 
 Example: For "5 chairs for TestCorp":
 1. price_lookup("Office Chair") 
-2. discount_calculator(1500, 5, "regular")
+2. discount_calculator(1500, 5, "regular", "standard")
 3. quote_generator("TestCorp", '[{"name":"Office Chair","qty":5,"unit_price":1500,"total":7500}]')
 
 Always use tools. Never skip tools.
@@ -409,6 +541,12 @@ async def run_agent_async(prompt: str):
     """Run the Google ADK agent with the given prompt"""
     print(f"\n🤖 Processing: {prompt}")
     
+    # The fast path does catalog, pricing and file work; keep it off the event loop
+    final = await run_blocking(fast_quote, prompt)
+    if final:
+        print(f"\n⚡ Fast path response: {final}")
+        return final
+    
     try:
         # Use a unique session ID for each request to avoid conflicts
         unique_session_id = f"{SESSION_ID}_{uuid.uuid4().hex[:8]}"
@@ -422,6 +560,7 @@ async def run_agent_async(prompt: str):
                 final = e.content.parts[0].text
                 
         print(f"\n✅ Response: {final or 'No response'}")
+        return final
         
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -437,10 +576,10 @@ def test_quote_generator_directly():
     result = quote_generator("Test Direct Corp", test_items, "Direct test terms")
     print(f"Direct test result: {result}")
     
-    # Check if file was created
-    quote_files = list(OUT_DIR.glob("*.json"))
-    print(f"Files in quotes directory: {[f.name for f in quote_files]}")
-    return len(quote_files) > 0
+    # Check if the quote was stored
+    saved = QUOTE_STORE.get(result.get("quote_id", ""))
+    print(f"Quotes in store: {QUOTE_STORE.count()}")
+    return saved is not None
 
 # === Demo ===
 async def main():
@@ -463,19 +602,12 @@ async def main():
     print("\n--- Demo 1: Generate quote ---")
     await run_agent_async("Create a quote for 120 Office Chairs for ABC Corp, preferred customer.")
     
-    # Check if files were created after each demo
-    quote_files = list(OUT_DIR.glob("*.json"))
-    print(f"\n📄 Quote files created so far: {len(quote_files)}")
-    for file in quote_files:
-        print(f"   • {file.name}")
-        # Show first few lines of the file
-        try:
-            with open(file, 'r') as f:
-                content = json.load(f)
-                print(f"     Customer: {content.get('customer', 'N/A')}")
-                print(f"     Items: {len(content.get('items', []))}")
-        except Exception as e:
-            print(f"     Error reading file: {e}")
+    # Check if quotes were created after each demo
+    print(f"\n📄 Quotes created so far: {QUOTE_STORE.count()}")
+    for content in QUOTE_STORE.recent(10):
+        print(f"   • {content['quote_id']}")
+        print(f"     Customer: {content.get('customer', 'N/A')}")
+        print(f"     Items: {len(content.get('items', []))}")
     
     print("\n--- Demo 2: Ask for missing info ---")
     await run_agent_async("Need chairs and desks but didn't decide quantities.")
@@ -484,10 +616,10 @@ async def main():
     await run_agent_async("I need 50 Conference Tables for XYZ Ltd, they are a regular customer. Please create a complete quote with discounts.")
     
     # Final check
-    quote_files = list(OUT_DIR.glob("*.json"))
-    print(f"\n📄 Total quote files created: {len(quote_files)}")
-    for file in quote_files:
-        print(f"   • {file.name}")
+    print(f"\n📄 Total quotes created: {QUOTE_STORE.count()}")
+    for content in QUOTE_STORE.recent(10):
+        print(f"   • {content['quote_id']}")
 
 if __name__ == "__main__":
+    logging.basicConfig(format="%(message)s")
     asyncio.run(main())
\ No newline at end of file
@@ -3,10 +3,11 @@ Smart Quoting Agent - FIXED VERSION
 Simplified approach using direct LiteLLM integration
 """
 
-import asyncio, os, uuid, json, csv
+import asyncio, os, json, csv
 from pathlib import Path
 import pandas as pd
 from typing import List, Dict, Any
+from quote_ids import new_quote_id, created_at
 
 # === Environment Setup ===
 os.environ["OPENAI_API_BASE"] = "http://localhost:4000"
@@ -104,7 +105,7 @@ def quote_generator(customer: str, items: List[Dict], terms: str = "Standard T&C
     """Generate and save a quote"""
     print(f"📄 Generating quote for {customer} with {len(items)} items")
     
-    quote_id = f"Q-{uuid.uuid4().hex[:6].upper()}"
+    quote_id = new_quote_id()
     total = sum(item.get("total", 0) for item in items)
     
     quote = {
@@ -113,7 +114,8 @@ def quote_generator(customer: str, items: List[Dict], terms: str = "Standard T&C
         "items": items,
         "total": total,
         "terms": terms,
-        "timestamp": str(uuid.uuid4())
+        "created_at": created_at(quote_id),
+        "timestamp": created_at(quote_id)
     }
     
     # Save quote to file
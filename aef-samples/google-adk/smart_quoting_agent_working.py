@@ -2,11 +2,24 @@
 Smart Quoting Agent - Final Working Version
 """
 
-import asyncio, os, uuid, json, csv
+import asyncio, os, json, threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import pandas as pd
 import openai
 from typing import List, Dict, Any
+from catalog import get_catalog
+from semantic_search import get_embedder
+from columnar_store import compile_if_stale
+from history_index import get_history_index
+from pricing_engine import get_discount_rules, write_default_rules
+import fast_path
+from quote_store import get_quote_store
+from quote_ids import new_quote_id, created_at
+from quote_aggregates import get_quote_aggregates
+from quote_dedupe import get_quote_dedupe, idempotency_key as dedupe_key
+from token_usage import record as record_usage
+from llm_cache import get_llm_cache
 
 # === Environment Setup ===
 os.environ["OPENAI_API_BASE"] = "http://localhost:4000"
@@ -19,7 +32,38 @@ OUT_DIR.mkdir(exist_ok=True)
 
 PRODUCTS_CSV = DATA_DIR / "products.csv"
 HISTORY_CSV = DATA_DIR / "historical_quotes.csv"
+RULES_JSON = DATA_DIR / "discount_rules.json"
 LOG_CSV = DATA_DIR / "quotes_log.csv"
+QUOTES_DB = DATA_DIR / "quotes.db"
+
+def record_quotes(quotes: list):
+    """Add saved quotes to the history journal and the quote aggregates."""
+    get_history_index(HISTORY_CSV).append([
+        {"quote_id": q["quote_id"], "customer": q["customer"], "product": i.get("name", ""),
+         "qty": i.get("qty", 0), "unit_price": i.get("unit_price", 0), "total": i.get("total", 0),
+         "accepted": "Pending", "notes": q.get("terms", "")}
+        for q in quotes for i in q.get("items", [])])
+    get_quote_aggregates(QUOTES_DB).record_many(quotes)
+
+def _record_replayed(quotes: list):
+    # The process that journaled them may have died before or after recording
+    # them; aggregates skip known quote_ids, history is filtered here.
+    known = get_history_index(HISTORY_CSV).quote_ids()
+    get_quote_aggregates(QUOTES_DB).record_many([q for q in quotes if q["quote_id"] in known])
+    new = [q for q in quotes if q["quote_id"] not in known]
+    if new:
+        record_quotes(new)
+
+QUOTE_STORE = get_quote_store(QUOTES_DB, OUT_DIR, LOG_CSV, on_replay=_record_replayed)
+
+# Independent tool calls from one LLM response run concurrently, at most
+# TOOL_CONCURRENCY at a time per response, on a pool shared by all requests
+TOOL_CONCURRENCY = int(os.environ.get("TOOL_CONCURRENCY", 4))
+# Rounds of tool calls per request before the LLM must answer in text
+MAX_TOOL_ROUNDS = int(os.environ.get("MAX_TOOL_ROUNDS", 5))
+# Identical LLM requests are answered from here (see llm_cache.py)
+LLM_CACHE = get_llm_cache()
+TOOL_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get("TOOL_WORKERS", 16)), thread_name_prefix="quote-tool")
 
 # === Create Mock Data ===
 def ensure_data():
@@ -39,47 +83,42 @@ def ensure_data():
              "qty":10,"unit_price":11000,"total":110000,"accepted":"No","notes":"requested warranty"},
         ]).to_csv(HISTORY_CSV, index=False)
 
+    if not RULES_JSON.exists():
+        write_default_rules(RULES_JSON)
+
+    # CSVs stay the editable source; tools read the compiled column stores
+    compile_if_stale(PRODUCTS_CSV)
+    compile_if_stale(HISTORY_CSV)
+
+    # Seed the quote aggregates from history on first run
+    aggregates = get_quote_aggregates(QUOTES_DB)
+    if not aggregates.summary()["count"]:
+        aggregates.rebuild_from_history(HISTORY_CSV)
+
 ensure_data()
 
 # === Tool Functions ===
 def price_lookup(product_name: str) -> dict:
     """Look up product pricing by name"""
     print(f"🔍 Looking up: {product_name}")
-    df = pd.read_csv(PRODUCTS_CSV)
+    row, suggestions = get_catalog(PRODUCTS_CSV).snapshot().best_match(product_name, get_embedder())
+    if row:
+        print(f"✅ Found match: {row}")
+        return {"found": True, **row}
     
-    # Normalize search - remove plurals
-    search_name = product_name.lower().rstrip('s')
-    
-    for _, row in df.iterrows():
-        row_name = row['name'].lower().rstrip('s')
-        if search_name in row_name or row_name in search_name:
-            result = row.to_dict()
-            print(f"✅ Found match: {result}")
-            return {"found": True, **result}
-    
-    available = ", ".join(df["name"].tolist())
+    available = ", ".join(suggestions)
     error_msg = f"No product matching '{product_name}'. Available: {available}"
     print(f"❌ {error_msg}")
     return {"found": False, "message": error_msg}
 
-def discount_calculator(unit_price: float, qty: int, customer_type: str = "regular") -> dict:
-    """Calculate discounts based on quantity and customer type"""
+def discount_calculator(unit_price: float, qty: int, customer_type: str = "regular", product_tier: str = "") -> dict:
+    """Calculate discounts based on quantity, customer type and product tier"""
     print(f"💰 Calculating discount: ${unit_price} x {qty} for {customer_type} customer")
     
-    # Quantity discounts
-    if qty >= 100:
-        qty_discount = 0.15
-    elif qty >= 50:
-        qty_discount = 0.10
-    elif qty >= 20:
-        qty_discount = 0.05
-    else:
-        qty_discount = 0.0
-    
-    # Customer type discount
-    customer_discount = 0.05 if customer_type == "preferred" else 0.0
+    # Rules come from data/discount_rules.json and hot-reload on change
+    qty_discount, customer_discount, total_discount = get_discount_rules(RULES_JSON).discount_for(
+        qty, customer_type, "working", product_tier)
     
-    total_discount = qty_discount + customer_discount
     discounted_price = unit_price * (1 - total_discount)
     total = discounted_price * qty
     
@@ -96,11 +135,12 @@ def discount_calculator(unit_price: float, qty: int, customer_type: str = "regul
     print(f"✅ Discount calculated: {result}")
     return result
 
-def quote_generator(customer: str, items: List[Dict], terms: str = "Standard T&C apply") -> dict:
-    """Generate and save a quote"""
+def quote_generator(customer: str, items: List[Dict], terms: str = "Standard T&C apply",
+                    idempotency_key: str = "") -> dict:
+    """Generate and save a quote (repeats within QUOTE_DEDUPE_WINDOW return the original)"""
     print(f"📄 Generating quote for {customer} with {len(items)} items")
     
-    quote_id = f"Q-{uuid.uuid4().hex[:6].upper()}"
+    quote_id = new_quote_id()
     total = sum(item.get("total", 0) for item in items)
     
     quote = {
@@ -109,24 +149,41 @@ def quote_generator(customer: str, items: List[Dict], terms: str = "Standard T&C
         "items": items,
         "total": total,
         "terms": terms,
-        "timestamp": str(uuid.uuid4())
+        "created_at": created_at(quote_id),
+        "timestamp": created_at(quote_id)
     }
     
-    # Save quote to file
-    quote_file = OUT_DIR / f"{quote_id}.json"
-    with open(quote_file, "w") as f:
-        json.dump(quote, f, indent=2)
+    # Retried requests get the original quote back instead of a new file and email
+    key = dedupe_key(idempotency_key, customer, items, terms)
+    dedupe = get_quote_dedupe(QUOTES_DB)
+    existing = dedupe.claim(key, quote, exists=QUOTE_STORE.get)
+    if existing and existing.get("status") == "pending":
+        # The first request has not saved its quote yet and may still fail
+        return {"status": "pending", "deduplicated": True,
+                "message": "An identical quote request is still being processed; try again shortly."}
+    if existing:
+        print(f"♻️ Duplicate quote request, returning {existing['quote_id']}")
+        return {**existing, "deduplicated": True}
+    
+    # Save quote (SQLite store + JSON export, or legacy files)
+    try:
+        QUOTE_STORE.save(quote)
+    except Exception:
+        dedupe.release(key, quote_id)
+        raise
+    dedupe.complete(key, quote_id)
     
-    # Log the quote
-    with open(LOG_CSV, "a", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["quote_id", "customer", "total"])
-        if f.tell() == 0:
-            writer.writeheader()
-        writer.writerow({"quote_id": quote_id, "customer": customer, "total": total})
+    # Make the new quote searchable as history without re-reading the CSV
+    record_quotes([quote])
     
-    print(f"✅ Quote {quote_id} generated and saved to {quote_file}")
+    print(f"✅ Quote {quote_id} generated and saved")
     return quote
 
+def quote_stats(dimension: str = "all", key: str = "", limit: int = 5) -> dict:
+    """Quote statistics overall or by customer, product or day"""
+    print(f"📊 Quote stats: dimension={dimension} key={key!r}")
+    return get_quote_aggregates(QUOTES_DB).query(dimension, key, limit)
+
 # === LLM Setup ===
 client = openai.OpenAI(
     api_key=os.environ["OPENAI_API_KEY"],
@@ -137,6 +194,7 @@ client = openai.OpenAI(
 TOOLS = {
     "price_lookup": price_lookup,
     "discount_calculator": discount_calculator, 
+    "quote_stats": quote_stats,
     "quote_generator": quote_generator
 }
 
@@ -179,12 +237,42 @@ TOOL_SCHEMAS = [
                         "type": "string",
                         "description": "Type of customer: 'regular' or 'preferred'",
                         "enum": ["regular", "preferred"]
+                    },
+                    "product_tier": {
+                        "type": "string",
+                        "description": "Product tier from price_lookup, e.g. 'standard'"
                     }
                 },
                 "required": ["unit_price", "qty"]
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "quote_stats",
+            "description": "Get quote statistics (count, total value, average, min/max, acceptance rate) overall or by customer, product or day",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "dimension": {
+                        "type": "string",
+                        "description": "What to group by",
+                        "enum": ["all", "customer", "product", "day"]
+                    },
+                    "key": {
+                        "type": "string",
+                        "description": "Customer name, product name or YYYY-MM-DD date; omit for the top entries"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Number of top entries to return when no key is given"
+                    }
+                },
+                "required": []
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
@@ -213,6 +301,10 @@ TOOL_SCHEMAS = [
                     "terms": {
                         "type": "string",
                         "description": "Terms and conditions"
+                    },
+                    "idempotency_key": {
+                        "type": "string",
+                        "description": "Optional key identifying this quote request; repeats return the same quote"
                     }
                 },
                 "required": ["customer", "items"]
@@ -221,15 +313,72 @@ TOOL_SCHEMAS = [
     }
 ]
 
+# === LLM-free fast path ===
+def fast_quote(user_request: str):
+    """Run the tool chain directly for well-formed requests (None otherwise)"""
+    if not fast_path.enabled():
+        return None
+    parsed = fast_path.parse_quote_request(user_request, get_catalog(PRODUCTS_CSV).snapshot())
+    if not parsed:
+        return None
+    
+    print("⚡ Fast path: request parsed without the LLM")
+    items = []
+    for item in parsed["items"]:
+        product = price_lookup(item["product"]["name"])
+        if not product.get("found"):
+            return None
+        priced = discount_calculator(product["unit_price"], item["qty"], parsed["customer_type"], product.get("tier", ""))
+        items.append({"name": product["name"], "qty": item["qty"],
+                      "unit_price": product["unit_price"], "total": priced["total"]})
+    quote = quote_generator(parsed["customer"], items)
+    return fast_path.format_summary(quote, parsed["customer_type"])
+
 # === Smart Quoting Agent Function ===
+def run_tool_call(tool_call) -> str:
+    """Execute one tool call; failures become an error message for the LLM"""
+    tool_name = tool_call.function.name
+    try:
+        tool_args = json.loads(tool_call.function.arguments or "{}")
+    except json.JSONDecodeError as e:
+        print(f"   ❌ Invalid arguments for {tool_name}: {e}")
+        return f"Error: invalid arguments for {tool_name}: {e}"
+    
+    print(f"   🔧 Calling {tool_name} with {tool_args}")
+    
+    if tool_name not in TOOLS:
+        return f"Error: Unknown tool {tool_name}"
+    try:
+        return json.dumps(TOOLS[tool_name](**tool_args), indent=2)
+    except Exception as e:
+        print(f"   ❌ Tool error: {e}")
+        return f"Error: {str(e)}"
+
+def run_tool_calls(tool_calls) -> list:
+    """Run one response's tool calls on TOOL_POOL, at most TOOL_CONCURRENCY
+    at a time; results keep the LLM's order"""
+    slots = threading.Semaphore(TOOL_CONCURRENCY)
+    futures = []
+    for tool_call in tool_calls:
+        slots.acquire()
+        future = TOOL_POOL.submit(run_tool_call, tool_call)
+        future.add_done_callback(lambda _: slots.release())
+        futures.append(future)
+    return [future.result() for future in futures]
+
 def smart_quote_agent(user_request: str) -> str:
     """Main agent function that processes quote requests"""
     
+    fast_response = fast_quote(user_request)
+    if fast_response:
+        return fast_response
+    
     system_prompt = """You are a Smart Quoting Agent. Your job is to help create professional quotes using the available tools.
 
 Available tools:
 - price_lookup(product_name): Get product info and pricing  
-- discount_calculator(unit_price, qty, customer_type): Calculate discounts
+- discount_calculator(unit_price, qty, customer_type, product_tier): Calculate discounts
+- quote_stats(dimension, key, limit): Totals, averages and acceptance rates of past quotes
 - quote_generator(customer, items, terms): Create and save quote
 
 WORKFLOW for quote requests:
@@ -246,19 +395,38 @@ Be helpful and conversational, but ALWAYS use the tools for quotes. Never make u
         {"role": "user", "content": user_request}
     ]
     
+    # Each round may call tools; their results go into the next round until
+    # the LLM answers in text (at most MAX_TOOL_ROUNDS rounds of tools)
+    round_no = 0
     try:
-        response = client.chat.completions.create(
-            model="gemini-2.5-flash",
-            messages=messages,
-            tools=TOOL_SCHEMAS,
-            tool_choice="auto"
-        )
-        
-        message = response.choices[0].message
-        
-        # Handle tool calls
-        if message.tool_calls:
-            print(f"🛠️ LLM wants to use {len(message.tool_calls)} tools")
+        for round_no in range(1, MAX_TOOL_ROUNDS + 2):
+            request = {"model": "gemini-2.5-flash", "messages": messages}
+            if round_no <= MAX_TOOL_ROUNDS:
+                request.update(tools=TOOL_SCHEMAS, tool_choice="auto")
+            else:
+                print(f"⚠️ Reached MAX_TOOL_ROUNDS ({MAX_TOOL_ROUNDS}), asking for a final answer")
+            response, cached = LLM_CACHE.completion(client.chat.completions.create, **request)
+            if not cached:
+                record_usage(response)
+            
+            if not response.choices:
+                print("⚠️ No response received from LLM")
+                if round_no > 1:
+                    return "Quote processed successfully, but no summary response was generated."
+                return "No response received"
+            message = response.choices[0].message
+            
+            # No (more) tools needed
+            if not message.tool_calls:
+                print(f"✅ {'Final' if round_no > 1 else 'Direct'} response: {message.content}")
+                return message.content
+            
+            if round_no > MAX_TOOL_ROUNDS:
+                # Tools were not offered this round; don't run what the LLM asked for anyway
+                print(f"⚠️ LLM still wants {len(message.tool_calls)} tools after {MAX_TOOL_ROUNDS} rounds")
+                break
+            
+            print(f"🛠️ Round {round_no}: LLM wants to use {len(message.tool_calls)} tools")
             
             # Add assistant message with tool calls
             messages.append({
@@ -276,60 +444,20 @@ Be helpful and conversational, but ALWAYS use the tools for quotes. Never make u
                 ]
             })
             
-            # Execute each tool call
-            for tool_call in message.tool_calls:
-                tool_name = tool_call.function.name
-                tool_args = json.loads(tool_call.function.arguments)
-                
-                print(f"   🔧 Calling {tool_name} with {tool_args}")
-                
-                if tool_name in TOOLS:
-                    try:
-                        tool_result = TOOLS[tool_name](**tool_args)
-                        result_content = json.dumps(tool_result, indent=2)
-                    except Exception as e:
-                        result_content = f"Error: {str(e)}"
-                        print(f"   ❌ Tool error: {e}")
-                else:
-                    result_content = f"Error: Unknown tool {tool_name}"
-                
+            # Execute the tool calls concurrently; results keep the LLM's order
+            for tool_call, result_content in zip(message.tool_calls, run_tool_calls(message.tool_calls)):
                 # Add tool result to messages
                 messages.append({
                     "role": "tool",
                     "tool_call_id": tool_call.id,
                     "content": result_content
                 })
-            
-            # Get final response after tool execution
-            try:
-                final_response = client.chat.completions.create(
-                    model="gemini-2.5-flash",
-                    messages=messages
-                )
-                
-                if final_response.choices and len(final_response.choices) > 0:
-                    final_content = final_response.choices[0].message.content
-                    print(f"✅ Final response: {final_content}")
-                    return final_content
-                else:
-                    print("⚠️ No response received from LLM")
-                    return "Quote processed successfully, but no summary response was generated."
-                    
-            except Exception as e:
-                print(f"❌ Error in final response: {e}")
-                return f"Quote processing completed, but encountered error in response generation: {str(e)}"
         
-        else:
-            # No tools needed
-            if response.choices and len(response.choices) > 0:
-                content = response.choices[0].message.content
-                print(f"✅ Direct response: {content}")
-                return content
-            else:
-                print("⚠️ No response received from LLM")
-                return "No response received"
-            
+        return message.content or f"Stopped after {MAX_TOOL_ROUNDS} rounds of tool calls without a final answer."
     except Exception as e:
+        if round_no > 1:
+            print(f"❌ Error in final response: {e}")
+            return f"Quote processing completed, but encountered error in response generation: {str(e)}"
         error_msg = f"Error processing request: {str(e)}"
         print(f"❌ {error_msg}")
         return error_msg
@@ -364,10 +492,11 @@ def main():
     
     # Show generated quotes
     print(f"\n📁 Generated quote files in: {OUT_DIR.absolute()}")
-    if list(OUT_DIR.glob("*.json")):
-        print("Quote files created:")
-        for quote_file in OUT_DIR.glob("*.json"):
-            print(f"   • {quote_file.name}")
+    recent = QUOTE_STORE.recent(10)
+    if recent:
+        print("Quotes created:")
+        for quote in recent:
+            print(f"   • {quote['quote_id']}")
     else:
         print("   (No quote files generated)")
 
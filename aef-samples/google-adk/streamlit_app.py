@@ -16,8 +16,10 @@ import os
 # Import the agent components
 from simple_agent import (
     smart_agent, session_service, runner, APP_NAME, USER_ID, 
-    types, OUT_DIR, PRODUCTS_CSV, HISTORY_CSV
+    types, PRODUCTS_CSV, QUOTES_DB, QUOTE_STORE, fast_quote
 )
+from quote_aggregates import get_quote_aggregates
+from google.adk.agents.run_config import RunConfig, StreamingMode
 
 # Configure Streamlit page
 st.set_page_config(
@@ -91,25 +93,33 @@ with st.sidebar:
     
     # Quote statistics
     st.subheader("📈 Statistics")
-    quote_files = list(OUT_DIR.glob("*.json"))
-    st.metric("Total Quotes", len(quote_files))
+    total_quotes = QUOTE_STORE.count()
+    aggregates = get_quote_aggregates(QUOTES_DB)
+    summary = aggregates.summary()
+    st.metric("Total Quotes", total_quotes)
     st.metric("Session Quotes", st.session_state.quote_count)
+    st.metric("Total Quoted Value", f"${summary['total']:,.0f}")
+    if summary["acceptance_rate"] is not None:
+        st.metric("Acceptance Rate", f"{summary['acceptance_rate']:.0%}")
+    
+    st.write("**Top Customers**")
+    for row in aggregates.top("customer", 3):
+        st.write(f"• {row['key']}: {row['count']} quotes, ${row['total']:,.0f}")
+    st.write("**Top Products**")
+    for row in aggregates.top("product", 3):
+        st.write(f"• {row['key']}: {row['qty']:,.0f} units, ${row['total']:,.0f}")
     
     st.divider()
     
     # Recent quotes
     st.subheader("📋 Recent Quotes")
-    if quote_files:
-        for file in sorted(quote_files, key=lambda x: x.stat().st_mtime, reverse=True)[:3]:
-            try:
-                with open(file, 'r') as f:
-                    quote_data = json.load(f)
-                st.write(f"**{quote_data['quote_id']}**")
-                st.write(f"Customer: {quote_data['customer']}")
-                st.write(f"Total: ${quote_data['total']:,}")
-                st.write("---")
-            except Exception as e:
-                st.write(f"Error reading {file.name}")
+    recent_quotes = QUOTE_STORE.recent(3)
+    if recent_quotes:
+        for quote_data in recent_quotes:
+            st.write(f"**{quote_data['quote_id']}**")
+            st.write(f"Customer: {quote_data['customer']}")
+            st.write(f"Total: ${quote_data['total']:,}")
+            st.write("---")
     else:
         st.write("No quotes yet")
 
@@ -157,6 +167,7 @@ with col1:
                 })
                 
                 # Process with agent
+                live_response = st.empty()
                 with st.spinner("🤖 Agent is processing your request..."):
                     try:
                         # Run the agent asynchronously
@@ -173,19 +184,26 @@ with col1:
                                 parts=[types.Part(text=user_input)]
                             )
                             
+                            # Show the reply as it streams in (partial events carry new text)
                             response_text = ""
+                            streamed = ""
                             async for e in runner.run_async(
                                 user_id=USER_ID, 
                                 session_id=unique_session_id, 
-                                new_message=user_content
+                                new_message=user_content,
+                                run_config=RunConfig(streaming_mode=StreamingMode.SSE)
                             ):
-                                if e.is_final_response() and e.content and e.content.parts:
+                                if e.partial and e.content and e.content.parts and e.content.parts[0].text:
+                                    streamed += e.content.parts[0].text
+                                    live_response.markdown(f"**Agent:** {streamed}▌")
+                                elif e.is_final_response() and e.content and e.content.parts:
                                     response_text = e.content.parts[0].text
                             
+                            live_response.empty()
                             return response_text
                         
-                        # Run the async function
-                        response = asyncio.run(process_request())
+                        # Well-formed requests skip the LLM entirely
+                        response = fast_quote(user_input) or asyncio.run(process_request())
                         
                         if response:
                             # Add agent response to history
@@ -196,8 +214,7 @@ with col1:
                             })
                             
                             # Check if a new quote was created
-                            current_quotes = list(OUT_DIR.glob("*.json"))
-                            if len(current_quotes) > len(quote_files):
+                            if QUOTE_STORE.count() > total_quotes:
                                 st.session_state.quote_count += 1
                                 st.success("✅ New quote generated successfully!")
                         else:
@@ -243,19 +260,17 @@ with col2:
     # File explorer
     st.subheader("📁 Quote Files")
     
-    quote_files = list(OUT_DIR.glob("*.json"))
-    if quote_files:
-        selected_file = st.selectbox(
+    quote_ids = [q['quote_id'] for q in QUOTE_STORE.recent(50)]
+    if quote_ids:
+        selected_quote = st.selectbox(
             "Select a quote to view:",
-            options=[f.name for f in sorted(quote_files, key=lambda x: x.stat().st_mtime, reverse=True)],
+            options=quote_ids,
             key="file_selector"
         )
         
-        if selected_file:
-            file_path = OUT_DIR / selected_file
+        if selected_quote:
             try:
-                with open(file_path, 'r') as f:
-                    quote_data = json.load(f)
+                quote_data = QUOTE_STORE.get(selected_quote)
                 
                 st.markdown(f"""
                 <div class="quote-card">
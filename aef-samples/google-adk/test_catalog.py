@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Catalog lookup tests
+---------------------------------------
+Checks that price lookups resolve exact names, plurals and typos, and that
+names sharing only one word with a product come back as suggestions
+instead of that product's price.
+
+    python test_catalog.py
+"""
+
+import sys, tempfile, threading, time
+from pathlib import Path
+sys.path.insert(0, '.')
+
+from catalog import ProductCatalog
+from sample_catalog import PRODUCTS, snapshot
+
+
+def test_matches():
+    snap = snapshot()
+    for query, sku in [("Office Chair", "CH-100"), ("office chairs", "CH-100"), ("CH-100", "CH-100"),
+                       ("Ofice Chair", "CH-100"), ("Conferance Table", "TB-200"), ("conference tables", "TB-200"), ("Developer Desks", "DS-300")]:
+        row, _ = snap.best_match(query)
+        assert row and row["sku"] == sku, (query, row)
+
+
+def test_one_shared_word_is_a_miss():
+    snap = snapshot()
+    for query, suggestion in [("Office Laptop", "Office Chair"), ("Office Printer", "Office Chair"),
+                              ("Coffee Table", "Conference Table"), ("Table Lamp", "Conference Table"),
+                              ("Standing Desk", "Developer Desk")]:
+        row, suggestions = snap.best_match(query)
+        assert row is None, (query, row)
+        assert suggestion in suggestions, (query, suggestions)
+
+
+def test_batch_matches_single():
+    snap = snapshot()
+    queries = ["Office Chairs", "Office Printer", "office chair", "Visitor Stool"]
+    assert snap.best_matches(queries) == [snap.best_match(q) for q in queries]
+
+
+def test_reload_serves_previous_snapshot():
+    with tempfile.TemporaryDirectory() as root:
+        path = Path(root) / "products.csv"
+        path.write_text(PRODUCTS)
+        catalog = ProductCatalog(path)
+        old = catalog.snapshot()
+
+        release, load = threading.Event(), catalog._load
+        catalog._load = lambda key: release.wait(10) and load(key)   # a slow reload
+        path.write_text(PRODUCTS + "LP-500,Laptop Stand,450,basic\n")
+        t0 = time.perf_counter()
+        assert catalog.snapshot() is old and catalog.snapshot() is old
+        assert time.perf_counter() - t0 < 1, "lookups waited for the reload"
+
+        release.set()
+        deadline = time.monotonic() + 10
+        while catalog.snapshot() is old and time.monotonic() < deadline:
+            time.sleep(0.01)
+        row, _ = catalog.snapshot().best_match("Laptop Stand")
+        assert row and row["sku"] == "LP-500"
+
+
+if __name__ == "__main__":
+    print("🧪 Catalog lookup tests")
+    print("=" * 60)
+    for test in (test_matches, test_one_shared_word_is_a_miss, test_batch_matches_single,
+                 test_reload_serves_previous_snapshot):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Fast path parser tests
+---------------------------------------
+Checks that well-formed quote requests are parsed without the LLM and that
+anything with extra or unclear text after the customer falls back to it.
+
+    python test_fast_path.py
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from fast_path import parse_quote_request
+from sample_catalog import snapshot
+
+
+def test_well_formed_requests():
+    snap = snapshot()
+    cases = [
+        ("Create a quote for 120 Office Chairs for ABC Corp, preferred customer", "ABC Corp", "preferred", 1),
+        ("Generate quote for TechStart Inc (regular customer): 50 Office Chairs and 10 Conference Tables",
+         "TechStart Inc", "regular", 2),
+        ("Quote 5 Developer Desks for Bank of America", "Bank of America", "regular", 1),
+        ("Need 3 office chairs for Acme Ltd.", "Acme Ltd", "regular", 1),
+    ]
+    for text, customer, customer_type, n_items in cases:
+        parsed = parse_quote_request(text, snap)
+        assert parsed, text
+        assert (parsed["customer"], parsed["customer_type"], len(parsed["items"])) == \
+            (customer, customer_type, n_items), (text, parsed)
+
+
+def test_ambiguous_customer_goes_to_llm():
+    snap = snapshot()
+    for text in ["Create a quote for 120 Office Chairs for ABC Corp preferred customer",
+                 "Create a quote for 120 Office Chairs for ABC Corp with 20% off",
+                 "Create a quote for 120 Office Chairs for ABC Corp for delivery next week",
+                 "I need 5 Office Chairs for my new hires",
+                 "Quote 5 Office Chairs for ABC Corp but only if in stock",
+                 "Quote 5 Office Chairs for Team 7",
+                 "Quote 5 Office Chairs for the team"]:
+        assert parse_quote_request(text, snap) is None, text
+
+
+if __name__ == "__main__":
+    print("🧪 Fast path parser tests")
+    print("=" * 60)
+    for test in (test_well_formed_requests, test_ambiguous_customer_goes_to_llm):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Pricing engine tests
+---------------------------------------
+Checks that the vectorized repricer gives every line the same discount as
+the scalar discount_for, including tier overrides whose labels differ in
+case from the rules file.
+
+    python test_pricing_engine.py
+"""
+
+import sys
+import numpy as np
+sys.path.insert(0, '.')
+
+from pricing_engine import DEFAULT_RULES, compile_rules
+
+
+def test_price_lines_matches_discount_for():
+    spec = {**DEFAULT_RULES["schedules"]["working"], "max_discount": 0.2,
+            "tier_overrides": {"Premium": {"max_discount": 0.12}, "basic": {"customer_adders": {}}}}
+    schedule = compile_rules({"schedules": {"working": spec}})["working"]
+    qtys = [1, 20, 50, 100, 150, 100, 100, 100, 60]
+    customer_types = ["regular", "preferred", "regular", "preferred", "preferred",
+                      "preferred", "preferred", "preferred", "vip"]
+    tiers = ["", "standard", "premium", "premium", "Premium", "PREMIUM", "basic", "Basic", None]
+
+    lines = schedule.price_lines(np.full(len(qtys), 100.0), qtys, customer_types, tiers)
+    for i, (qty, ctype, tier) in enumerate(zip(qtys, customer_types, tiers)):
+        expected = schedule.discount_for(qty, ctype, tier)
+        got = (lines["qty_discount"][i], lines["customer_discount"][i], lines["total_discount"][i])
+        assert np.allclose(got, expected), f"line {i} ({qty}, {ctype}, {tier!r}): {got} != {expected}"
+    assert np.allclose(lines["total_discount"][3:6], 0.12)
+    print(f"✅ price_lines matches discount_for on {len(qtys)} lines")
+
+
+if __name__ == "__main__":
+    print("🧪 Pricing engine tests")
+    print("=" * 60)
+    test_price_lines_matches_discount_for()
+    print("=" * 60)
+    print("🎉 All pricing checks passed")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Quote feed tests
+---------------------------------------
+Pushes quotes to a local webhook and checks that every quote is delivered,
+that rewriting the manifest (shorter or longer, as ``quote_shards.py
+migrate`` does) replays it once instead of looping or sending partial rows,
+and that rows without a quote_id do not make the push loop spin.
+
+    python test_quote_feed.py
+"""
+
+import json, sys, tempfile, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+sys.path.insert(0, '.')
+
+from file_utils import atomic_write, csv_line
+from quote_feed import QuoteFeed, push
+from quote_shards import MANIFEST_FIELDS, QuoteDirectory
+
+
+def quote(n: int) -> dict:
+    return {"quote_id": f"Q-{n:04d}", "customer": f"Customer {n}", "total": 100.0 * n,
+            "created_at": f"2026-01-01T00:00:{n % 60:02d}.000+00:00"}
+
+
+class Webhook:
+    """Local HTTP endpoint that records the quote IDs POSTed to it."""
+
+    def __init__(self):
+        received = self.received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                event = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                received.append(event["quote_id"])
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def run_push(feed: QuoteFeed, url: str, seconds: float) -> int:
+    """Run ``push`` for ``seconds``; returns how many times it read the manifest."""
+    reads = []
+    read = feed.read
+    feed.read = lambda *args, **kwargs: reads.append(1) or read(*args, **kwargs)
+    stop = threading.Event()
+    thread = threading.Thread(target=push, args=(feed, url, "test", stop), daemon=True)
+    thread.start()
+    time.sleep(seconds)
+    stop.set()
+    thread.join(5)
+    feed.read = read
+    return len(reads)
+
+
+def rewrite_manifest(root: Path, quotes: list):
+    """Replace the manifest the way ``quote_shards.py migrate`` does."""
+    qdir = QuoteDirectory(root)
+    atomic_write(qdir.manifest, csv_line(MANIFEST_FIELDS, lineterminator="\n")
+                 + "".join(csv_line(MANIFEST_FIELDS, qdir.manifest_row(q), "\n") for q in quotes))
+
+
+def test_delivers_new_quotes():
+    with tempfile.TemporaryDirectory() as root:
+        webhook = Webhook()
+        try:
+            QuoteDirectory(root).write([quote(n) for n in range(3)])
+            run_push(QuoteFeed(root), webhook.url, 0.5)
+            assert webhook.received == ["Q-0000", "Q-0001", "Q-0002"], webhook.received
+            QuoteDirectory(root).write([quote(3)])
+            run_push(QuoteFeed(root), webhook.url, 0.5)
+            assert webhook.received[3:] == ["Q-0003"], webhook.received
+        finally:
+            webhook.close()
+
+
+def test_shorter_rewrite_replays_once():
+    with tempfile.TemporaryDirectory() as root:
+        webhook = Webhook()
+        try:
+            quotes = [quote(n) for n in range(20)]
+            QuoteDirectory(root).write(quotes)
+            run_push(QuoteFeed(root), webhook.url, 0.5)
+            rewrite_manifest(Path(root), quotes[:1])
+            webhook.received.clear()
+            run_push(QuoteFeed(root), webhook.url, 1.0)
+            assert webhook.received == ["Q-0000"], webhook.received[:10]
+        finally:
+            webhook.close()
+
+
+def test_longer_rewrite_sends_whole_rows():
+    with tempfile.TemporaryDirectory() as root:
+        webhook = Webhook()
+        try:
+            QuoteDirectory(root).write([quote(1)])
+            run_push(QuoteFeed(root), webhook.url, 0.5)
+            quotes = [quote(n) for n in range(100, 110)]
+            rewrite_manifest(Path(root), quotes)
+            webhook.received.clear()
+            run_push(QuoteFeed(root), webhook.url, 1.0)
+            assert webhook.received == [q["quote_id"] for q in quotes], webhook.received
+        finally:
+            webhook.close()
+
+
+def test_rows_without_quote_id_do_not_spin():
+    with tempfile.TemporaryDirectory() as root:
+        webhook = Webhook()
+        try:
+            qdir = QuoteDirectory(root)
+            qdir.manifest.write_text(csv_line(MANIFEST_FIELDS, lineterminator="\n"))
+            assert run_push(QuoteFeed(root), webhook.url, 1.0) < 5
+            with open(qdir.manifest, "a") as f:
+                f.write(",orphan.json,,,\n")
+            feed = QuoteFeed(root)
+            assert run_push(feed, webhook.url, 1.0) < 5
+            assert feed.committed("test")[0] == qdir.manifest.stat().st_size
+            assert not webhook.received
+        finally:
+            webhook.close()
+
+
+if __name__ == "__main__":
+    print("🧪 Quote feed tests")
+    print("=" * 60)
+    for test in (test_delivers_new_quotes, test_shorter_rewrite_replays_once, test_longer_rewrite_sends_whole_rows,
+                 test_rows_without_quote_id_do_not_spin):
+        test()
+        print(f"✅ {test.__name__}")
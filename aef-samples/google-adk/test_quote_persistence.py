@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Stress test for quote persistence
+---------------------------------------
+Runs 32 writer processes against the file and SQLite quote stores at once
+while a reader process keeps parsing every quote JSON it can see, then
+checks that no quote is torn, lost or duplicated and that quotes_log.csv
+and the shard manifest have exactly one header.
+
+    python test_quote_persistence.py [--writers 32] [--quotes 25]
+"""
+
+import argparse, csv, json, multiprocessing as mp, sys, tempfile, time
+from pathlib import Path
+sys.path.insert(0, '.')
+
+from quote_store import FileQuoteStore, SqliteQuoteStore, LOG_FIELDS
+from quote_shards import QuoteDirectory, MANIFEST_FIELDS
+
+
+def make_quote(writer: int, n: int) -> dict:
+    # Large enough that a non-atomic write would be observable mid-flight
+    items = [{"name": f"Product {i}", "qty": i + 1, "unit_price": 10.0, "total": 10.0 * (i + 1)}
+             for i in range(200)]
+    return {"quote_id": f"Q-{writer:03d}-{n:04d}", "customer": f"Customer {writer}",
+            "items": items, "total": sum(i["total"] for i in items), "terms": "Net 30"}
+
+
+def writer(backend: str, root: str, writer_id: int, quotes: int, start):
+    root = Path(root)
+    if backend == "files":
+        store = FileQuoteStore(root / "quotes", root / "quotes_log.csv")
+    else:
+        store = SqliteQuoteStore(root / "quotes.db", export_dir=root / "quotes")
+    start.wait()
+    for n in range(quotes):
+        store.save(make_quote(writer_id, n))
+
+
+def reader(root: str, stop, errors):
+    out_dir = Path(root) / "quotes"
+    while not stop.is_set():
+        for path in out_dir.rglob("Q-*.json"):
+            try:
+                with open(path) as f:
+                    json.load(f)
+            except FileNotFoundError:
+                continue
+            except ValueError as e:
+                errors.put(f"torn read of {path.name}: {e}")
+        time.sleep(0.001)
+
+
+def run(backend: str, writers: int, quotes: int) -> list:
+    """Run one stress round; returns a list of failure messages."""
+    problems = []
+    with tempfile.TemporaryDirectory() as root:
+        (Path(root) / "quotes").mkdir()
+        ctx = mp.get_context("spawn")
+        start, stop, errors = ctx.Event(), ctx.Event(), ctx.Queue()
+        procs = [ctx.Process(target=writer, args=(backend, root, w, quotes, start)) for w in range(writers)]
+        watcher = ctx.Process(target=reader, args=(root, stop, errors))
+        watcher.start()
+        for p in procs:
+            p.start()
+        t0 = time.perf_counter()
+        start.set()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        watcher.join()
+
+        problems += [f"writer exited with {p.exitcode}" for p in procs if p.exitcode]
+        while not errors.empty():
+            problems.append(errors.get())
+
+        expected = {f"Q-{w:03d}-{n:04d}" for w in range(writers) for n in range(quotes)}
+        files = [p for p in (Path(root) / "quotes").rglob("*") if p.is_file()]
+        names = {p.stem for p in files if p.suffix == ".json"}
+        if names != expected:
+            problems.append(f"{len(expected - names)} quote files missing, {len(names - expected)} unexpected")
+        if any(p.name.endswith(".tmp") for p in files):
+            problems.append("temp files left behind")
+        for p in files:
+            if p.suffix == ".json" and len(json.loads(p.read_text())["items"]) != 200:
+                problems.append(f"{p.name} is incomplete")
+
+        with open(Path(root) / "quotes" / "manifest.csv", newline="") as f:
+            manifest = list(csv.reader(f))
+        if manifest[0] != MANIFEST_FIELDS or manifest.count(MANIFEST_FIELDS) != 1:
+            problems.append("manifest.csv has a missing or repeated header")
+        if sorted(r[0] for r in manifest[1:]) != sorted(expected):
+            problems.append(f"manifest.csv has {len(manifest) - 1} rows, expected {len(expected)}")
+        qdir = QuoteDirectory(Path(root) / "quotes")
+        if qdir.count() != len(expected) or len(qdir.tail(10)) != 10:
+            problems.append("manifest count/tail mismatch")
+
+        if backend == "files":
+            with open(Path(root) / "quotes_log.csv", newline="") as f:
+                rows = list(csv.reader(f))
+            headers = sum(1 for r in rows if r == LOG_FIELDS)
+            ids = [r[0] for r in rows[1:]]
+            if rows[0] != LOG_FIELDS or headers != 1:
+                problems.append(f"quotes_log.csv has {headers} headers")
+            if len(ids) != len(expected) or set(ids) != expected:
+                problems.append(f"quotes_log.csv has {len(ids)} rows, expected {len(expected)}")
+            if any(len(r) != len(LOG_FIELDS) for r in rows):
+                problems.append("quotes_log.csv has interleaved rows")
+        else:
+            count = SqliteQuoteStore(Path(root) / "quotes.db").count()
+            if count != len(expected):
+                problems.append(f"quotes.db has {count} rows, expected {len(expected)}")
+
+        total = writers * quotes
+        print(f"{'✅' if not problems else '❌'} {backend}: {total} quotes from {writers} processes "
+              f"in {elapsed:.2f}s ({total / elapsed:,.0f} quotes/s)")
+    return problems
+
+
+def test_file_store(writers: int = 32, quotes: int = 25):
+    problems = run("files", writers, quotes)
+    assert not problems, problems
+
+
+def test_sqlite_store(writers: int = 32, quotes: int = 25):
+    problems = run("sqlite", writers, quotes)
+    assert not problems, problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--quotes", type=int, default=25, help="quotes per writer")
+    args = parser.parse_args()
+
+    print("🧪 Quote persistence stress test")
+    print("=" * 60)
+    failures = []
+    for backend in ("files", "sqlite"):
+        for problem in run(backend, args.writers, args.quotes):
+            print(f"   ❌ {problem}")
+            failures.append(problem)
+    print("=" * 60)
+    print("🎉 All persistence checks passed" if not failures else f"❌ {len(failures)} problems found")
+    sys.exit(1 if failures else 0)
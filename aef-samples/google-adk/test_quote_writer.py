@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+GroupCommitWriter tests
+---------------------------------------
+Checks that concurrent saves share journal fsyncs instead of paying one
+each, and that a batch whose JSON export fails after the SQLite commit is
+neither saved twice nor dead-lettered.
+
+    python test_quote_writer.py
+"""
+
+import json, os, sys, tempfile, threading, time
+from pathlib import Path
+sys.path.insert(0, '.')
+
+import quote_store
+from quote_store import GroupCommitWriter, SqliteQuoteStore
+
+
+def quote(n: int) -> dict:
+    return {"quote_id": f"Q-{n:04d}", "customer": f"Customer {n}", "total": 10.0 * n,
+            "created_at": f"2026-01-01T00:00:{n % 60:02d}.000+00:00"}
+
+
+def test_concurrent_saves_share_fsyncs(savers: int = 32, quotes: int = 5):
+    fsyncs = []
+    real_fsync = quote_store.os.fsync
+
+    def slow_fsync(fd):
+        fsyncs.append(fd)
+        time.sleep(0.005)           # a disk flush, so savers pile up behind it
+        real_fsync(fd)
+
+    with tempfile.TemporaryDirectory() as root:
+        writer = GroupCommitWriter(SqliteQuoteStore(Path(root) / "quotes.db"),
+                                   journal_dir=Path(root) / "quote_journal")
+        quote_store.os.fsync = slow_fsync
+        try:
+            start = threading.Barrier(savers)
+
+            def save(s: int):
+                start.wait()
+                for n in range(quotes):
+                    writer.save(quote(s * quotes + n))
+
+            threads = [threading.Thread(target=save, args=(s,)) for s in range(savers)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            quote_store.os.fsync = real_fsync
+        writer.close()
+
+        total = savers * quotes
+        assert writer.store.count() == total
+        assert len(fsyncs) < total / 4, f"{len(fsyncs)} fsyncs for {total} saves"
+        print(f"✅ {total} concurrent saves, {len(fsyncs)} journal fsyncs")
+
+
+def test_export_failure_after_commit_is_not_dead_lettered():
+    with tempfile.TemporaryDirectory() as root:
+        store = SqliteQuoteStore(Path(root) / "quotes.db", export_dir=Path(root) / "quotes")
+
+        def broken_export(quotes, fsync=True):
+            raise OSError("disk full")
+
+        store.exports.write = broken_export
+        writer = GroupCommitWriter(store, journal_dir=Path(root) / "quote_journal")
+        for n in range(10):
+            writer.save(quote(n))
+        writer.close()
+
+        assert store.count() == 10
+        dead_letter = Path(root) / "quote_journal" / "dead_letter.jsonl"
+        assert not dead_letter.exists(), dead_letter.read_text()
+        print("✅ Export failure after commit: all quotes saved, nothing dead-lettered")
+
+
+def test_rejected_quote_is_dead_lettered():
+    with tempfile.TemporaryDirectory() as root:
+        store = SqliteQuoteStore(Path(root) / "quotes.db")
+        writer = GroupCommitWriter(store, journal_dir=Path(root) / "quote_journal")
+        for n in range(5):
+            writer.save(quote(n) if n != 3 else {**quote(3), "customer": None})
+        writer.close()
+
+        assert store.count() == 4
+        records = [json.loads(line) for line in open(Path(root) / "quote_journal" / "dead_letter.jsonl")]
+        assert [r["quote"]["quote_id"] for r in records] == ["Q-0003"]
+        print("✅ Rejected quote dead-lettered, the rest of its batch saved")
+
+
+if __name__ == "__main__":
+    print("🧪 GroupCommitWriter tests")
+    print("=" * 60)
+    test_concurrent_saves_share_fsyncs()
+    test_export_failure_after_commit_is_not_dead_lettered()
+    test_rejected_quote_is_dead_lettered()
+    print("=" * 60)
+    print("🎉 All writer checks passed")
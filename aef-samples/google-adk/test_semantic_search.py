@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Semantic search tests
+---------------------------------------
+Checks that the on-disk embedding cache reads back every key it wrote,
+including sha256 digests that end in NUL bytes, so a restart never
+re-embeds cached products.
+
+    python test_semantic_search.py
+"""
+
+import sys, tempfile
+import numpy as np
+sys.path.insert(0, '.')
+
+from semantic_search import EmbeddingCache, HashingEmbedder, content_key, embed_missing
+
+
+def test_cache_round_trips_keys_ending_in_nul():
+    keys = [b"\x07" * 31 + b"\x00", b"\x00" * 32, content_key("m", "Office Chair")]
+    vectors = np.arange(len(keys) * 4, dtype=np.float32).reshape(len(keys), 4)
+    with tempfile.TemporaryDirectory() as root:
+        EmbeddingCache(root, "m").put(keys, vectors)
+        reloaded = EmbeddingCache(root, "m")
+        assert len(reloaded) == len(keys)
+        for key, vector in zip(keys, vectors):
+            assert np.array_equal(reloaded.get(key), vector)
+    print("✅ Cache keys ending in NUL bytes survive a reload")
+
+
+def test_reload_embeds_nothing():
+    texts = [f"Product {n}" for n in range(2000)]   # one of these digests ends in \x00
+    embedder = HashingEmbedder(dim=16)
+    with tempfile.TemporaryDirectory() as root:
+        assert embed_missing(texts, embedder, EmbeddingCache(root, embedder.model)) == len(texts)
+        assert embed_missing(texts, embedder, EmbeddingCache(root, embedder.model)) == 0
+    print("✅ A reloaded cache re-embeds nothing")
+
+
+if __name__ == "__main__":
+    print("🧪 Semantic search tests")
+    print("=" * 60)
+    test_cache_round_trips_keys_ending_in_nul()
+    test_reload_embeds_nothing()
+    print("=" * 60)
+    print("🎉 All semantic search checks passed")
@@ -0,0 +1,44 @@
+"""
+Token Usage
+---------------------------------------
+Per-request LLM token accounting. Every LLM Gateway call site reports the
+response's usage with ``record``; callers that want totals wrap the work
+in ``track``:
+
+    with track() as usage:
+        await run_agent_async(prompt)
+    print(usage)   # {"llm_calls": 2, "prompt_tokens": ..., "completion_tokens": ..., "total_tokens": ...}
+
+The running totals live in a ContextVar, so concurrent asyncio tasks each
+count only their own request. Work handed to a thread keeps counting when
+it runs in a copied context (``asyncio.to_thread`` or
+``contextvars.copy_context().run``).
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_usage = ContextVar("token_usage", default=None)
+FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+
+def record(response):
+    """Add an OpenAI-style response's ``usage`` to the current totals (if tracked)."""
+    totals = _usage.get()
+    if totals is None:
+        return
+    usage = getattr(response, "usage", None)
+    totals["llm_calls"] += 1
+    for field in FIELDS:
+        totals[field] += getattr(usage, field, 0) or 0
+
+
+@contextmanager
+def track():
+    """Collect usage for the calls made inside the block."""
+    totals = {"llm_calls": 0, **{f: 0 for f in FIELDS}}
+    token = _usage.set(totals)
+    try:
+        yield totals
+    finally:
+        _usage.reset(token)